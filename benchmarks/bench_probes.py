@@ -0,0 +1,237 @@
+"""Offline benchmark for the analytics and OSD probes with synthetic DeepStream metadata.
+
+Runs analytics_pad_buffer_probe, osd_sink_pad_buffer_probe and purge_old_objects against
+common.fake_pyds, so it needs no GPU, GStreamer NVIDIA plugins or display.
+
+    python3 benchmarks/bench_probes.py --streams 1 4 16 --objects 20 100 \\
+        --churn 0.05 --trail-length 20 --output bench_probes.json
+    python3 benchmarks/bench_probes.py --zones config/python_app/zones.ini --roi-only
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common import fake_pyds
+
+fake_pyds.install()
+
+import numpy as np
+
+import probes
+from common.trail_store import TrailStore, FRAME_EXPIRATION_LIMIT
+from common.batch_columns import BatchMetaExtractor
+from common.iou_tracker import IouTracker
+from common.render_style import RenderStyleTable
+from common.zones import ZoneEngine
+
+NUM_CLASSES = 80
+LABELS = ["person", "car", "bicycle", "truck"]
+
+
+class SyntheticLoad:
+    """Generates batches of moving objects with a configurable id churn."""
+
+    def __init__(self, streams, objects, churn, width=1920, height=1080, seed=0):
+        self.streams = streams
+        self.objects = objects
+        self.churn = churn
+        self.width = width
+        self.height = height
+        self.rng = random.Random(seed)
+        self.next_id = 0
+        self.frame_num = 0
+        self.live = [[self._spawn() for _ in range(objects)] for _ in range(streams)]
+
+    def _spawn(self):
+        rng = self.rng
+        self.next_id += 1
+        w = rng.uniform(20, 200)
+        h = rng.uniform(40, 300)
+        return [self.next_id, rng.randrange(NUM_CLASSES),
+                rng.uniform(0, self.width - w), rng.uniform(0, self.height - h), w, h,
+                rng.uniform(-4, 4), rng.uniform(-4, 4)]
+
+    def next_batch(self):
+        rng = self.rng
+        frames = []
+        for pad_index, live in enumerate(self.live):
+            objs = []
+            for i, obj in enumerate(live):
+                if rng.random() < self.churn:
+                    live[i] = obj = self._spawn()
+                obj[2] = min(max(obj[2] + obj[6], 0.0), self.width - obj[4])
+                obj[3] = min(max(obj[3] + obj[7], 0.0), self.height - obj[5])
+                objs.append(fake_pyds.make_object(obj[0], obj[1], obj[2], obj[3], obj[4], obj[5],
+                                                  confidence=0.9, label=LABELS[obj[1] % len(LABELS)]))
+            frames.append((pad_index, self.frame_num, objs))
+        self.frame_num += 1
+        return fake_pyds.make_batch(frames)
+
+
+def percentiles(samples, scale=1000.0):
+    """Summarize samples (nanoseconds by default, reported in microseconds)."""
+    if not samples:
+        return {}
+    values = np.asarray(samples, dtype=np.float64) / scale
+    return {
+        "mean": round(float(values.mean()), 3),
+        "p50": round(float(np.percentile(values, 50)), 3),
+        "p90": round(float(np.percentile(values, 90)), 3),
+        "p99": round(float(np.percentile(values, 99)), 3),
+        "max": round(float(values.max()), 3),
+    }
+
+
+def run_case(streams, objects, churn, trail_length, batches, warmup, seed, trace_memory, zones=None,
+             roi_only=False):
+    probes.trail_store = TrailStore(trail_length=trail_length, expiration=FRAME_EXPIRATION_LIMIT)
+    probes.zone_engine = ZoneEngine.from_config(zones, labels=LABELS, drop_outside_roi=roi_only) if zones else None
+    # Tracker kimlikleri ve extractor tamponlari onceki vakadan / olcum gecisinden kalmasin
+    probes.iou_tracker = IouTracker()
+    probes.batch_extractor = BatchMetaExtractor(probes.pyds)
+    probes.osd_extractor = BatchMetaExtractor(probes.pyds)
+    probes.display_packer.frames = 0
+    probes.display_packer.acquired = 0
+
+    purge = probes.purge_old_objects
+    purge_ns = []
+
+    def timed_purge(pad_index, current_frame_num):
+        start = time.perf_counter_ns()
+        result = purge(pad_index, current_frame_num)
+        purge_ns.append(time.perf_counter_ns() - start)
+        return result
+
+    probes.purge_old_objects = timed_purge
+    render_styles = RenderStyleTable([LABELS[i % len(LABELS)] for i in range(NUM_CLASSES)], streams)
+    load = SyntheticLoad(streams, objects, churn, seed=seed)
+    probe_ns = []
+    analytics_ns = []
+    alloc_peaks = []
+    retained_start = None
+
+    try:
+        for n in range(warmup + batches):
+            measuring = n >= warmup
+            if n == warmup:
+                purge_ns.clear()
+                if trace_memory:
+                    tracemalloc.start()
+                    retained_start = tracemalloc.get_traced_memory()[0]
+
+            batch_meta = load.next_batch()
+            info = fake_pyds.FakeProbeInfo(fake_pyds.FakeBuffer(batch_meta))
+
+            if measuring and trace_memory:
+                tracemalloc.reset_peak()
+                before = tracemalloc.get_traced_memory()[0]
+            # Boru hattindaki sira: tiler sink'te analytics, ardindan OSD
+            start = time.perf_counter_ns()
+            probes.analytics_pad_buffer_probe(None, info, None)
+            middle = time.perf_counter_ns()
+            probes.osd_sink_pad_buffer_probe(None, info, None, render_styles)
+            elapsed = time.perf_counter_ns() - start
+            if measuring:
+                probe_ns.append(elapsed)
+                analytics_ns.append(middle - start)
+                if trace_memory:
+                    alloc_peaks.append(tracemalloc.get_traced_memory()[1] - before)
+
+        retained = None
+        if trace_memory:
+            retained = tracemalloc.get_traced_memory()[0] - retained_start
+    finally:
+        probes.purge_old_objects = purge
+        zone_engine, probes.zone_engine = probes.zone_engine, None
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    result = {
+        "params": {
+            "streams": streams,
+            "objects_per_frame": objects,
+            "churn": churn,
+            "trail_length": trail_length,
+            "batches": batches,
+            "warmup": warmup,
+            "seed": seed,
+            "zones": zones,
+            "roi_only": roi_only,
+        },
+        "probe_us": percentiles(probe_ns),
+        "analytics_us": percentiles(analytics_ns),
+        "purge_us": percentiles(purge_ns),
+        "per_object_us": round(float(np.median(probe_ns)) / 1000.0 / max(1, streams * objects), 4),
+        "display_metas_per_frame": round(probes.display_packer.metas_per_frame(), 3),
+        "tracked_objects_end": len(probes.trail_store),
+    }
+    if zone_engine is not None:
+        result["zone_events"] = len(zone_engine.drain_events())
+    if trace_memory:
+        result["memory"] = {
+            "batch_peak_bytes": percentiles(alloc_peaks, scale=1.0),
+            "retained_bytes": retained,
+        }
+    return result
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the OSD probe offline")
+    parser.add_argument("--streams", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--objects", type=int, nargs="+", default=[20, 100])
+    parser.add_argument("--churn", type=float, nargs="+", default=[0.02])
+    parser.add_argument("--trail-length", type=int, nargs="+", default=[20])
+    parser.add_argument("--batches", type=int, default=300)
+    parser.add_argument("--warmup", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--zones", default=None, help="Zone / line rules file (zones.ini format)")
+    parser.add_argument("--roi-only", action="store_true", help="Remove objects outside roi zones")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc pass")
+    parser.add_argument("--output", default=None, help="JSON output file (default: stdout)")
+    return parser.parse_args()
+
+
+def main(args):
+    cases = []
+    for streams, objects, churn, trail_length in itertools.product(
+            args.streams, args.objects, args.churn, args.trail_length):
+        # Timing and allocation tracing run separately, tracemalloc skews latency
+        result = run_case(streams, objects, churn, trail_length, args.batches, args.warmup,
+                          args.seed, trace_memory=False, zones=args.zones, roi_only=args.roi_only)
+        if not args.no_memory:
+            result["memory"] = run_case(streams, objects, churn, trail_length, args.batches,
+                                        args.warmup, args.seed, trace_memory=True, zones=args.zones,
+                                        roi_only=args.roi_only)["memory"]
+        cases.append(result)
+        sys.stderr.write("streams=%d objects=%d churn=%.3f trail=%d p50=%.1fus p99=%.1fus\n" % (
+            streams, objects, churn, trail_length,
+            result["probe_us"]["p50"], result["probe_us"]["p99"]))
+
+    report = {
+        "benchmark": "osd_sink_pad_buffer_probe",
+        "schema": 1,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "cases": cases,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(parse_args()))
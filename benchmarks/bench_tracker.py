@@ -0,0 +1,99 @@
+"""Per-frame cost of the CPU IOU tracker against the number of objects.
+
+    python3 benchmarks/bench_tracker.py --objects 10 50 100 400 --output bench_tracker.json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from common.iou_tracker import IouTracker, linear_sum_assignment
+
+
+def synthetic_frames(objects, frames, churn, seed, width=1920, height=1080):
+    """Yield (boxes, class_ids) of objects drifting across the frame."""
+    rng = np.random.default_rng(seed)
+    size = rng.uniform((20, 40), (200, 300), (objects, 2))
+    pos = rng.uniform(0, 1, (objects, 2)) * ((width, height) - size)
+    velocity = rng.uniform(-4, 4, (objects, 2))
+    class_ids = rng.integers(0, 80, objects)
+    for _ in range(frames):
+        respawn = rng.random(objects) < churn
+        if respawn.any():
+            pos[respawn] = rng.uniform(0, 1, (int(respawn.sum()), 2)) * ((width, height) - size[respawn])
+        pos = np.clip(pos + velocity, 0, (width, height) - size)
+        yield np.hstack((pos, size)).astype(np.float32), class_ids
+
+
+def run_case(objects, matching, frames, warmup, churn, seed):
+    tracker = IouTracker(matching=matching)
+    samples = []
+    for n, (boxes, class_ids) in enumerate(synthetic_frames(objects, warmup + frames, churn, seed)):
+        start = time.perf_counter_ns()
+        tracker.update(0, boxes, class_ids)
+        elapsed = time.perf_counter_ns() - start
+        if n >= warmup:
+            samples.append(elapsed)
+    us = np.asarray(samples, dtype=np.float64) / 1000.0
+    return {
+        "params": {"objects_per_frame": objects, "matching": matching, "frames": frames,
+                   "churn": churn, "seed": seed},
+        "update_us": {
+            "mean": round(float(us.mean()), 3),
+            "p50": round(float(np.percentile(us, 50)), 3),
+            "p99": round(float(np.percentile(us, 99)), 3),
+            "max": round(float(us.max()), 3),
+        },
+        "tracks_end": tracker.track_count(),
+        "ids_issued": tracker.next_id - 1,
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the CPU IOU tracker")
+    parser.add_argument("--objects", type=int, nargs="+", default=[10, 50, 100, 200, 400])
+    parser.add_argument("--matching", nargs="+", default=["greedy", "hungarian"])
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--churn", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="JSON output file (default: stdout)")
+    return parser.parse_args()
+
+
+def main(args):
+    matchings = [m for m in args.matching if m != "hungarian" or linear_sum_assignment is not None]
+    cases = []
+    for matching in matchings:
+        for objects in args.objects:
+            result = run_case(objects, matching, args.frames, args.warmup, args.churn, args.seed)
+            cases.append(result)
+            sys.stderr.write("matching=%s objects=%d p50=%.1fus p99=%.1fus\n" % (
+                matching, objects, result["update_us"]["p50"], result["update_us"]["p99"]))
+
+    report = {
+        "benchmark": "iou_tracker_update",
+        "schema": 1,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "cases": cases,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(parse_args()))
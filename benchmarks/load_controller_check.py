@@ -0,0 +1,196 @@
+"""Checks of the adaptive interval / shedding controller on simulated load traces.
+
+Drives common.load_controller.IntervalController (pure Python, no GPU
+or GStreamer) with scripted per-stream FPS samples and with a simple
+capacity model of the pipeline (an overload phase followed by a
+recovery), and checks the hysteresis, the cooldown, the shedding order
+and the recover dwell backoff. Reports every check; the exit code is
+non-zero if one fails:
+
+    python3 benchmarks/load_controller_check.py
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.load_controller import IntervalController
+
+NOMINAL_FPS = 25.0
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="IntervalController checks on simulated load traces")
+    parser.add_argument("--sources", type=int, default=4)
+    parser.add_argument("--overload-ticks", type=int, default=200, help="Ticks of the overload phase")
+    parser.add_argument("--recovery-ticks", type=int, default=1500, help="Ticks of the recovery phase")
+    parser.add_argument("--output", default=None, help="JSON output file (default: stdout)")
+    return parser.parse_args()
+
+
+def controller(**kwargs):
+    settings = dict(min_interval=0, max_interval=2, overload_samples=3, recover_samples=10, cooldown_samples=5,
+                    probe_window=20, max_recover_samples=80, nominal_fps=lambda source: NOMINAL_FPS)
+    settings.update(kwargs)
+    return IntervalController(**settings)
+
+
+def fps(sources, ratio, overrides=None):
+    stream_fps = {source: NOMINAL_FPS * ratio for source in range(sources)}
+    stream_fps.update(overrides or {})
+    return stream_fps
+
+
+def run(ctl, samples):
+    return [ctl.update(stream_fps) for stream_fps in samples]
+
+
+def check_hysteresis():
+    ctl = controller()
+    low, good = fps(2, 0.5), fps(2, 1.0)
+    # Tek tek gelen asiri yuk ornekleri (aralarinda normal kare) araligi degistirmez
+    spikes = run(ctl, [low, good] * 10 + [low, low])
+    sustained = run(ctl, [low])
+    # Hedefin %90-95'i arasi ("ok") ne arttirir ne azaltir, sayaclari sifirlar
+    ok = controller(max_interval=3)
+    ok.interval = 1
+    middle = run(ok, [fps(2, 0.9 * 0.92)] * 50)
+    return {
+        "spikes_ignored": not any(decision.changed for decision in spikes),
+        "steps_up_after_overload_samples": sustained[-1].changed and sustained[-1].interval == 1,
+        "ok_band_holds": not any(decision.changed for decision in middle) and ok.interval == 1,
+    }
+
+
+def check_cooldown():
+    ctl = controller(max_interval=4, allow_shedding=False)
+    decisions = run(ctl, [fps(2, 0.5)] * 40)
+    changes = [i for i, decision in enumerate(decisions) if decision.changed]
+    gaps = [b - a for a, b in zip(changes, changes[1:])]
+    # Degisiklikten sonra cooldown kadar tick beklenir, sonra yeniden overload_samples kadar
+    return {
+        "first_change_at_overload_samples": changes[:1] == [2],
+        "changes_spaced_by_cooldown": len(gaps) == 3 and all(gap == 5 + 3 for gap in gaps),
+        "capped_at_max_interval": ctl.interval == 4,
+    }
+
+
+def check_shedding_order():
+    ctl = controller(max_interval=1, cooldown_samples=0)
+    # Hepsi hedefin altinda; en dusuk fps / hedef orani once: 2, 3, 1; 0 tam hizda kalir
+    slow = {0: 18.0, 1: 15.0, 2: 10.0, 3: 12.0}
+    decisions = run(ctl, [slow] * 30)
+    steps = [(decision.interval, decision.shed_sources) for decision in decisions if decision.changed]
+    results = {
+        "interval_first": steps[:1] == [(1, [])],
+        "slowest_first": steps[1:] == [(1, [2]), (1, [2, 3]), (1, [2, 3, 1])],
+        "one_source_kept": ctl.shed_sources == [2, 3, 1],
+    }
+    # Toparlanma: once kaynaklar ters sirayla geri alinir, en son aralik duser
+    decisions = run(ctl, [fps(4, 1.0)] * 100)
+    steps = [(decision.interval, decision.shed_sources) for decision in decisions if decision.changed]
+    results["restored_in_reverse_order"] = steps[:3] == [(1, [2, 3]), (1, [2]), (1, [])]
+    results["interval_lowered_last"] = steps[3:] == [(0, [])]
+    ctl.shed_sources = [1, 2]
+    ctl.drop_source(2)
+    results["drop_source_forgets_shed"] = ctl.shed_sources == [1]
+    return results
+
+
+def check_recover_backoff():
+    ctl = controller(max_interval=1, allow_shedding=False)
+    low, good = fps(2, 0.5), fps(2, 1.0)
+    run(ctl, [low] * 3)
+    required = [ctl.recover_required]
+    for _ in range(4):
+        # Bos kapasite -> aralik 0; cooldown biter bitmez tekrar asiri yuk -> aralik 1
+        run(ctl, [good] * (5 + ctl.recover_required) + [low] * (5 + 3))
+        required.append(ctl.recover_required)
+    # Asagi adimdan probe_window'dan uzun sonra gelen asiri yuk beklemeyi arttirmaz
+    late = controller(max_interval=1, allow_shedding=False)
+    run(late, [low] * 3 + [good] * (5 + 10) + [good] * 40 + [low] * 3)
+    return {
+        "dwell_doubles": required[:4] == [10, 20, 40, 80],
+        "dwell_capped": required[4:] == [80],
+        "late_overload_keeps_dwell": late.interval == 1 and late.recover_required == 10,
+        "recover_required": required,
+    }
+
+
+def check_relative_targets():
+    # 15 FPS kamera 14 FPS'te: 25 FPS varsayilirsa asiri yuk sayilirdi
+    nominal = {0: 25.0, 1: 15.0}
+    ctl = controller(nominal_fps=nominal.get)
+    decisions = run(ctl, [{0: 24.5, 1: 14.0}] * 20)
+    absolute = controller(target_fps=25.0)
+    return {
+        "per_source_target": not any(decision.state == "overload" for decision in decisions),
+        "absolute_override": absolute.classify({0: 24.5, 1: 14.0}) == "overload",
+        "unknown_target_ignored": controller(nominal_fps=lambda source: None).classify({0: 1.0}) == "headroom",
+    }
+
+
+def simulate(sources, overload_ticks, recovery_ticks):
+    """Capacity model: inference handles capacity frames/s, sources ask for NOMINAL_FPS / (interval + 1) each.
+
+    Shed sources are decimated to a quarter of their rate. The capacity
+    drops to a quarter of the full load during the overload phase, which
+    max_interval alone cannot absorb, and comes back afterwards.
+    """
+    ctl = controller(max_interval=2)
+    full_load = sources * NOMINAL_FPS
+    trace = []
+    for tick in range(overload_ticks + recovery_ticks):
+        capacity = full_load * (0.25 if tick < overload_ticks else 1.5)
+        load = sum(NOMINAL_FPS / (ctl.interval + 1) * (0.25 if source in ctl.shed_sources else 1.0)
+                   for source in range(sources))
+        ratio = min(1.0, capacity / load)
+        # Sonraki kaynaklar biraz daha yavas: en son kaynak ilk kesilmeli
+        stream_fps = {source: NOMINAL_FPS * ratio * (1.0 - 0.01 * source) for source in range(sources)}
+        decision = ctl.update(stream_fps)
+        trace.append((decision.interval, list(decision.shed_sources), decision.changed))
+    return ctl, trace
+
+
+def check_trace(sources, overload_ticks, recovery_ticks):
+    ctl, trace = simulate(sources, overload_ticks, recovery_ticks)
+    overload = trace[:overload_ticks]
+    # Asiri yuk sirasinda geri alinan her kesme bir denemedir; aralarindaki sure uzamali
+    probes = [tick for tick in range(1, overload_ticks)
+              if overload[tick][2] and len(overload[tick][1]) < len(overload[tick - 1][1])]
+    gaps = [b - a for a, b in zip(probes, probes[1:])]
+    return {
+        "overload_reaches_max_interval": max(interval for interval, _, _ in overload) == 2,
+        "slowest_shed": any(shed == [sources - 1] for _, shed, _ in overload),
+        "probes_back_off": len(gaps) >= 2 and all(a < b for a, b in zip(gaps, gaps[1:])),
+        "recovers_to_min": trace[-1][:2] == (0, []) and not ctl.shed_sources,
+        "changes": sum(changed for _, _, changed in trace),
+        "probe_ticks": probes,
+    }
+
+
+def main(args):
+    checks = {
+        "hysteresis": check_hysteresis(),
+        "cooldown": check_cooldown(),
+        "shedding": check_shedding_order(),
+        "recover_backoff": check_recover_backoff(),
+        "targets": check_relative_targets(),
+        "trace": check_trace(args.sources, args.overload_ticks, args.recovery_ticks),
+    }
+    failed = ["%s.%s" % (group, name) for group, results in checks.items()
+              for name, ok in results.items() if ok is False]
+    report = {"benchmark": "load_controller_check", "schema": 1, "checks": checks, "failed": failed}
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(parse_args()))
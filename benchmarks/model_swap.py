@@ -0,0 +1,129 @@
+"""PGIE hot-swap sequence on a videotestsrc pipeline, without GPU or DeepStream.
+
+Runs the same ModelSwapper as ds-segmentation.py (--swap-model or
+"model <config>" on the control socket) with identity elements standing
+in for nvinfer: a "model" is an identity whose sleep-time simulates the
+inference time, and preparing it sleeps for the simulated engine build.
+Reports the gap and drain time of every swap. With --fail-last the last
+swap gets an element that cannot link (audio caps) and the report shows
+whether the old element was relinked and frames kept flowing:
+
+    python3 benchmarks/model_swap.py --swaps 4 --interval 2 --prepare-ms 500
+    python3 benchmarks/model_swap.py --swaps 3 --fail-last
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import gi
+gi.require_version('Gst', '1.0')
+from gi.repository import GLib, Gst
+
+from common.model_swap import ModelSwapper
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Model swap gap with stand-in inference elements")
+    parser.add_argument("--swaps", type=int, default=4)
+    parser.add_argument("--interval", type=float, default=2.0, help="Seconds between swaps")
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--infer-ms", default="5,15", help="Comma separated simulated inference times")
+    parser.add_argument("--prepare-ms", type=float, default=500.0, help="Simulated engine build / load time")
+    parser.add_argument("--fail-last", action="store_true", help="Make the last swap fail to link (rollback check)")
+    parser.add_argument("--output", default=None, help="JSON output file (default: stdout)")
+    return parser.parse_args()
+
+
+def main(args):
+    infer_ms = [float(value) for value in args.infer_ms.split(",") if value.strip()]
+    Gst.init(None)
+    pipeline = Gst.Pipeline.new("model-swap-bench")
+    source = Gst.ElementFactory.make("videotestsrc", "source")
+    source.set_property("is-live", True)
+    caps = Gst.ElementFactory.make("capsfilter", "source-caps")
+    caps.set_property("caps", Gst.Caps.from_string("video/x-raw, width=640, height=360, framerate=%d/1" % args.fps))
+    queue = Gst.ElementFactory.make("queue", "queue_pre_pgie")
+    sink = Gst.ElementFactory.make("fakesink", "sink")
+    sink.set_property("sync", False)
+
+    # "config" burada model indeksi: identity sleep-time = inference suresi
+    def make_element(model):
+        if model == "unlinkable":
+            # Video akisina baglanamayan "model": _relink eski elemana geri donmeli
+            return Gst.ElementFactory.make("audioconvert", "unlinkable-inference")
+        element = Gst.ElementFactory.make("identity", "primary-inference")
+        element.set_property("sleep-time", int(infer_ms[int(model)] * 1000))
+        return element
+
+    def prepare(model):
+        time.sleep(args.prepare_ms / 1000.0)
+
+    stand_in = make_element("0")
+    for element in (source, caps, queue, stand_in, sink):
+        pipeline.add(element)
+    if not (source.link(caps) and caps.link(queue) and queue.link(stand_in) and stand_in.link(sink)):
+        sys.stderr.write("Unable to build the test pipeline\n")
+        return 1
+
+    frames = [0]
+
+    def count_frame(pad, info):
+        frames[0] += 1
+        return Gst.PadProbeReturn.OK
+
+    sink.get_static_pad("sink").add_probe(Gst.PadProbeType.BUFFER, count_frame)
+
+    loop = GLib.MainLoop()
+    results = []
+    swapper = ModelSwapper(pipeline, stand_in, make_element, prepare=prepare, config_path="0",
+                           on_swapped=[lambda old, new, model: results.append({"model": model})])
+    state = {"swaps": 0}
+
+    def next_swap():
+        if results and "gap_ms" not in results[-1]:
+            results[-1].update(gap_ms=round(swapper.last_gap_ms or 0.0, 3),
+                               drain_ms=round(swapper.last_drain_ms or 0.0, 3), state=swapper.state)
+        if "rollback" in state and "frames_after" not in state["rollback"]:
+            state["rollback"].update(state=swapper.state, error=swapper.error,
+                                     frames_after=frames[0] - state["rollback"]["frames_before"],
+                                     element=swapper.element.get_name())
+        if state["swaps"] >= args.swaps:
+            loop.quit()
+            return False
+        state["swaps"] += 1
+        if args.fail_last and state["swaps"] == args.swaps:
+            state["rollback"] = {"frames_before": frames[0]}
+            swapper.swap("unlinkable")
+        else:
+            swapper.swap(str(state["swaps"] % len(infer_ms)))
+        return True
+
+    GLib.timeout_add(int(args.interval * 1000), next_swap)
+    pipeline.set_state(Gst.State.PLAYING)
+    try:
+        loop.run()
+    except KeyboardInterrupt:
+        pass
+    pipeline.set_state(Gst.State.NULL)
+
+    gaps = [result["gap_ms"] for result in results if "gap_ms" in result]
+    report = {"swaps": results, "max_gap_ms": max(gaps) if gaps else None, "rollback": state.get("rollback"),
+              "frame_interval_ms": round(1000.0 / args.fps, 3),
+              "settings": {"infer_ms": infer_ms, "prepare_ms": args.prepare_ms, "interval": args.interval}}
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    rollback = state.get("rollback")
+    if rollback is not None and not (rollback.get("state") == "failed" and rollback.get("frames_after")):
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(parse_args()))
@@ -0,0 +1,110 @@
+"""Motion gate on a videotestsrc pipeline, without GPU or DeepStream.
+
+Runs the same MotionGate branch and gate probe as ds-segmentation.py
+--motion-gate (with CPU downscaling) on a live test source that
+alternates between a still picture and a moving ball, and reports the
+skipped fraction per phase:
+
+    python3 benchmarks/motion_gate.py --phase-seconds 3 --phases still,ball,still
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import gi
+gi.require_version('Gst', '1.0')
+from gi.repository import GLib, Gst
+
+from common.motion_gate import CPU_ELEMENTS, ChangeDetector, MotionGate
+
+# videotestsrc desenleri: still = sabit renk cubuklari, ball = hareketli top
+PATTERNS = {"still": "smpte", "ball": "ball", "snow": "snow"}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Motion gate skip ratio on videotestsrc")
+    parser.add_argument("--phases", default="still,ball,still", help="Comma separated: still, ball, snow")
+    parser.add_argument("--phase-seconds", type=float, default=3.0)
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--threshold", type=float, default=0.005)
+    parser.add_argument("--pixel-delta", type=int, default=12)
+    parser.add_argument("--refresh", type=int, default=30)
+    parser.add_argument("--hold", type=int, default=5)
+    parser.add_argument("--output", default=None, help="JSON output file (default: stdout)")
+    return parser.parse_args()
+
+
+def main(args):
+    phases = [phase.strip() for phase in args.phases.split(",") if phase.strip()]
+    unknown = [phase for phase in phases if phase not in PATTERNS]
+    if unknown:
+        sys.stderr.write("Unknown phases: %s\n" % ", ".join(unknown))
+        return 1
+
+    Gst.init(None)
+    pipeline = Gst.Pipeline.new("motion-gate-bench")
+    source = Gst.ElementFactory.make("videotestsrc", "source")
+    source.set_property("is-live", True)
+    source.set_property("pattern", PATTERNS[phases[0]])
+    caps = Gst.ElementFactory.make("capsfilter", "source-caps")
+    caps.set_property("caps", Gst.Caps.from_string("video/x-raw, width=640, height=360, framerate=%d/1" % args.fps))
+    sink = Gst.ElementFactory.make("fakesink", "sink")
+    for element in (source, caps, sink):
+        pipeline.add(element)
+
+    gate = MotionGate(args.threshold, refresh_every=args.refresh, hold_frames=args.hold,
+                      detector=ChangeDetector(args.pixel_delta), elements=CPU_ELEMENTS)
+    tee = gate.add_branch(pipeline, 0)
+    if not tee or not source.link(caps) or not caps.link(tee):
+        sys.stderr.write("Unable to build the test pipeline\n")
+        return 1
+    if tee.request_pad_simple("src_%u").link(sink.get_static_pad("sink")) != Gst.PadLinkReturn.OK:
+        sys.stderr.write("Unable to link the main branch\n")
+        return 1
+    gate.attach_pad(sink.get_static_pad("sink"), 0)
+
+    loop = GLib.MainLoop()
+    results = []
+    state = {"phase": 0, "frames": 0, "skipped": 0}
+
+    def next_phase():
+        frames = gate.frames.get(0, 0)
+        skipped = gate.skipped.get(0, 0)
+        phase_frames = frames - state["frames"]
+        results.append({
+            "phase": phases[state["phase"]],
+            "frames": phase_frames,
+            "skipped": skipped - state["skipped"],
+            "skip_ratio": round((skipped - state["skipped"]) / phase_frames, 4) if phase_frames else 0.0,
+        })
+        state.update(frames=frames, skipped=skipped, phase=state["phase"] + 1)
+        if state["phase"] >= len(phases):
+            loop.quit()
+            return False
+        source.set_property("pattern", PATTERNS[phases[state["phase"]]])
+        return True
+
+    GLib.timeout_add(int(args.phase_seconds * 1000), next_phase)
+    pipeline.set_state(Gst.State.PLAYING)
+    try:
+        loop.run()
+    except KeyboardInterrupt:
+        pass
+    pipeline.set_state(Gst.State.NULL)
+
+    report = {"phases": results, "skip_ratio": round(gate.skip_ratio(), 4),
+              "settings": {"threshold": args.threshold, "pixel_delta": args.pixel_delta,
+                           "refresh": args.refresh, "hold": args.hold}}
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(parse_args()))
@@ -0,0 +1,96 @@
+"""Replay a recorded metadata trace through the probes, without GPU or GStreamer.
+
+Record on the target with ``ds-segmentation.py --record-trace load.trace``,
+then replay it here as fast as possible or at the recorded pace. The trace
+is recorded at the tiler sink pad, before the analytics probe, so boxes are
+in muxer coordinates; the replay runs the analytics probe and then the OSD
+probe on them without a tile layout:
+
+    python3 benchmarks/replay_trace.py load.trace --output replay.json
+    python3 benchmarks/replay_trace.py load.trace --speed 1.0 --labels-config config/pgie/config_pgie_yolo_seg.txt
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common import fake_pyds
+
+fake_pyds.install()
+
+import numpy as np
+
+import probes
+from common.meta_trace import TraceReader
+from common.render_style import RenderStyleTable
+from common.utils import load_labels
+from bench_probes import percentiles
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Replay a batch metadata trace through the analytics and OSD probes")
+    parser.add_argument("trace", help="Trace file written by --record-trace")
+    parser.add_argument("--speed", type=float, default=0,
+                        help="Playback speed relative to the recording (0: as fast as possible)")
+    parser.add_argument("--start", type=int, default=0, help="First batch")
+    parser.add_argument("--batches", type=int, default=None, help="Number of batches (default: all)")
+    parser.add_argument("--labels-config", default=None, help="PGIE config for the label file")
+    parser.add_argument("--sources", type=int, default=0, help="Source count for font sizing (default: from trace)")
+    parser.add_argument("--output", default=None, help="JSON output file (default: stdout)")
+    return parser.parse_args()
+
+
+def main(args):
+    reader = TraceReader(args.trace)
+    record_count = len(reader.records)
+    sources = args.sources or len(np.unique(reader.records["pad_index"])) or 1
+    labels = load_labels(args.labels_config) if args.labels_config else \
+        [str(c) for c in range(int(reader.records["class_id"].max(initial=0)) + 1)]
+    render_styles = RenderStyleTable(labels, sources)
+
+    probe_ns = []
+    objects = []
+
+    def run(i, batch_meta):
+        info = fake_pyds.FakeProbeInfo(fake_pyds.FakeBuffer(batch_meta))
+        start = time.perf_counter_ns()
+        probes.analytics_pad_buffer_probe(None, info, None)
+        probes.osd_sink_pad_buffer_probe(None, info, None, render_styles)
+        probe_ns.append(time.perf_counter_ns() - start)
+        objects.append(sum(frame_meta.num_obj_meta for frame_meta in batch_meta.frames))
+
+    stop = None if args.batches is None else args.start + args.batches
+    wall_start = time.perf_counter()
+    reader.replay(run, fake_pyds, speed=args.speed or None, start=args.start, stop=stop)
+    wall = time.perf_counter() - wall_start
+
+    report = {
+        "benchmark": "trace_replay",
+        "schema": 1,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "trace": {"path": os.path.abspath(args.trace), "batches": len(reader),
+                  "records": record_count, "sources": sources},
+        "replayed_batches": len(probe_ns),
+        "objects_per_batch": percentiles(objects, scale=1.0),
+        "probe_us": percentiles(probe_ns),
+        "wall_seconds": round(wall, 3),
+    }
+    reader.close()
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(parse_args()))
@@ -0,0 +1,172 @@
+"""Checks of the rule-event snapshots, without GPU or GStreamer.
+
+Drives common.snapshots with NumPy frames (ArrayFrames) and a fake
+clock: crop geometry, encoding in the pool (PNG without OpenCV), the
+per-object and per-stream rate limits and the in-flight byte budget
+with a blocked encoder. Reports every check; the exit code is non-zero
+if one fails:
+
+    python3 benchmarks/snapshot_check.py
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from common.snapshots import ArrayFrames, SnapshotCapture, SnapshotLimiter, _load_cv2
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Snapshot crop / encode / limit checks")
+    parser.add_argument("--requests", type=int, default=200, help="Requests while the encoder is blocked")
+    parser.add_argument("--max-request-ms", type=float, default=5.0,
+                        help="Slowest allowed request() while the encoder is blocked")
+    parser.add_argument("--output", default=None, help="JSON output file (default: stdout)")
+    return parser.parse_args()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class BlockedCapture(SnapshotCapture):
+    """SnapshotCapture whose encoder waits until release is set (a slow disk / encoder)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.release = threading.Event()
+
+    def _encode(self, crop, pad_index, name):
+        self.release.wait()
+        super()._encode(crop, pad_index, name)
+
+
+def make_frame(height=120, width=160):
+    # Her piksel konumunu tasir: kesitin nereden alindigi degerlerden okunur
+    ys, xs = np.mgrid[0:height, 0:width]
+    return np.stack((xs % 256, ys % 256, (xs + ys) % 256, np.full_like(xs, 255)), axis=-1).astype(np.uint8)
+
+
+def check_crop():
+    frames = ArrayFrames()
+    frame = make_frame()
+    crop = frames.crop(frame, (40, 30, 20, 10), margin=0.1)
+    edge = frames.crop(frame, (150, 110, 40, 40), margin=0.0)
+    return {
+        "margin_applied": crop.shape == (12, 24, 3) and bool(crop[0, 0, 0] == 38 and crop[0, 0, 1] == 29),
+        "alpha_dropped": crop.shape[2] == 3,
+        "copied": not np.shares_memory(crop, frame),
+        "clipped_to_frame": edge.shape == (10, 10, 3),
+        "outside_is_none": frames.crop(frame, (200, 200, 10, 10)) is None,
+    }
+
+
+def check_encode(directory):
+    capture = SnapshotCapture(ArrayFrames(), directory, SnapshotLimiter(clock=FakeClock()))
+    accepted = capture.request(make_frame(), 3, 17, 42, 1, (40, 30, 20, 10), reason="enter")
+    capture.stop()
+    extension = ".jpg" if _load_cv2() else ".png"
+    path = os.path.join(directory, "03", "%06d_%d_%d_%s%s" % (17, 42, 1, "enter", extension))
+    with open(path, "rb") as file:
+        header = file.read(8)
+    return {
+        "accepted": accepted,
+        "written": capture.saved == 1 and capture.bytes_written == os.path.getsize(path),
+        "image_header": header.startswith(b"\xff\xd8") if extension == ".jpg" else header == b"\x89PNG\r\n\x1a\n",
+        "budget_released": capture.limiter.in_flight == 0,
+    }
+
+
+def check_rates():
+    clock = FakeClock()
+    limiter = SnapshotLimiter(stream_rate=1.0, stream_burst=3, object_interval=10.0, clock=clock)
+
+    def take(pad_index, object_id):
+        refused = limiter.allow(pad_index, object_id)
+        if refused is None:
+            limiter.commit(pad_index, object_id)
+        return refused
+
+    results = {}
+    results["object_first"] = take(0, 1) is None
+    results["object_repeat_refused"] = take(0, 1) == "object_rate"
+    # Burst 3: iki nesne daha gecer, dorduncu istek akis hizina takilir
+    results["stream_burst"] = [take(0, 2), take(0, 3), take(0, 4)] == [None, None, "stream_rate"]
+    results["streams_independent"] = take(1, 1) is None
+    clock.now = 1.0
+    results["stream_refill"] = [take(0, 4), take(0, 5)] == [None, "stream_rate"]
+    clock.now = 10.0
+    results["object_interval_elapsed"] = take(0, 1) is None
+    limiter.drop_source(0)
+    results["drop_source_forgets"] = (0, 2) not in limiter.objects and 0 not in limiter.tokens
+    return results
+
+
+def check_backpressure(directory, requests, max_request_ms):
+    frame = make_frame()
+    rect = (40, 30, 20, 10)
+    crop_bytes = ArrayFrames().crop(frame, rect).nbytes
+    limiter = SnapshotLimiter(stream_rate=0.0, stream_burst=requests + 2, object_interval=10.0,
+                              budget_bytes=crop_bytes, clock=FakeClock())
+    capture = BlockedCapture(ArrayFrames(), directory, limiter, workers=1)
+    results = {}
+    results["first_accepted"] = capture.request(frame, 0, 0, 0, 0, rect)
+    durations = []
+    accepted = 0
+    for object_id in range(1, requests + 1):
+        start = time.perf_counter()
+        accepted += capture.request(frame, 0, object_id, object_id, 0, rect)
+        durations.append(time.perf_counter() - start)
+    results["over_budget_dropped"] = accepted == 0 and capture.dropped.get("budget") == requests
+    results["probe_not_blocked"] = max(durations) * 1000.0 < max_request_ms
+    # Butceye takilan istek ne jetonu ne nesne damgasini harcar
+    results["budget_drop_keeps_object"] = all((0, object_id) not in limiter.objects
+                                              for object_id in range(1, requests + 1))
+    results["budget_drop_keeps_tokens"] = limiter.tokens[0][0] == requests + 1
+
+    capture.release.set()
+    deadline = time.monotonic() + 5.0
+    while limiter.in_flight and time.monotonic() < deadline:
+        time.sleep(0.01)
+    results["accepted_after_release"] = capture.request(frame, 0, 1, 1, 0, rect)
+    capture.stop()
+    results["saved_after_release"] = capture.saved == 2
+    results["max_request_ms"] = round(max(durations) * 1000.0, 3)
+    return results
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as directory:
+        checks = {
+            "crop": check_crop(),
+            "encode": check_encode(os.path.join(directory, "encode")),
+            "rates": check_rates(),
+            "backpressure": check_backpressure(os.path.join(directory, "backpressure"), args.requests,
+                                               args.max_request_ms),
+        }
+    failed = ["%s.%s" % (group, name) for group, results in checks.items()
+              for name, ok in results.items() if ok is False]
+    report = {"benchmark": "snapshot_check", "schema": 1, "encoder": "jpeg" if _load_cv2() else "png",
+              "checks": checks, "failed": failed}
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(parse_args()))
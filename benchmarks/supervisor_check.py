@@ -0,0 +1,214 @@
+"""Checks of the supervisor's sharding, metric merging and restart backoff, without GPU or GStreamer.
+
+Drives common.supervisor with a fake launcher and clock (crashes are
+scripted, no processes are started) and reports every check; the exit
+code is non-zero if one fails. With --stand-in the sequence also runs on
+real scripts/stand_in_worker.py processes:
+
+    python3 benchmarks/supervisor_check.py
+    python3 benchmarks/supervisor_check.py --stand-in --base-port 19200
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.media_config import MediaSource
+from common.supervisor import DeepStreamWorker, Supervisor, merge_prometheus, plan_shards
+
+STAND_IN_WORKER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                               "scripts", "stand_in_worker.py")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Supervisor sharding / metrics / backoff checks")
+    parser.add_argument("--stand-in", action="store_true", help="Also run real stand-in worker processes")
+    parser.add_argument("--base-port", type=int, default=19200, help="First metrics port of the stand-in workers")
+    parser.add_argument("--output", default=None, help="JSON output file (default: stdout)")
+    return parser.parse_args()
+
+
+def make_sources(count, sizes=((1920, 1080),), gpus=(0,)):
+    return [MediaSource("MediaSettings-%d" % i, "cam%d" % i, "file:///cam%d.mp4" % i,
+                        sizes[i % len(sizes)][0], sizes[i % len(sizes)][1], gpus[i % len(gpus)])
+            for i in range(count)]
+
+
+class FakeProcess:
+    """Popen stand-in: poll() returns None until crash() is called."""
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.pid = 1000 + spec.index
+        self.returncode = None
+
+    def poll(self):
+        return self.returncode
+
+    def crash(self, code=1):
+        self.returncode = code
+
+    def send_signal(self, signum):
+        self.returncode = 0
+
+    def wait(self, timeout=None):
+        return self.returncode
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def check_plan_shards():
+    results = {}
+    shards = plan_shards(make_sources(7), 3)
+    results["round_robin_counts"] = sorted(len(shard) for shard in shards) == [2, 2, 3]
+
+    # 4K bir kaynak dort 1080p kaynak kadar yuk: LPT ile 4K bir isciye, 3 x 1080p digerine
+    sources = make_sources(4, sizes=((3840, 2160), (1920, 1080), (1920, 1080), (1920, 1080)))
+    pixels = sorted(sum(source.width * source.height for source in shard)
+                    for shard in plan_shards(sources, 2, "resolution"))
+    results["resolution_balanced"] = pixels == [3 * 1920 * 1080, 3840 * 2160]
+
+    shards = plan_shards(make_sources(6, gpus=(0, 1)), 4, "gpu", gpus=(0, 1))
+    results["gpu_placement"] = all(source.gpu_id == i % 2 for i, shard in enumerate(shards) for source in shard)
+
+    previous = plan_shards(make_sources(6), 3)
+    grown = plan_shards(make_sources(7), 3, previous=previous)
+    results["sticky_assignment"] = all(
+        [source.key for source in shard[:len(old)]] == [source.key for source in old]
+        for shard, old in zip(grown, previous))
+    return results
+
+
+def check_merge_prometheus():
+    text = "\n".join([
+        "# TYPE ds_stream_fps gauge",
+        'ds_stream_fps{stream="0"} 25.0',
+        'ds_stream_fps{stream="1"} 24.5',
+        "# TYPE ds_frames_total counter",
+        "ds_frames_total 100",
+    ])
+    merged = merge_prometheus([(0, {0: 3, 1: 5}, text), (1, {0: 4}, text)])
+    lines = merged.splitlines()
+    return {
+        "stream_relabelled": 'ds_stream_fps{worker="0",stream="5"} 24.5' in lines,
+        "worker_label": 'ds_frames_total{worker="1"} 100' in lines,
+        "unmapped_kept": 'ds_stream_fps{worker="1",stream="1"} 24.5' in lines,
+        "type_declared_once": lines.count("# TYPE ds_stream_fps gauge") == 1,
+    }
+
+
+def check_backoff(run_dir):
+    clock = FakeClock()
+    processes = []
+
+    def launcher(spec):
+        processes.append(FakeProcess(spec))
+        return processes[-1]
+
+    supervisor = Supervisor(lambda: make_sources(2), launcher, 1, run_dir=run_dir, base_delay=1.0,
+                            max_delay=8.0, stable_seconds=30.0, clock=clock)
+    supervisor.start()
+    state = supervisor.states[0]
+    delays = []
+    for _ in range(5):
+        state.process.crash()
+        supervisor.check()
+        delays.append(state.restart_at - clock.now)
+        clock.now = state.restart_at
+        supervisor.check()
+    restarts = supervisor.restarts
+    # Kararli calisma sonrasi deneme sayisi sifirlanir
+    clock.now += 31.0
+    supervisor.check()
+    attempts_after_stable = state.attempts
+    state.process.crash()
+    supervisor.check()
+    return {
+        "delays_doubling_capped": delays == [1.0, 2.0, 4.0, 8.0, 8.0],
+        "restarted_every_time": restarts == 5 and len(processes) == 6,
+        "attempts_reset_when_stable": attempts_after_stable == 0 and state.restart_at - clock.now == 1.0,
+    }
+
+
+def check_render_during_reload(run_dir, reloads=300):
+    counts = [1]
+
+    def load_sources():
+        return make_sources(counts[0])
+
+    supervisor = Supervisor(load_sources, FakeProcess, 4, run_dir=run_dir,
+                            fetch=lambda port: 'ds_stream_fps{stream="0"} 25.0\n')
+    supervisor.start()
+    errors = []
+    done = threading.Event()
+
+    def scrape():
+        while not done.is_set():
+            try:
+                supervisor.render_prometheus()
+            except Exception as e:
+                errors.append(repr(e))
+                return
+
+    thread = threading.Thread(target=scrape, daemon=True)
+    thread.start()
+    # Kaynak sayisi 1..8 arasinda degisir: isciler eklenip cikarilir
+    for i in range(reloads):
+        counts[0] = 1 + i % 8
+        supervisor.shards = None
+        supervisor.reload()
+    done.set()
+    thread.join()
+    return {"render_during_reload": not errors, "errors": errors[:1]}
+
+
+def check_stand_in(run_dir, base_port, seconds=6.0):
+    supervisor = Supervisor(lambda: make_sources(3), DeepStreamWorker(STAND_IN_WORKER, ["--crash-after", "2"]),
+                            2, base_port=base_port, run_dir=run_dir, base_delay=0.5, max_delay=1.0)
+    supervisor.start()
+    end = time.monotonic() + seconds
+    merged = False
+    while time.monotonic() < end:
+        time.sleep(0.25)
+        supervisor.check()
+        # Isciler cokup yeniden basladigi icin birlesik metrik en az bir kez gorulmeli
+        merged |= '{worker="0",stream=' in supervisor.render_prometheus()
+    supervisor.stop()
+    return {"stand_in_restarted": supervisor.restarts >= 2, "stand_in_metrics_merged": merged}
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as run_dir:
+        checks = {
+            "plan_shards": check_plan_shards(),
+            "merge_prometheus": check_merge_prometheus(),
+            "backoff": check_backoff(os.path.join(run_dir, "backoff")),
+            "concurrency": check_render_during_reload(os.path.join(run_dir, "reload")),
+        }
+        if args.stand_in:
+            checks["stand_in"] = check_stand_in(os.path.join(run_dir, "stand_in"), args.base_port)
+    failed = ["%s.%s" % (group, name) for group, results in checks.items()
+              for name, ok in results.items() if ok is False]
+    report = {"benchmark": "supervisor_check", "schema": 1, "checks": checks, "failed": failed}
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(parse_args()))
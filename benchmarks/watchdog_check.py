@@ -0,0 +1,277 @@
+"""Checks of the per-source watchdog, without GPU or GStreamer.
+
+Drives common.watchdog.SourceWatchdog with a fake SourceManager, a fake
+clock and recorded timers (no GLib main loop runs): the backoff and
+jitter bounds, stall detection, the restart_source calls, recovery and
+the attempt reset, and EOS handling. gi is replaced by the
+common.fake_pyds stub when it is missing. Reports every check; the exit
+code is non-zero if one fails:
+
+    python3 benchmarks/watchdog_check.py
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common import fake_pyds
+
+fake_pyds.install()
+
+from gi.repository import Gst  # noqa: E402
+
+from common.metrics import MetricsRegistry  # noqa: E402
+from common.watchdog import SourceWatchdog  # noqa: E402
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="SourceWatchdog backoff / stall / restart checks")
+    parser.add_argument("--jitter-samples", type=int, default=2000, help="Random delays drawn per attempt")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default=None, help="JSON output file (default: stdout)")
+    return parser.parse_args()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FixedRandom:
+    def __init__(self, value):
+        self.value = value
+
+    def random(self):
+        return self.value
+
+
+class FakeTimers:
+    """Records timeout_add / idle_add calls; fire() runs them like the main loop would."""
+
+    def __init__(self):
+        self.pending = []
+        self.delays = []
+
+    def timeout_add(self, delay_ms, callback, *args):
+        self.delays.append(delay_ms)
+        self.pending.append((callback, args))
+        return len(self.delays)
+
+    def idle_add(self, callback, *args):
+        self.pending.append((callback, args))
+        return 0
+
+    def fire(self):
+        pending, self.pending = self.pending, []
+        for callback, args in pending:
+            callback(*args)
+        return len(pending)
+
+
+class FakePad:
+    def __init__(self):
+        self.probes = []
+
+    def add_probe(self, probe_type, callback, data):
+        self.probes.append((probe_type, callback, data))
+        return len(self.probes)
+
+
+class FakeBin:
+    def __init__(self):
+        self.pad = FakePad()
+
+    def get_static_pad(self, name):
+        return self.pad if name == "src" else None
+
+
+class FakeEvent:
+    def __init__(self, event_type):
+        self.type = event_type
+
+
+class FakeEventInfo:
+    def __init__(self, event_type):
+        self.event = FakeEvent(event_type)
+
+    def get_event(self):
+        return self.event
+
+
+class FakeManager:
+    """SourceManager stand-in: restart_source rebuilds the bin and runs on_added, or fails on demand."""
+
+    def __init__(self, count):
+        self.sources = {index: ("file:///cam%d.mp4" % index, FakeBin()) for index in range(count)}
+        self.on_added = []
+        self.on_removed = []
+        self.restarts = []
+        self.failures = 0
+
+    def restart_source(self, index, uri):
+        self.restarts.append((index, uri))
+        if self.failures:
+            self.failures -= 1
+            return None
+        source_bin = FakeBin()
+        self.sources[index] = (uri, source_bin)
+        for callback in self.on_added:
+            callback(index, source_bin)
+        return source_bin
+
+    def remove_source(self, index):
+        self.sources.pop(index)
+        for callback in self.on_removed:
+            callback(index)
+
+
+class Rig:
+    def __init__(self, count=2, rng=None, **kwargs):
+        self.clock = FakeClock()
+        self.timers = FakeTimers()
+        self.manager = FakeManager(count)
+        self.metrics = MetricsRegistry()
+        self.frames = {}
+        self.watchdog = SourceWatchdog(self.manager, self.frames.get, metrics=self.metrics, clock=self.clock,
+                                       rng=rng or FixedRandom(0.5), timeout_add=self.timers.timeout_add,
+                                       idle_add=self.timers.idle_add, **kwargs)
+
+    def advance(self, seconds, fresh=()):
+        """Move the clock; sources in fresh delivered a frame just now."""
+        self.clock.now += seconds
+        for index in fresh:
+            self.frames[index] = self.clock.now
+        return self.watchdog.check()
+
+    def counter(self, name, index):
+        return self.metrics.counters.get((name, (("source", index),)), 0)
+
+    def gauge(self, name, index):
+        return self.metrics.gauges.get((name, (("source", index),)))
+
+
+def check_backoff(samples, seed):
+    watchdog = Rig(base_delay=1.0, max_delay=60.0, jitter=0.3).watchdog
+    # rng 0.5: jitter carpani tam 1, saf ustel geri cekilme
+    delays = [watchdog.delay(attempts) for attempts in range(8)]
+    results = {"doubles_then_caps": delays == [1.0, 2.0, 4.0, 8.0, 16.0, 32.0, 60.0, 60.0]}
+    watchdog.rng = FixedRandom(0.0)
+    low = watchdog.delay(3)
+    watchdog.rng = FixedRandom(1.0)
+    high = watchdog.delay(3)
+    results["jitter_extremes"] = abs(low - 8.0 * 0.7) < 1e-9 and abs(high - 8.0 * 1.3) < 1e-9
+    watchdog.rng = random.Random(seed)
+    in_bounds = True
+    spread = []
+    for attempts in range(8):
+        nominal = min(60.0, 2.0 ** attempts)
+        drawn = [watchdog.delay(attempts) for _ in range(samples)]
+        in_bounds &= all(nominal * 0.7 <= delay <= nominal * 1.3 for delay in drawn)
+        spread.append((min(drawn) / nominal, max(drawn) / nominal))
+    results["jitter_in_bounds"] = in_bounds
+    # Ayni anda dusen kaynaklar ayni anda yeniden baglanmasin: aralik gercekten kullaniliyor
+    results["jitter_spreads"] = all(low < 0.75 and high > 1.25 for low, high in spread)
+    results["no_jitter_is_exact"] = Rig(jitter=0.0, rng=random.Random(seed)).watchdog.delay(2) == 4.0
+    return results
+
+
+def check_stall_and_restart():
+    rig = Rig(count=2, stall_timeout=10.0, base_delay=1.0, jitter=0.0, stable_seconds=30.0)
+    results = {}
+    rig.advance(5.0, fresh=(0, 1))
+    rig.advance(5.0, fresh=(0,))
+    results["quiet_within_timeout"] = rig.timers.delays == [] and rig.manager.restarts == []
+    # Kaynak 1'in son karesi t=5'te: t=15.5'te stall_timeout asildi
+    rig.advance(5.5, fresh=(0,))
+    results["stall_detected"] = rig.timers.delays == [1000] and rig.watchdog.states[1].restart_pending
+    results["other_source_untouched"] = not rig.watchdog.states[0].restart_pending
+    results["marked_down"] = rig.gauge("source_up", 1) == 0 and rig.gauge("source_up", 0) == 1
+    rig.advance(5.0, fresh=(0,))
+    results["single_restart_pending"] = rig.timers.delays == [1000]
+
+    # Ilk deneme basarisiz: ayni URI ile tekrar, bir sonraki gecikme iki katina cikar
+    rig.manager.failures = 1
+    rig.timers.fire()
+    results["restart_source_called"] = rig.manager.restarts == [(1, "file:///cam1.mp4")]
+    results["failed_restart_backs_off"] = rig.timers.delays == [1000, 2000]
+    rig.clock.now += 2.0
+    rig.timers.fire()
+    results["restart_retried"] = rig.manager.restarts == [(1, "file:///cam1.mp4")] * 2
+    results["reconnects_counted"] = rig.counter("source_reconnects_total", 1) == 2
+    state = rig.watchdog.states[1]
+    new_pad = rig.manager.sources[1][1].pad
+    results["rebuilt_bin_watched"] = not state.restart_pending and state.started == rig.clock.now \
+        and len(new_pad.probes) == 1 and new_pad.probes[0][0] == Gst.PadProbeType.EVENT_DOWNSTREAM
+
+    # Yeni kare gelince kaynak ayakta sayilir; deneme sayaci ancak stable_seconds sonra sifirlanir
+    down_since = state.down_since
+    rig.advance(1.0, fresh=(0, 1))
+    results["recovered"] = state.down_since is None and rig.gauge("source_up", 1) == 1
+    downtime = rig.counter("source_downtime_seconds_total", 1)
+    results["downtime_counted"] = abs(downtime - (rig.clock.now - down_since)) < 1e-9
+    results["attempts_kept_while_unstable"] = state.attempts == 2
+    for _ in range(31):
+        rig.advance(1.0, fresh=(0, 1))
+    results["attempts_reset_when_stable"] = state.attempts == 0
+
+    # Restart sirasinda kaldirilan kaynak yeniden baslatilmaz
+    rig.advance(11.0, fresh=(0,))
+    rig.manager.remove_source(1)
+    restarts = len(rig.manager.restarts)
+    rig.timers.fire()
+    results["removed_not_restarted"] = len(rig.manager.restarts) == restarts and 1 not in rig.watchdog.states
+    return results
+
+
+def check_eos():
+    rig = Rig(count=1, jitter=0.0)
+    pad = rig.manager.sources[0][1].pad
+    probe_type, probe, index = pad.probes[0]
+    results = {
+        "other_events_pass": probe(pad, FakeEventInfo(0), index) == Gst.PadProbeReturn.OK,
+        "eos_dropped": probe(pad, FakeEventInfo(Gst.EventType.EOS), index) == Gst.PadProbeReturn.DROP,
+    }
+    # EOS akis is parcaciginda: yeniden baslatma ana donguye (idle_add) birakilir
+    results["reported_on_main_loop"] = rig.timers.delays == [] and rig.timers.fire() == 1
+    results["restart_scheduled"] = rig.timers.delays == [1000]
+    rig.timers.fire()
+    results["restarted"] = rig.manager.restarts == [(0, "file:///cam0.mp4")]
+    rig.watchdog.stop()
+    pad = rig.manager.sources[0][1].pad
+    results["eos_passes_after_stop"] = pad.probes[0][1](
+        pad, FakeEventInfo(Gst.EventType.EOS), 0) == Gst.PadProbeReturn.OK
+    results["check_stops"] = rig.advance(100.0) is False
+    no_eos = Rig(count=1, restart_on_eos=False)
+    results["restart_on_eos_off"] = no_eos.manager.sources[0][1].pad.probes == []
+    return results
+
+
+def main(args):
+    # Watchdog'un "recovered" satirlari JSON raporuna karismasin
+    with contextlib.redirect_stdout(sys.stderr):
+        checks = {
+            "backoff": check_backoff(args.jitter_samples, args.seed),
+            "stall_restart": check_stall_and_restart(),
+            "eos": check_eos(),
+        }
+    failed = ["%s.%s" % (group, name) for group, results in checks.items()
+              for name, ok in results.items() if ok is False]
+    report = {"benchmark": "watchdog_check", "schema": 1, "checks": checks, "failed": failed}
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(parse_args()))
@@ -16,10 +16,10 @@
 ################################################################################
 
 import time
-from threading import Lock
 start_time=time.time()
 
-fps_mutex = Lock()
+# frame_count is only written by the streaming thread; get_fps() reads the
+# delta since its previous call instead of resetting it, so no lock is needed.
 
 class GETFPS:
     def __init__(self,stream_id):
@@ -27,6 +27,7 @@ class GETFPS:
         self.start_time=start_time
         self.is_first=True
         self.frame_count=0
+        self.last_count=0
         self.stream_id=stream_id
 
     def update_fps(self):
@@ -35,15 +36,13 @@ class GETFPS:
             self.start_time = end_time
             self.is_first = False
         else:
-            global fps_mutex
-            with fps_mutex:
-                self.frame_count = self.frame_count + 1
+            self.frame_count = self.frame_count + 1
 
     def get_fps(self):
         end_time = time.time()
-        with fps_mutex:
-            stream_fps = float(self.frame_count/(end_time - self.start_time))
-            self.frame_count = 0
+        frame_count = self.frame_count
+        stream_fps = float((frame_count - self.last_count)/(end_time - self.start_time))
+        self.last_count = frame_count
         self.start_time = end_time
         return round(stream_fps, 2)
 
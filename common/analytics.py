@@ -0,0 +1,337 @@
+import json
+import os
+import sys
+import time
+from collections import deque
+from threading import Event, Thread
+
+QUEUE_CAPACITY = 256
+EXIT_AFTER_FRAMES = 30
+FLUSH_INTERVAL = 1.0
+PARQUET_COLUMNS = ("type", "ts", "source", "frame", "object_id", "class_id", "label")
+
+
+class AnalyticsBatch:
+    """Copy of the object columns of one batch, safe to use on another thread."""
+
+    __slots__ = ("timestamp", "frame_pad_index", "frame_frame_num",
+                 "pad_index", "frame_num", "object_id", "class_id", "rect")
+
+    def __init__(self, timestamp, frame_pad_index, frame_frame_num, pad_index, frame_num,
+                 object_id, class_id, rect):
+        self.timestamp = timestamp
+        self.frame_pad_index = frame_pad_index
+        self.frame_frame_num = frame_frame_num
+        self.pad_index = pad_index
+        self.frame_num = frame_num
+        self.object_id = object_id
+        self.class_id = class_id
+        self.rect = rect
+
+
+class AnalyticsQueue:
+    """Bounded single-producer handoff from the streaming thread.
+
+    put() is one deque append of copied columns: its cost does not depend
+    on how slow the consumer is. When the queue is full the oldest batch is
+    discarded (deque maxlen) and counted in dropped. The consumer polls;
+    the producer never takes a lock or signals.
+    """
+
+    def __init__(self, capacity=QUEUE_CAPACITY):
+        self.capacity = capacity
+        self.items = deque(maxlen=capacity)
+        self.enqueued = 0
+        self.dropped = 0
+
+    def put(self, item):
+        if len(self.items) >= self.capacity:
+            self.dropped += 1
+        self.items.append(item)
+        self.enqueued += 1
+
+    def put_columns(self, columns, timestamp=None):
+        """Queue the object columns of a BatchColumns (the arrays are copied)."""
+        n = columns.num_objects
+        f = columns.num_frames
+        self.put(AnalyticsBatch(
+            time.time() if timestamp is None else timestamp,
+            columns.frame_pad_index[:f].copy(), columns.frame_frame_num[:f].copy(),
+            columns.pad_index[:n].copy(), columns.frame_num[:n].copy(),
+            columns.object_id[:n].copy(), columns.class_id[:n].copy(), columns.rect[:n].copy()))
+
+    def drain(self, limit=None):
+        items = []
+        while self.items and (limit is None or len(items) < limit):
+            try:
+                items.append(self.items.popleft())
+            except IndexError:
+                break
+        return items
+
+
+class _StreamState:
+    def __init__(self):
+        self.last_seen = {}
+        self.class_of = {}
+        self.entered = {}
+
+
+class EventDetector:
+    """Turns per-batch object columns into enter/exit events and class counts.
+
+    An object enters when its id is first seen on a stream and exits when
+    it has not been seen for exit_after frames of that stream. Runs on the
+    consumer side only.
+    """
+
+    def __init__(self, exit_after=EXIT_AFTER_FRAMES, labels=None):
+        self.exit_after = exit_after
+        self.labels = labels
+        self.streams = {}
+
+    def label(self, class_id):
+        if self.labels and 0 <= class_id < len(self.labels):
+            return self.labels[class_id]
+        return str(class_id)
+
+    def _event(self, kind, timestamp, pad_index, frame_num, object_id, class_id, rect=None):
+        event = {"type": kind, "ts": timestamp, "source": pad_index, "frame": frame_num,
+                 "object_id": object_id, "class_id": class_id, "label": self.label(class_id)}
+        if rect is not None:
+            event["bbox"] = [round(v, 1) for v in rect]
+        return event
+
+    def process(self, batch):
+        """Return (events, counts) where counts is {pad_index: {class_id: objects in frame}}.
+
+        Every frame of the batch has an entry in counts, even without objects.
+        """
+        events = []
+        counts = {pad_index: {} for pad_index in batch.frame_pad_index.tolist()}
+        ts = batch.timestamp
+        pad_indices = batch.pad_index.tolist()
+        frame_nums = batch.frame_num.tolist()
+        object_ids = batch.object_id.tolist()
+        class_ids = batch.class_id.tolist()
+        rects = batch.rect.tolist()
+        for i, pad_index in enumerate(pad_indices):
+            state = self.streams.get(pad_index)
+            if state is None:
+                state = self.streams[pad_index] = _StreamState()
+            object_id, class_id, frame_num = object_ids[i], class_ids[i], frame_nums[i]
+            if object_id not in state.last_seen:
+                events.append(self._event("enter", ts, pad_index, frame_num, object_id, class_id, rects[i]))
+                state.entered[class_id] = state.entered.get(class_id, 0) + 1
+            state.last_seen[object_id] = frame_num
+            state.class_of[object_id] = class_id
+            frame_counts = counts.setdefault(pad_index, {})
+            frame_counts[class_id] = frame_counts.get(class_id, 0) + 1
+
+        for pad_index, frame_num in zip(batch.frame_pad_index.tolist(), batch.frame_frame_num.tolist()):
+            if pad_index in self.streams:
+                events.extend(self._expire(ts, pad_index, frame_num))
+        return events, counts
+
+    def _expire(self, ts, pad_index, frame_num):
+        state = self.streams[pad_index]
+        gone = [object_id for object_id, seen in state.last_seen.items()
+                if frame_num - seen > self.exit_after]
+        events = []
+        for object_id in gone:
+            events.append(self._event("exit", ts, pad_index, state.last_seen.pop(object_id),
+                                      object_id, state.class_of.pop(object_id)))
+        return events
+
+    def drop_source(self, pad_index, timestamp=None):
+        """Exit every live object of a removed source."""
+        state = self.streams.pop(pad_index, None)
+        if state is None:
+            return []
+        ts = time.time() if timestamp is None else timestamp
+        return [self._event("exit", ts, pad_index, seen, object_id, state.class_of[object_id])
+                for object_id, seen in state.last_seen.items()]
+
+    def totals(self):
+        """{pad_index: {label: objects entered so far}}."""
+        return {pad_index: {self.label(c): n for c, n in state.entered.items()}
+                for pad_index, state in self.streams.items()}
+
+
+class JsonlWriter:
+    """Appends records as JSON lines, rotating by size or age."""
+
+    extension = "jsonl"
+
+    def __init__(self, directory, prefix="events", max_bytes=64 * 1024 * 1024, max_seconds=3600):
+        self.directory = directory
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.file = None
+        self.path = None
+        self.opened = 0
+        self.written = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _new_path(self):
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(self.directory, "%s-%s.%s" % (self.prefix, stamp, self.extension))
+        n = 1
+        while os.path.exists(path):
+            path = os.path.join(self.directory, "%s-%s-%d.%s" % (self.prefix, stamp, n, self.extension))
+            n += 1
+        return path
+
+    def _should_rotate(self):
+        return self.file is None or self.written >= self.max_bytes \
+            or time.monotonic() - self.opened >= self.max_seconds
+
+    def write(self, records):
+        if not records:
+            return
+        if self._should_rotate():
+            self.close()
+            self.path = self._new_path()
+            self.file = open(self.path, "w")
+            self.opened = time.monotonic()
+            self.written = 0
+        # Tek write cagrisi ile toplu yazim
+        data = "".join(json.dumps(record, separators=(",", ":")) + "\n" for record in records)
+        self.file.write(data)
+        self.file.flush()
+        self.written += len(data)
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+
+class ParquetWriter(JsonlWriter):
+    """Writes each flush as a row group of a Parquet file; needs pyarrow."""
+
+    extension = "parquet"
+
+    def __init__(self, *args, **kwargs):
+        # pyarrow sadece Parquet secilince yuklenir (baslangic suresi)
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("pyarrow is required for Parquet output")
+        self.pyarrow = pyarrow
+        self.schema = pyarrow.schema([
+            ("type", pyarrow.string()), ("ts", pyarrow.float64()), ("source", pyarrow.int32()),
+            ("frame", pyarrow.int64()), ("object_id", pyarrow.uint64()), ("class_id", pyarrow.int32()),
+            ("label", pyarrow.string()), ("data", pyarrow.string()),
+        ])
+        super().__init__(*args, **kwargs)
+
+    def write(self, records):
+        if not records:
+            return
+        if self._should_rotate():
+            self.close()
+            self.path = self._new_path()
+            self.opened = time.monotonic()
+            self.written = 0
+        columns = {name: [record.get(name) for record in records] for name in PARQUET_COLUMNS}
+        # Kayit tipine gore degisen alanlar (bbox, entered) JSON metni olarak tutulur
+        columns["data"] = [json.dumps({k: v for k, v in record.items() if k not in PARQUET_COLUMNS})
+                           for record in records]
+        table = self.pyarrow.Table.from_pydict(columns, schema=self.schema)
+        if self.file is None:
+            self.file = self.pyarrow.parquet.ParquetWriter(self.path, self.schema)
+        self.file.write_table(table)
+        self.written += table.nbytes
+
+
+class AnalyticsWorker:
+    """Consumes an AnalyticsQueue on a daemon thread.
+
+    Every flush_interval seconds the queue is drained, events are detected
+    and written in one bulk write, and per-class counts are published as
+    gauges to an optional MetricsRegistry. Queue drops are published as
+    analytics_dropped_batches_total. Records of event_sources (objects
+    with drain_events(), e.g. common.zones.ZoneEngine) are written along.
+    """
+
+    def __init__(self, queue, writer, detector=None, metrics=None, flush_interval=FLUSH_INTERVAL,
+                 counts_interval=10.0, event_sources=()):
+        self.queue = queue
+        self.event_sources = list(event_sources)
+        self.writer = writer
+        self.detector = detector or EventDetector()
+        self.metrics = metrics
+        self.flush_interval = flush_interval
+        self.counts_interval = counts_interval
+        self.pending_drops = deque()
+        self.stopping = Event()
+        self.thread = None
+        self.events_written = 0
+        self.last_counts = 0.0
+        self.reported_dropped = 0
+        self.published = {}
+
+    def start(self):
+        self.thread = Thread(target=self._run, name="analytics", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        self.stopping.set()
+        if self.thread:
+            self.thread.join(timeout)
+        self.writer.close()
+
+    def drop_source(self, pad_index):
+        # Herhangi bir thread'den cagrilabilir; isleme worker'da yapilir
+        self.pending_drops.append(pad_index)
+
+    def _run(self):
+        while not self.stopping.wait(self.flush_interval):
+            self.flush()
+        self.flush()
+
+    def flush(self):
+        records = []
+        counts = {}
+        for batch in self.queue.drain():
+            events, batch_counts = self.detector.process(batch)
+            records.extend(events)
+            counts.update(batch_counts)
+        while self.pending_drops:
+            records.extend(self.detector.drop_source(self.pending_drops.popleft()))
+        for source in self.event_sources:
+            records.extend(source.drain_events())
+
+        now = time.time()
+        if now - self.last_counts >= self.counts_interval and self.detector.streams:
+            self.last_counts = now
+            for pad_index, totals in self.detector.totals().items():
+                records.append({"type": "counts", "ts": now, "source": pad_index, "entered": totals})
+        try:
+            self.writer.write(records)
+            self.events_written += len(records)
+        except (OSError, ValueError) as e:
+            sys.stderr.write("Analytics write failed: %s\n" % e)
+        self._publish(counts)
+        return len(records)
+
+    def _publish(self, counts):
+        if not self.metrics:
+            return
+        for pad_index, class_counts in counts.items():
+            # Karede artik olmayan siniflar 0'a cekilir
+            for class_id in self.published.get(pad_index, set()) - set(class_counts):
+                self.metrics.set_gauge("objects_in_frame", 0, source=pad_index,
+                                       label=self.detector.label(class_id))
+            for class_id, count in class_counts.items():
+                self.metrics.set_gauge("objects_in_frame", count, source=pad_index,
+                                       label=self.detector.label(class_id))
+            self.published[pad_index] = set(class_counts)
+        dropped = self.queue.dropped
+        if dropped > self.reported_dropped:
+            self.metrics.inc("analytics_dropped_batches_total", dropped - self.reported_dropped)
+            self.reported_dropped = dropped
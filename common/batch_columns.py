@@ -0,0 +1,170 @@
+import numpy as np
+
+
+class BatchColumns:
+    """Columnar view of one NvDsBatchMeta.
+
+    Object columns are indexed by object row; frame columns are indexed by
+    the frame position in the batch, and objects of frame i are the rows
+    frame_start[i]:frame_start[i + 1]. Arrays are views into buffers owned
+    by the extractor and are overwritten by the next extract() call.
+    """
+
+    def __init__(self):
+        self.num_objects = 0
+        self.num_frames = 0
+        # Object columns
+        self.pad_index = None
+        self.frame_num = None
+        self.class_id = None
+        self.object_id = None
+        self.confidence = None
+        self.rect = None
+        self.frame_row = None
+        self.objects = []
+        # Frame columns
+        self.frame_pad_index = None
+        self.frame_frame_num = None
+        self.frame_start = None
+        self.frames = []
+
+    def frame_slice(self, i):
+        return slice(int(self.frame_start[i]), int(self.frame_start[i + 1]))
+
+    def rect_int(self):
+        """Rects truncated to int the same way the probes used int()."""
+        return self.rect.astype(np.int64)
+
+    def center(self):
+        rect = self.rect_int()
+        return rect[:, 0] + rect[:, 2] // 2, rect[:, 1] + rect[:, 3] // 2
+
+    def bottom_center(self):
+        rect = self.rect_int()
+        return (rect[:, 0] + rect[:, 2] / 2).astype(np.int64), rect[:, 1] + rect[:, 3]
+
+
+class BatchMetaExtractor:
+    """Turns a batch's frame/object meta lists into NumPy columns.
+
+    The list walk happens once here; everything downstream can work on the
+    arrays. Buffers grow geometrically and are reused between batches.
+    The pyds module is injected, so common.fake_pyds can be used instead.
+    """
+
+    def __init__(self, backend, initial_objects=256, initial_frames=16):
+        self.pyds = backend
+        self.columns = BatchColumns()
+        self._alloc_objects(initial_objects)
+        self._alloc_frames(initial_frames)
+
+    def _alloc_objects(self, capacity):
+        self.object_capacity = capacity
+        self._pad_index = np.zeros(capacity, dtype=np.int32)
+        self._frame_num = np.zeros(capacity, dtype=np.int64)
+        self._class_id = np.zeros(capacity, dtype=np.int32)
+        self._object_id = np.zeros(capacity, dtype=np.uint64)
+        self._confidence = np.zeros(capacity, dtype=np.float32)
+        self._rect = np.zeros((capacity, 4), dtype=np.float32)
+        self._frame_row = np.zeros(capacity, dtype=np.int32)
+
+    def _grow_objects(self, needed):
+        old = (self._pad_index, self._frame_num, self._class_id, self._object_id,
+               self._confidence, self._rect, self._frame_row)
+        count = self.object_capacity
+        capacity = count
+        while capacity < needed:
+            capacity *= 2
+        self._alloc_objects(capacity)
+        new = (self._pad_index, self._frame_num, self._class_id, self._object_id,
+               self._confidence, self._rect, self._frame_row)
+        for src, dst in zip(old, new):
+            dst[:count] = src
+
+    def _alloc_frames(self, capacity):
+        self.frame_capacity = capacity
+        self._frame_pad_index = np.zeros(capacity, dtype=np.int32)
+        self._frame_frame_num = np.zeros(capacity, dtype=np.int64)
+        self._frame_start = np.zeros(capacity + 1, dtype=np.int64)
+
+    def _grow_frames(self):
+        old = (self._frame_pad_index, self._frame_frame_num, self._frame_start)
+        count = self.frame_capacity
+        self._alloc_frames(count * 2)
+        for src, dst in zip(old, (self._frame_pad_index, self._frame_frame_num, self._frame_start)):
+            dst[:len(src)] = src
+
+    def extract(self, batch_meta):
+        pyds = self.pyds
+        columns = self.columns
+        objects = columns.objects
+        frames = columns.frames
+        objects.clear()
+        frames.clear()
+
+        n = 0
+        f = 0
+        l_frame = batch_meta.frame_meta_list
+        while l_frame is not None:
+            try:
+                frame_meta = pyds.NvDsFrameMeta.cast(l_frame.data)
+            except StopIteration:
+                break
+
+            if f >= self.frame_capacity:
+                self._grow_frames()
+            pad_index = frame_meta.pad_index
+            frame_num = frame_meta.frame_num
+            self._frame_pad_index[f] = pad_index
+            self._frame_frame_num[f] = frame_num
+            self._frame_start[f] = n
+            frames.append(frame_meta)
+
+            l_obj = frame_meta.obj_meta_list
+            while l_obj is not None:
+                try:
+                    obj_meta = pyds.NvDsObjectMeta.cast(l_obj.data)
+                except StopIteration:
+                    break
+
+                if n >= self.object_capacity:
+                    self._grow_objects(n + 1)
+                rect = obj_meta.rect_params
+                self._pad_index[n] = pad_index
+                self._frame_num[n] = frame_num
+                self._class_id[n] = obj_meta.class_id
+                self._object_id[n] = obj_meta.object_id
+                self._confidence[n] = obj_meta.confidence
+                self._rect[n] = (rect.left, rect.top, rect.width, rect.height)
+                self._frame_row[n] = f
+                objects.append(obj_meta)
+                n += 1
+
+                try:
+                    l_obj = l_obj.next
+                except StopIteration:
+                    break
+
+            f += 1
+            try:
+                l_frame = l_frame.next
+            except StopIteration:
+                break
+
+        if f >= self.frame_capacity:
+            self._grow_frames()
+        self._frame_start[f] = n
+
+        columns.num_objects = n
+        columns.num_frames = f
+        columns.pad_index = self._pad_index[:n]
+        columns.frame_num = self._frame_num[:n]
+        columns.class_id = self._class_id[:n]
+        columns.object_id = self._object_id[:n]
+        columns.confidence = self._confidence[:n]
+        columns.rect = self._rect[:n]
+        columns.frame_row = self._frame_row[:n]
+        columns.frame_pad_index = self._frame_pad_index[:f]
+        columns.frame_frame_num = self._frame_frame_num[:f]
+        columns.frame_start = self._frame_start[:f + 1]
+        return columns
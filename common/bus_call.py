@@ -20,7 +20,8 @@ import sys
 gi.require_version('Gst', '1.0')
 from gi.repository import Gst
 
-def bus_call(bus, message, loop):
+def bus_call(bus, message, loop, watchdog=None):
+    # With a watchdog, errors of a single source-bin restart only that source
     t = message.type
     if t == Gst.MessageType.EOS:
         sys.stdout.write("End-of-stream\n")
@@ -29,7 +30,29 @@ def bus_call(bus, message, loop):
         err, debug = message.parse_warning()
         sys.stderr.write("Warning: %s: %s\n" % (err, debug))
     elif t == Gst.MessageType.ERROR:
+        if watchdog is not None and watchdog.handle_error(message):
+            return True
         err, debug = message.parse_error()
         sys.stderr.write("Error: %s: %s\n" % (err, debug))
         loop.quit()
-    return True
\ No newline at end of file
+    return True
+
+
+def stop_pipeline(pipeline, timeout=5.0, eos_received=False):
+    """Send EOS, wait for it (or an error) on the bus, then set the pipeline to NULL.
+
+    The muxers only write their index / trailer on EOS; going straight to
+    NULL leaves the recorded MKV files unfinalized. Pass eos_received when
+    the main loop already stopped on EOS.
+    """
+    if not eos_received and pipeline.get_state(0)[1] in (Gst.State.PLAYING, Gst.State.PAUSED):
+        pipeline.send_event(Gst.Event.new_eos())
+        message = pipeline.get_bus().timed_pop_filtered(
+            int(timeout * Gst.SECOND), Gst.MessageType.EOS | Gst.MessageType.ERROR)
+        if message is None:
+            sys.stderr.write("Warning: no EOS within %.1f s, outputs may be incomplete\n" % timeout)
+        elif message.type == Gst.MessageType.ERROR:
+            err, debug = message.parse_error()
+            sys.stderr.write("Error while draining: %s: %s\n" % (err, debug))
+    pipeline.set_state(Gst.State.NULL)
+
@@ -0,0 +1,128 @@
+MAX_ELEMENTS_IN_DISPLAY_META = 16
+
+
+class DisplayMetaPacker:
+    """Collects OSD primitives of one frame and packs them densely.
+
+    Circles, lines and labels of all objects in a frame are buffered and
+    written at flush() into as few NvDsDisplayMeta blocks as possible,
+    each one filled up to MAX_ELEMENTS_IN_DISPLAY_META per primitive type.
+    The pyds module is passed in so the packer also runs against
+    common.fake_pyds.
+    """
+
+    def __init__(self, backend, polyline=False, circle_radius=3, line_width=2,
+                 capacity=MAX_ELEMENTS_IN_DISPLAY_META):
+        self.pyds = backend
+        self.polyline = polyline
+        self.circle_radius = circle_radius
+        self.line_width = line_width
+        self.capacity = capacity
+
+        self.batch_meta = None
+        self.frame_meta = None
+        self.circles = []
+        self.lines = []
+        self.labels = []
+
+        # Counters over the lifetime of the packer
+        self.frames = 0
+        self.acquired = 0
+        self.primitives = 0
+
+    def begin(self, batch_meta, frame_meta):
+        self.batch_meta = batch_meta
+        self.frame_meta = frame_meta
+        self.circles.clear()
+        self.lines.clear()
+        self.labels.clear()
+
+    def add_circle(self, xc, yc, color, radius=None):
+        self.circles.append((xc, yc, self.circle_radius if radius is None else radius, color))
+
+    def add_line(self, x1, y1, x2, y2, color, width=None):
+        self.lines.append((x1, y1, x2, y2, self.line_width if width is None else width, color))
+
+    def add_text(self, text, x, y, font_size, font_color, bg_color=None, font_name="Serif"):
+        self.labels.append((text, x, y, font_size, font_color, bg_color, font_name))
+
+    def add_trail(self, points, color):
+        """Add a trail as dots, or as connected segments in polyline mode.
+
+        Points with a non-positive coordinate are skipped, as before.
+        """
+        points = [(int(x), int(y)) for x, y in points if x > 0 and y > 0]
+        if self.polyline:
+            for (x1, y1), (x2, y2) in zip(points, points[1:]):
+                self.add_line(x1, y1, x2, y2, color)
+        else:
+            for x, y in points:
+                self.add_circle(x, y, color)
+
+    def pending(self):
+        return len(self.circles) + len(self.lines) + len(self.labels)
+
+    def blocks_needed(self):
+        capacity = self.capacity
+        return max(-(-len(self.circles) // capacity),
+                   -(-len(self.lines) // capacity),
+                   -(-len(self.labels) // capacity))
+
+    def flush(self):
+        """Write the buffered primitives to the frame; returns metas used."""
+        pyds = self.pyds
+        capacity = self.capacity
+        blocks = self.blocks_needed()
+
+        for block in range(blocks):
+            start = block * capacity
+            display_meta = pyds.nvds_acquire_display_meta_from_pool(self.batch_meta)
+
+            circles = self.circles[start:start + capacity]
+            for i, (xc, yc, radius, color) in enumerate(circles):
+                params = display_meta.circle_params[i]
+                params.xc = xc
+                params.yc = yc
+                params.radius = radius
+                params.circle_color.set(*color)
+            display_meta.num_circles = len(circles)
+
+            lines = self.lines[start:start + capacity]
+            for i, (x1, y1, x2, y2, width, color) in enumerate(lines):
+                params = display_meta.line_params[i]
+                params.x1 = x1
+                params.y1 = y1
+                params.x2 = x2
+                params.y2 = y2
+                params.line_width = width
+                params.line_color.set(*color)
+            display_meta.num_lines = len(lines)
+
+            labels = self.labels[start:start + capacity]
+            for i, (text, x, y, font_size, font_color, bg_color, font_name) in enumerate(labels):
+                params = display_meta.text_params[i]
+                params.display_text = text
+                params.x_offset = x
+                params.y_offset = y
+                params.font_params.font_name = font_name
+                params.font_params.font_size = font_size
+                params.font_params.font_color.set(*font_color)
+                if bg_color is not None:
+                    params.set_bg_clr = 1
+                    params.text_bg_clr.set(*bg_color)
+            display_meta.num_labels = len(labels)
+
+            pyds.nvds_add_display_meta_to_frame(self.frame_meta, display_meta)
+
+        self.frames += 1
+        self.acquired += blocks
+        self.primitives += self.pending()
+        self.circles.clear()
+        self.lines.clear()
+        self.labels.clear()
+        return blocks
+
+    def metas_per_frame(self):
+        if not self.frames:
+            return 0.0
+        return self.acquired / self.frames
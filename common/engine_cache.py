@@ -0,0 +1,314 @@
+import fcntl
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import time
+from collections import namedtuple
+
+from common.utils import load_pgie_config, update_pgie_config
+
+ENGINE_CACHE_DIR = os.path.expanduser("~/.cache/deepstream-yolo/engines")
+
+# nvinfer network-mode -> precision name used by scripts/onnx_to_trt.sh
+NETWORK_MODE_PRECISION = {"0": "fp32", "1": "qat", "2": "fp16"}
+PRECISION_NETWORK_MODE = {precision: mode for mode, precision in NETWORK_MODE_PRECISION.items()}
+# Kopyalanan config'lerde mutlak yapilan (nvinfer'e gore goreli) yollar
+PGIE_PATH_KEYS = ("onnx-file", "model-engine-file", "labelfile-path", "custom-lib-path", "int8-calib-file")
+PRECISION_FLAGS = {"fp32": [], "fp16": ["--fp16"], "qat": ["--fp16", "--int8"]}
+
+EngineSpec = namedtuple("EngineSpec", ["onnx", "batch_size", "network_size", "precision"])
+
+
+def tensorrt_version():
+    try:
+        import tensorrt
+        return tensorrt.__version__
+    except ImportError:
+        pass
+    try:
+        output = subprocess.run(["trtexec", "--help"], capture_output=True, text=True, timeout=30).stdout
+        match = re.search(r"TensorRT\.trtexec \[TensorRT v(\d+)\]", output)
+        if match:
+            return match.group(1)
+    except (OSError, subprocess.SubprocessError):
+        pass
+    return "unknown"
+
+
+def gpu_arch(device=0):
+    try:
+        from cuda.bindings import runtime
+        result, properties = runtime.cudaGetDeviceProperties(device)
+        if result == runtime.cudaError_t.cudaSuccess:
+            return "sm_%d%d" % (properties.major, properties.minor)
+    except ImportError:
+        pass
+    try:
+        output = subprocess.run(["nvidia-smi", "--query-gpu=compute_cap", "--format=csv,noheader", "-i", str(device)],
+                                capture_output=True, text=True, timeout=30).stdout.strip()
+        if output:
+            return "sm_" + output.replace(".", "")
+    except (OSError, subprocess.SubprocessError):
+        pass
+    return "unknown"
+
+
+def platform_fingerprint():
+    return {"tensorrt": tensorrt_version(), "gpu_arch": gpu_arch()}
+
+
+class TrtexecBuilder:
+    """Builds an engine with trtexec, using the flags of scripts/onnx_to_trt.sh."""
+
+    def __init__(self, trtexec="trtexec", extra_args=("--warmUp=500", "--duration=10", "--useCudaGraph")):
+        self.trtexec = trtexec
+        self.extra_args = list(extra_args)
+
+    def __call__(self, spec, engine_path, timing_cache_path):
+        n = spec.network_size
+        command = [self.trtexec, "--onnx=%s" % spec.onnx] + PRECISION_FLAGS[spec.precision] + [
+            "--saveEngine=%s" % engine_path,
+            "--timingCacheFile=%s" % timing_cache_path,
+            "--minShapes=images:1x3x%dx%d" % (n, n),
+            "--optShapes=images:%dx3x%dx%d" % (spec.batch_size, n, n),
+            "--maxShapes=images:%dx3x%dx%d" % (spec.batch_size, n, n),
+        ] + self.extra_args
+        print("Building engine: %s" % " ".join(command))
+        subprocess.run(command, check=True)
+
+
+class EngineCache:
+    """Content-addressed TensorRT engine store.
+
+    Engines are keyed by the ONNX content hash, batch size, network size,
+    precision, TensorRT version and GPU architecture, so any change to one
+    of them selects (or builds) a different engine instead of silently
+    reusing a stale one. Builds write to a temporary file and are published
+    with an atomic rename under a per-key file lock; least recently used
+    engines are evicted beyond max_bytes / max_entries.
+    """
+
+    def __init__(self, cache_dir=ENGINE_CACHE_DIR, builder=None, fingerprint=None,
+                 max_bytes=20 * 1024 ** 3, max_entries=16):
+        self.cache_dir = cache_dir
+        self.builder = builder or TrtexecBuilder()
+        self._fingerprint = fingerprint
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @property
+    def fingerprint(self):
+        if self._fingerprint is None:
+            self._fingerprint = platform_fingerprint()
+        return self._fingerprint
+
+    def onnx_hash(self, onnx_path):
+        """SHA-256 of the ONNX file, memoized by (path, size, mtime)."""
+        stat = os.stat(onnx_path)
+        index_path = os.path.join(self.cache_dir, "onnx_hashes.json")
+        index = self._read_json(index_path) or {}
+        marker = "%s:%d:%d" % (os.path.abspath(onnx_path), stat.st_size, stat.st_mtime_ns)
+        digest = index.get(marker)
+        if digest:
+            return digest
+        sha = hashlib.sha256()
+        with open(onnx_path, "rb") as file:
+            for chunk in iter(lambda: file.read(1 << 20), b""):
+                sha.update(chunk)
+        digest = sha.hexdigest()
+        index[marker] = digest
+        self._write_json(index_path, index)
+        return digest
+
+    def key(self, spec):
+        fingerprint = self.fingerprint
+        parts = [
+            self.onnx_hash(spec.onnx)[:16],
+            "b%d" % spec.batch_size,
+            "n%d" % spec.network_size,
+            spec.precision,
+            "trt%s" % fingerprint["tensorrt"],
+            fingerprint["gpu_arch"],
+        ]
+        return "-".join(re.sub(r"[^A-Za-z0-9_.]", "_", part) for part in parts)
+
+    def engine_path(self, spec):
+        return os.path.join(self.cache_dir, self.key(spec) + ".engine")
+
+    def lookup(self, spec):
+        path = self.engine_path(spec)
+        if not os.path.exists(path):
+            return None
+        self._touch(path)
+        return path
+
+    def get_or_build(self, spec):
+        path = self.lookup(spec)
+        if path:
+            return path
+
+        path = self.engine_path(spec)
+        with open(path + ".lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                # Baska bir process ayni anda uretmis olabilir
+                if os.path.exists(path):
+                    self._touch(path)
+                    return path
+                tmp_path = "%s.tmp.%d" % (path, os.getpid())
+                timing_cache = os.path.join(self.cache_dir, "%s-%s.timing.cache" % (
+                    os.path.splitext(os.path.basename(spec.onnx))[0], spec.precision))
+                start = time.monotonic()
+                try:
+                    self.builder(spec, tmp_path, timing_cache)
+                    os.replace(tmp_path, path)
+                finally:
+                    if os.path.exists(tmp_path):
+                        os.unlink(tmp_path)
+                self._write_json(path + ".json", {
+                    "onnx": os.path.abspath(spec.onnx),
+                    "batch_size": spec.batch_size,
+                    "network_size": spec.network_size,
+                    "precision": spec.precision,
+                    "fingerprint": self.fingerprint,
+                    "build_seconds": round(time.monotonic() - start, 1),
+                    "created": time.time(),
+                })
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+        self.evict(keep=path)
+        return path
+
+    def prewarm(self, specs):
+        return [self.get_or_build(spec) for spec in specs]
+
+    def entries(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".engine"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return sorted(entries)
+
+    def metadata(self, engine_path):
+        return self._read_json(engine_path + ".json") or {}
+
+    def evict(self, keep=None):
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        removed = []
+        for _, size, path in entries:
+            if total <= self.max_bytes and len(entries) - len(removed) <= self.max_entries:
+                break
+            if path == keep:
+                continue
+            for suffix in ("", ".json", ".lock"):
+                if os.path.exists(path + suffix):
+                    os.unlink(path + suffix)
+            total -= size
+            removed.append(path)
+        return removed
+
+    def publish_to_config(self, spec, config_path, engine_path=None):
+        """Point a PGIE config at the cached engine for spec."""
+        engine_path = engine_path or self.get_or_build(spec)
+        update_pgie_config(config_path, {
+            "onnx-file": os.path.abspath(spec.onnx),
+            "model-engine-file": engine_path,
+            "batch-size": spec.batch_size,
+            "infer-dims": "3;%d;%d" % (spec.network_size, spec.network_size),
+        })
+        return engine_path
+
+    def _touch(self, path):
+        # LRU sirasi dosya mtime'i ile tutulur
+        os.utime(path, None)
+
+    @staticmethod
+    def _read_json(path):
+        try:
+            with open(path) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _write_json(path, data):
+        tmp_path = "%s.tmp.%d" % (path, os.getpid())
+        with open(tmp_path, "w") as file:
+            json.dump(data, file, indent=2)
+        os.replace(tmp_path, path)
+
+
+def spec_from_pgie_config(config_path, batch_size=None, precision=None):
+    """Build an EngineSpec from the onnx-file/infer-dims/network-mode of a PGIE config."""
+    properties = load_pgie_config(config_path)
+    dims = [int(value) for value in properties.get("infer-dims", "3;640;640").split(";")]
+    # nvinfer goreli yollari config dosyasinin dizinine gore cozer
+    onnx = os.path.join(os.path.dirname(os.path.abspath(config_path)), properties["onnx-file"])
+    return EngineSpec(
+        onnx=onnx,
+        batch_size=int(batch_size or properties.get("batch-size", 1)),
+        network_size=dims[-1],
+        precision=precision or NETWORK_MODE_PRECISION.get(properties.get("network-mode", "2"), "fp16"),
+    )
+
+
+def ensure_engine(config_path, cache, batch_size=None, directory=None):
+    """Per-batch copy of a PGIE config pointed at its cached engine (built if missing).
+
+    The given config is never rewritten, so workers and model swaps sharing
+    it do not race; copies go to directory (default: "configs" in the
+    cache directory). Returns config_path itself if its ONNX file is missing.
+    """
+    spec = spec_from_pgie_config(config_path, batch_size)
+    if not os.path.exists(spec.onnx):
+        sys.stderr.write("ONNX file not found: %s, keeping configured engine\n" % spec.onnx)
+        return config_path
+    return config_variant(config_path, directory or os.path.join(cache.cache_dir, "configs"),
+                          spec.batch_size, spec.precision, cache)
+
+
+def config_variant(config_path, directory, batch_size, precision=None, cache=None):
+    """Copy of a PGIE config for batch_size / precision, pointed at its cached engine when cache is given.
+
+    The copy is written under a temporary name and renamed into place, so
+    processes asking for the same variant never read a half-written file.
+    """
+    properties = load_pgie_config(config_path)
+    precision = precision or NETWORK_MODE_PRECISION.get(properties.get("network-mode", "2"), "fp16")
+    config_path = os.path.abspath(config_path)
+    # Ayni isimli farkli config'ler ayni kopyaya yazilmasin
+    name = "%s-%s-b%d-%s.txt" % (os.path.splitext(os.path.basename(config_path))[0],
+                                 hashlib.sha256(config_path.encode()).hexdigest()[:8], batch_size, precision)
+    path = os.path.join(directory, name)
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = "%s.tmp.%d" % (path, os.getpid())
+    shutil.copyfile(config_path, tmp_path)
+    try:
+        base = os.path.dirname(config_path)
+        updates = {key: os.path.join(base, properties[key]) for key in PGIE_PATH_KEYS
+                   if properties.get(key) and not os.path.isabs(properties[key])}
+        updates.update({"batch-size": batch_size, "network-mode": PRECISION_NETWORK_MODE[precision]})
+        update_pgie_config(tmp_path, updates)
+        if cache is not None:
+            spec = spec_from_pgie_config(tmp_path, batch_size, precision)
+            if os.path.exists(spec.onnx):
+                cache.publish_to_config(spec, tmp_path)
+            else:
+                sys.stderr.write("ONNX file not found: %s, keeping configured engine\n" % spec.onnx)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+    return path
@@ -0,0 +1,302 @@
+"""Pure-Python stand-in for the subset of pyds used by the probes.
+
+It mirrors the attribute names and list walking of the real bindings so
+that probe code, the display-meta packer and the metadata extractor can
+run on a machine without DeepStream. Objects are plain Python instances;
+cast() returns its argument unchanged.
+"""
+import sys
+import types
+import weakref
+
+MAX_ELEMENTS_IN_DISPLAY_META = 16
+
+
+class GList:
+    __slots__ = ("data", "next")
+
+    def __init__(self, data, next=None):
+        self.data = data
+        self.next = next
+
+
+def to_glist(items):
+    head = None
+    for item in reversed(items):
+        head = GList(item, head)
+    return head
+
+
+def glist_items(node):
+    while node is not None:
+        yield node.data
+        node = node.next
+
+
+class NvOSD_ColorParams:
+    def __init__(self, red=0.0, green=0.0, blue=0.0, alpha=0.0):
+        self.red = red
+        self.green = green
+        self.blue = blue
+        self.alpha = alpha
+
+    def set(self, red, green, blue, alpha):
+        self.red = red
+        self.green = green
+        self.blue = blue
+        self.alpha = alpha
+
+
+class NvOSD_FontParams:
+    def __init__(self):
+        self.font_name = ""
+        self.font_size = 0
+        self.font_color = NvOSD_ColorParams()
+
+
+class NvOSD_TextParams:
+    def __init__(self):
+        self.display_text = ""
+        self.x_offset = 0
+        self.y_offset = 0
+        self.font_params = NvOSD_FontParams()
+        self.set_bg_clr = 0
+        self.text_bg_clr = NvOSD_ColorParams()
+
+
+class NvOSD_RectParams:
+    def __init__(self, left=0.0, top=0.0, width=0.0, height=0.0):
+        self.left = left
+        self.top = top
+        self.width = width
+        self.height = height
+        self.border_width = 0
+        self.border_color = NvOSD_ColorParams()
+        self.has_bg_color = 0
+        self.bg_color = NvOSD_ColorParams()
+
+
+class NvOSD_CircleParams:
+    def __init__(self):
+        self.xc = 0
+        self.yc = 0
+        self.radius = 0
+        self.circle_color = NvOSD_ColorParams()
+        self.has_bg_color = 0
+        self.bg_color = NvOSD_ColorParams()
+
+
+class NvOSD_LineParams:
+    def __init__(self):
+        self.x1 = 0
+        self.y1 = 0
+        self.x2 = 0
+        self.y2 = 0
+        self.line_width = 0
+        self.line_color = NvOSD_ColorParams()
+
+
+class NvOSD_MaskParams:
+    def __init__(self, data=None, width=0, height=0, threshold=0.0):
+        # data is a flat float32 array of width * height, or None
+        self.data = data
+        self.width = width
+        self.height = height
+        self.threshold = threshold
+        self.size = 0 if data is None else len(data) * 4
+
+    def get_mask_array(self):
+        return self.data
+
+
+class NvDsObjectMeta:
+    def __init__(self, object_id=0, class_id=0, confidence=1.0, rect=None, label=""):
+        self.object_id = object_id
+        self.class_id = class_id
+        self.confidence = confidence
+        self.obj_label = label
+        self.rect_params = rect if rect is not None else NvOSD_RectParams()
+        self.text_params = NvOSD_TextParams()
+        self.text_params.display_text = label
+        self.mask_params = NvOSD_MaskParams()
+
+    @staticmethod
+    def cast(data):
+        return data
+
+
+class _ParamArray:
+    """Fixed-size params array whose entries are created on first access."""
+
+    __slots__ = ("factory", "items")
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.items = [None] * MAX_ELEMENTS_IN_DISPLAY_META
+
+    def __len__(self):
+        return MAX_ELEMENTS_IN_DISPLAY_META
+
+    def __getitem__(self, index):
+        item = self.items[index]
+        if item is None:
+            item = self.items[index] = self.factory()
+        return item
+
+
+class NvDsDisplayMeta:
+    def __init__(self):
+        self.num_rects = 0
+        self.num_labels = 0
+        self.num_lines = 0
+        self.num_circles = 0
+        self.num_arrows = 0
+        self.rect_params = _ParamArray(NvOSD_RectParams)
+        self.text_params = _ParamArray(NvOSD_TextParams)
+        self.line_params = _ParamArray(NvOSD_LineParams)
+        self.circle_params = _ParamArray(NvOSD_CircleParams)
+
+    @staticmethod
+    def cast(data):
+        return data
+
+
+class NvDsFrameMeta:
+    def __init__(self, pad_index=0, frame_num=0, objects=(), source_frame_width=1920,
+                 source_frame_height=1080, buf_pts=0):
+        self.pad_index = pad_index
+        self.source_id = pad_index
+        self.batch_id = 0
+        self.frame_num = frame_num
+        self.buf_pts = buf_pts
+        self.source_frame_width = source_frame_width
+        self.source_frame_height = source_frame_height
+        self.objects = list(objects)
+        self.obj_meta_list = to_glist(self.objects)
+        self.num_obj_meta = len(self.objects)
+        self.display_metas = []
+
+    @property
+    def display_meta_list(self):
+        return to_glist(self.display_metas)
+
+    @staticmethod
+    def cast(data):
+        return data
+
+
+class NvDsBatchMeta:
+    def __init__(self, frames=()):
+        self.frames = list(frames)
+        for batch_id, frame_meta in enumerate(self.frames):
+            frame_meta.batch_id = batch_id
+        self.frame_meta_list = to_glist(self.frames)
+        self.num_frames_in_batch = len(self.frames)
+        self.max_frames_in_batch = len(self.frames)
+        # Number of display metas handed out by the pool for this batch
+        self.display_meta_acquired = 0
+
+
+_batches = weakref.WeakValueDictionary()
+
+
+class FakeBuffer:
+    """Buffer whose hash resolves to a batch via gst_buffer_get_nvds_batch_meta."""
+
+    def __init__(self, batch_meta, pts=0):
+        self.batch_meta = batch_meta
+        self.pts = pts
+        _batches[hash(self)] = batch_meta
+
+
+class FakeProbeInfo:
+    def __init__(self, buffer):
+        self._buffer = buffer
+
+    def get_buffer(self):
+        return self._buffer
+
+
+def gst_buffer_get_nvds_batch_meta(buffer_hash):
+    return _batches.get(buffer_hash)
+
+
+def nvds_acquire_display_meta_from_pool(batch_meta):
+    batch_meta.display_meta_acquired += 1
+    return NvDsDisplayMeta()
+
+
+def nvds_add_display_meta_to_frame(frame_meta, display_meta):
+    frame_meta.display_metas.append(display_meta)
+
+
+def nvds_remove_obj_meta_from_frame(frame_meta, obj_meta):
+    frame_meta.objects.remove(obj_meta)
+    frame_meta.obj_meta_list = to_glist(frame_meta.objects)
+    frame_meta.num_obj_meta = len(frame_meta.objects)
+
+
+def get_string(value):
+    return value
+
+
+def make_object(object_id, class_id, left, top, width, height, confidence=1.0, label=""):
+    return NvDsObjectMeta(object_id=object_id, class_id=class_id, confidence=confidence,
+                          rect=NvOSD_RectParams(left, top, width, height), label=label)
+
+
+def make_batch(frames):
+    """Build a batch from (pad_index, frame_num, [NvDsObjectMeta, ...]) tuples."""
+    return NvDsBatchMeta(NvDsFrameMeta(pad_index, frame_num, objects)
+                         for pad_index, frame_num, objects in frames)
+
+
+class _PadProbeReturn:
+    DROP = 0
+    OK = 1
+    REMOVE = 2
+    PASS = 3
+    HANDLED = 4
+
+
+class _PadProbeType:
+    BUFFER = 1 << 4
+    EVENT_DOWNSTREAM = 1 << 6
+
+
+class _EventType:
+    EOS = 28174
+
+
+def _no_main_loop(*args):
+    raise RuntimeError("no GLib main loop in the gi stub; inject a timer instead")
+
+
+def _gst_stub():
+    gi = types.ModuleType("gi")
+    gi.require_version = lambda namespace, version: None
+    repository = types.ModuleType("gi.repository")
+    gst = types.ModuleType("gi.repository.Gst")
+    gst.PadProbeReturn = _PadProbeReturn
+    gst.PadProbeType = _PadProbeType
+    gst.EventType = _EventType
+    glib = types.ModuleType("gi.repository.GLib")
+    glib.timeout_add = glib.timeout_add_seconds = glib.idle_add = _no_main_loop
+    repository.Gst = gst
+    repository.GLib = glib
+    gi.repository = repository
+    return {"gi": gi, "gi.repository": repository, "gi.repository.Gst": gst, "gi.repository.GLib": glib}
+
+
+def install():
+    """Register this module as pyds (and a minimal gi stub if gi is missing).
+
+    Must run before probes.py is imported.
+    """
+    sys.modules["pyds"] = sys.modules[__name__]
+    try:
+        import gi
+        gi.require_version('Gst', '1.0')
+        from gi.repository import Gst  # noqa: F401
+    except (ImportError, ValueError):
+        sys.modules.update(_gst_stub())
@@ -0,0 +1,200 @@
+import os
+import shutil
+import struct
+import sys
+import time
+import zlib
+from threading import Event, Lock, Thread
+
+import numpy as np
+
+HEATMAP_CELL = 16
+HEATMAP_SOURCES = 16
+# Olcek bu degerin altina inince satir yeniden normalize edilir
+RENORMALIZE_BELOW = 1e-12
+
+
+class HeatmapAccumulator:
+    """Decaying per-stream occupancy grids of object anchor points.
+
+    Every stream owns one row of a preallocated (sources, rows, cols)
+    grid over the muxer output resolution, so memory does not depend on
+    run time or object count. A point adds one frame of dwell to its
+    cell. Decay is lazy: each row keeps a scale that is multiplied by
+    the per-frame decay, points are added divided by the scale, and the
+    true grid is stored * scale. Only when the scale gets tiny is the row
+    renormalized, so a frame costs one scatter-add, never a grid pass.
+    """
+
+    def __init__(self, frame_size=(1920, 1080), cell=HEATMAP_CELL, half_life=0, max_sources=HEATMAP_SOURCES):
+        width, height = frame_size
+        self.frame_size = frame_size
+        self.cell = cell
+        self.half_life = half_life
+        self.decay = 0.5 ** (1.0 / half_life) if half_life > 0 else 1.0
+        self.shape = ((height + cell - 1) // cell, (width + cell - 1) // cell)
+        self.grid = np.zeros((max_sources,) + self.shape, dtype=np.float64)
+        self.scale = np.ones(max_sources, dtype=np.float64)
+        self.frames = np.zeros(max_sources, dtype=np.int64)
+        self.rows = {}
+        self.free = list(range(max_sources - 1, -1, -1))
+        self.lock = Lock()
+        self.skipped = 0
+
+    def _row(self, pad_index):
+        row = self.rows.get(pad_index)
+        if row is None and self.free:
+            row = self.rows[pad_index] = self.free.pop()
+            self.grid[row] = 0.0
+            self.scale[row] = 1.0
+            self.frames[row] = 0
+        return row
+
+    def add(self, columns, xs, ys):
+        """Add the anchor points of every object of a batch (e.g. bottom centers)."""
+        frame_pads = columns.frame_pad_index[:columns.num_frames].tolist()
+        row_of = {pad_index: self._row(pad_index) for pad_index in set(frame_pads)}
+        frame_rows = np.array([row_of[pad_index] for pad_index in frame_pads if row_of[pad_index] is not None],
+                              dtype=np.int64)
+        np.add.at(self.frames, frame_rows, 1)
+        if self.decay < 1.0:
+            np.multiply.at(self.scale, frame_rows, self.decay)
+            low = frame_rows[self.scale[frame_rows] < RENORMALIZE_BELOW]
+            if len(low):
+                self._renormalize(np.unique(low))
+
+        n = columns.num_objects
+        if not n:
+            return
+        rows = np.full(n, -1, dtype=np.int64)
+        pad_index = columns.pad_index[:n]
+        for source, row in row_of.items():
+            if row is not None:
+                rows[pad_index == source] = row
+        valid = rows >= 0
+        if not valid.all():
+            self.skipped += int(n - valid.sum())
+            rows = rows[valid]
+            xs = np.asarray(xs)[valid]
+            ys = np.asarray(ys)[valid]
+        gy = np.clip(np.asarray(ys, dtype=np.int64) // self.cell, 0, self.shape[0] - 1)
+        gx = np.clip(np.asarray(xs, dtype=np.int64) // self.cell, 0, self.shape[1] - 1)
+        flat = (rows * self.shape[0] + gy) * self.shape[1] + gx
+        np.add.at(self.grid.reshape(-1), flat, 1.0 / self.scale[rows])
+
+    def _renormalize(self, rows):
+        with self.lock:
+            self.grid[rows] *= self.scale[rows][:, None, None]
+            self.scale[rows] = 1.0
+
+    def snapshot(self, pad_index):
+        """Current grid of a stream (dwell frames per cell, decayed), or None."""
+        row = self.rows.get(pad_index)
+        if row is None:
+            return None
+        with self.lock:
+            return self.grid[row] * self.scale[row]
+
+    def drop_source(self, pad_index):
+        """Forget a removed source (probes.apply_pending_drops, on the streaming thread)."""
+        row = self.rows.pop(pad_index, None)
+        if row is not None:
+            self.free.append(row)
+
+
+def write_png(path, image):
+    """Write an (h, w) or (h, w, 3) uint8 array as PNG (zlib only)."""
+    image = np.ascontiguousarray(image, dtype=np.uint8)
+    height, width = image.shape[:2]
+    color_type = 2 if image.ndim == 3 else 0
+    raw = np.zeros((height, image[0].size + 1), dtype=np.uint8)
+    raw[:, 1:] = image.reshape(height, -1)
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xffffffff)
+
+    with open(path, "wb") as file:
+        file.write(b"\x89PNG\r\n\x1a\n")
+        file.write(chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, color_type, 0, 0, 0)))
+        file.write(chunk(b"IDAT", zlib.compress(raw.tobytes(), 6)))
+        file.write(chunk(b"IEND", b""))
+
+
+def colorize(grid, scale=4):
+    """Heat colors (black-red-yellow-white) on a sqrt scale, cells upscaled by scale."""
+    peak = grid.max()
+    value = np.sqrt(grid / peak) if peak > 0 else np.zeros_like(grid)
+    rgb = np.stack((np.clip(value * 3.0, 0, 1), np.clip(value * 3.0 - 1.0, 0, 1),
+                    np.clip(value * 3.0 - 2.0, 0, 1)), axis=-1)
+    image = (rgb * 255.0 + 0.5).astype(np.uint8)
+    return np.repeat(np.repeat(image, scale, axis=0), scale, axis=1)
+
+
+class HeatmapSnapshotter:
+    """Writes heatmap snapshots of every stream from a daemon thread.
+
+    Every interval seconds heatmap-<pad>.npz (compressed grid plus its
+    geometry) and/or heatmap-<pad>.png are replaced atomically; with
+    keep > 0 that many timestamped copies per stream are kept as well.
+    """
+
+    def __init__(self, accumulator, directory, interval=60.0, formats=("npz",), keep=0):
+        self.accumulator = accumulator
+        self.directory = directory
+        self.interval = interval
+        self.formats = tuple(formats)
+        self.keep = keep
+        self.stopping = Event()
+        self.thread = None
+        self.snapshots = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def start(self):
+        self.thread = Thread(target=self._run, name="heatmap", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        self.stopping.set()
+        if self.thread:
+            self.thread.join(timeout)
+
+    def _run(self):
+        while not self.stopping.wait(self.interval):
+            self.write()
+        self.write()
+
+    def write(self):
+        accumulator = self.accumulator
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        for pad_index in sorted(accumulator.rows):
+            grid = accumulator.snapshot(pad_index)
+            if grid is None:
+                continue
+            row = accumulator.rows.get(pad_index)
+            frames = int(accumulator.frames[row]) if row is not None else 0
+            name = "heatmap-%02d" % pad_index
+            try:
+                if "npz" in self.formats:
+                    self._replace(name, ".npz", lambda path: np.savez_compressed(
+                        path, grid=grid.astype(np.float32), cell=accumulator.cell,
+                        frame_size=np.array(accumulator.frame_size), half_life=accumulator.half_life,
+                        frames=frames, timestamp=time.time()), stamp)
+                if "png" in self.formats:
+                    self._replace(name, ".png", lambda path: write_png(path, colorize(grid)), stamp)
+            except OSError as e:
+                sys.stderr.write("Heatmap snapshot failed: %s\n" % e)
+        self.snapshots += 1
+
+    def _replace(self, name, suffix, write, stamp):
+        path = os.path.join(self.directory, name + suffix)
+        tmp = os.path.join(self.directory, ".%s.tmp%s" % (name, suffix))
+        write(tmp)
+        os.replace(tmp, path)
+        if self.keep > 0:
+            history = os.path.join(self.directory, "%s-%s%s" % (name, stamp, suffix))
+            shutil.copyfile(path, history)
+            old = sorted(f for f in os.listdir(self.directory)
+                         if f.startswith(name + "-") and f.endswith(suffix))
+            for stale in old[:-self.keep]:
+                os.remove(os.path.join(self.directory, stale))
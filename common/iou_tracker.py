@@ -0,0 +1,157 @@
+import sys
+
+import numpy as np
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:
+    linear_sum_assignment = None
+
+IOU_THRESHOLD = 0.3
+CENTROID_THRESHOLD = 0.5
+MAX_AGE = 30
+
+
+def iou_matrix(a, b):
+    """Pairwise IoU of two ltwh box arrays, shape (len(a), len(b))."""
+    a = np.asarray(a, dtype=np.float32)
+    b = np.asarray(b, dtype=np.float32)
+    ax1, ay1 = a[:, 0, None], a[:, 1, None]
+    ax2, ay2 = ax1 + a[:, 2, None], ay1 + a[:, 3, None]
+    bx1, by1 = b[None, :, 0], b[None, :, 1]
+    bx2, by2 = bx1 + b[None, :, 2], by1 + b[None, :, 3]
+
+    iw = np.clip(np.minimum(ax2, bx2) - np.maximum(ax1, bx1), 0, None)
+    ih = np.clip(np.minimum(ay2, by2) - np.maximum(ay1, by1), 0, None)
+    inter = iw * ih
+    union = (a[:, 2] * a[:, 3])[:, None] + (b[:, 2] * b[:, 3])[None, :] - inter
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+
+def centroid_matrix(a, b):
+    """Pairwise centroid distance of ltwh boxes, normalized by the size of a."""
+    a = np.asarray(a, dtype=np.float32)
+    b = np.asarray(b, dtype=np.float32)
+    ac = a[:, :2] + a[:, 2:] / 2
+    bc = b[:, :2] + b[:, 2:] / 2
+    distance = np.linalg.norm(ac[:, None, :] - bc[None, :, :], axis=2)
+    scale = np.maximum(a[:, 2:].max(axis=1), 1.0)[:, None]
+    return distance / scale
+
+
+def greedy_match(score, threshold):
+    """Match rows to columns by descending score; returns (rows, cols)."""
+    rows, cols = np.nonzero(score >= threshold)
+    if not len(rows):
+        return rows, cols
+    order = np.argsort(-score[rows, cols], kind="stable")
+    used_rows = set()
+    used_cols = set()
+    matched_rows = []
+    matched_cols = []
+    for r, c in zip(rows[order].tolist(), cols[order].tolist()):
+        if r in used_rows or c in used_cols:
+            continue
+        used_rows.add(r)
+        used_cols.add(c)
+        matched_rows.append(r)
+        matched_cols.append(c)
+    return np.array(matched_rows, dtype=np.int64), np.array(matched_cols, dtype=np.int64)
+
+
+def hungarian_match(score, threshold):
+    rows, cols = linear_sum_assignment(-score)
+    keep = score[rows, cols] >= threshold
+    return rows[keep], cols[keep]
+
+
+class _StreamTracks:
+    def __init__(self):
+        self.boxes = np.zeros((0, 4), dtype=np.float32)
+        self.ids = np.zeros(0, dtype=np.uint64)
+        self.class_ids = np.zeros(0, dtype=np.int32)
+        self.misses = np.zeros(0, dtype=np.int32)
+
+
+class IouTracker:
+    """Assigns persistent object ids per stream when nvtracker is absent.
+
+    Each frame, detections are matched to the live tracks of their stream
+    with a batched IoU matrix (class-gated), then leftovers are matched on
+    normalized centroid distance. Matching is greedy or Hungarian (the
+    latter needs scipy). Tracks unseen for more than max_age frames are
+    dropped.
+    """
+
+    def __init__(self, iou_threshold=IOU_THRESHOLD, centroid_threshold=CENTROID_THRESHOLD,
+                 max_age=MAX_AGE, matching="greedy"):
+        if matching == "hungarian" and linear_sum_assignment is None:
+            sys.stderr.write("scipy not found, IouTracker falls back to greedy matching\n")
+            matching = "greedy"
+        self.iou_threshold = iou_threshold
+        self.centroid_threshold = centroid_threshold
+        self.max_age = max_age
+        self.match = hungarian_match if matching == "hungarian" else greedy_match
+        self.streams = {}
+        self.next_id = 1
+
+    def _match(self, tracks, boxes, class_ids):
+        same_class = tracks.class_ids[:, None] == class_ids[None, :]
+        score = np.where(same_class, iou_matrix(tracks.boxes, boxes), 0.0)
+        track_idx, det_idx = self.match(score, self.iou_threshold)
+
+        if self.centroid_threshold and len(track_idx) < min(len(tracks.ids), len(boxes)):
+            free_tracks = np.setdiff1d(np.arange(len(tracks.ids)), track_idx)
+            free_dets = np.setdiff1d(np.arange(len(boxes)), det_idx)
+            distance = centroid_matrix(tracks.boxes[free_tracks], boxes[free_dets])
+            distance = np.where(same_class[np.ix_(free_tracks, free_dets)], distance, np.inf)
+            # Mesafeyi skora cevir: 1 - d, esik 1 - centroid_threshold
+            extra_t, extra_d = self.match(1.0 - distance, 1.0 - self.centroid_threshold)
+            track_idx = np.concatenate((track_idx, free_tracks[extra_t]))
+            det_idx = np.concatenate((det_idx, free_dets[extra_d]))
+        return track_idx.astype(np.int64), det_idx.astype(np.int64)
+
+    def update(self, pad_index, boxes, class_ids):
+        """Return persistent ids (uint64) for the ltwh boxes of one frame."""
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        class_ids = np.asarray(class_ids, dtype=np.int32)
+        tracks = self.streams.get(pad_index)
+        if tracks is None:
+            tracks = self.streams[pad_index] = _StreamTracks()
+
+        ids = np.zeros(len(boxes), dtype=np.uint64)
+        if len(tracks.ids) and len(boxes):
+            track_idx, det_idx = self._match(tracks, boxes, class_ids)
+        else:
+            track_idx = det_idx = np.zeros(0, dtype=np.int64)
+
+        ids[det_idx] = tracks.ids[track_idx]
+        tracks.boxes[track_idx] = boxes[det_idx]
+        tracks.misses += 1
+        tracks.misses[track_idx] = 0
+
+        new = np.ones(len(boxes), dtype=bool)
+        new[det_idx] = False
+        new_count = int(new.sum())
+        if new_count:
+            new_ids = np.arange(self.next_id, self.next_id + new_count, dtype=np.uint64)
+            self.next_id += new_count
+            ids[new] = new_ids
+            tracks.boxes = np.concatenate((tracks.boxes, boxes[new]))
+            tracks.ids = np.concatenate((tracks.ids, new_ids))
+            tracks.class_ids = np.concatenate((tracks.class_ids, class_ids[new]))
+            tracks.misses = np.concatenate((tracks.misses, np.zeros(new_count, dtype=np.int32)))
+
+        alive = tracks.misses <= self.max_age
+        if not alive.all():
+            tracks.boxes = tracks.boxes[alive]
+            tracks.ids = tracks.ids[alive]
+            tracks.class_ids = tracks.class_ids[alive]
+            tracks.misses = tracks.misses[alive]
+        return ids
+
+    def drop_source(self, pad_index):
+        self.streams.pop(pad_index, None)
+
+    def track_count(self):
+        return sum(len(tracks.ids) for tracks in self.streams.values())
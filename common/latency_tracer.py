@@ -0,0 +1,283 @@
+import bisect
+import json
+import sys
+import time
+from collections import OrderedDict, deque
+from threading import Lock
+
+import gi
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst
+
+# Histogram bucket upper bounds in milliseconds
+LATENCY_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class LatencyHistogram:
+    def __init__(self, bounds=LATENCY_BUCKETS_MS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value_ms):
+        self.counts[bisect.bisect_left(self.bounds, value_ms)] += 1
+        self.count += 1
+        self.total += value_ms
+        if value_ms > self.max:
+            self.max = value_ms
+
+    def quantile(self, q):
+        """Bucket-interpolated quantile estimate in milliseconds."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for i, count in enumerate(self.counts):
+            upper = min(self.bounds[i], self.max) if i < len(self.bounds) else self.max
+            if count and seen + count >= rank:
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+            lower = upper
+        return self.max
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count, 3) if self.count else 0.0,
+            "p50_ms": round(self.quantile(0.50), 3),
+            "p95_ms": round(self.quantile(0.95), 3),
+            "p99_ms": round(self.quantile(0.99), 3),
+            "max_ms": round(self.max, 3),
+            "buckets_ms": list(self.bounds),
+            "counts": list(self.counts),
+        }
+
+
+def buffer_pts(buffer):
+    return buffer.pts
+
+
+def single_source(buffer):
+    return (0,)
+
+
+def sink_pad_source(pad):
+    """Source index of a muxer request pad named sink_<index>."""
+    return int(pad.get_name().rsplit("_", 1)[-1])
+
+
+class LatencyTracer:
+    """Stamps buffers at every element boundary of a chain of elements.
+
+    A pad probe on each element (its src pad, or its sink pad when the
+    element has no static src pad, e.g. a tee) records the arrival time of
+    a buffer keyed by key_fn (PTS by default). When the buffer reaches the
+    last boundary, per-hop and end-to-end latencies are added to the
+    histograms of every source returned by source_fn.
+
+    With frames_fn the first element is a muxer: its sink pads (added and
+    removed with the sources) stamp every source frame as it arrives,
+    keyed by (source, PTS). frames_fn(buffer) returns the (source, PTS)
+    of the frames in a batch; each frame is matched to its latest arrival
+    at or before that PTS, so end-to-end latency includes the time the
+    frame waited in the muxer for its batch (the "<muxer>.sink" hop).
+    """
+
+    def __init__(self, elements, key_fn=buffer_pts, source_fn=single_source, frames_fn=None,
+                 output=None, max_inflight=256, recent=256, clock=time.monotonic_ns):
+        self.elements = list(elements)
+        self.names = [element.get_name() for element in self.elements]
+        self.hops = ["%s->%s" % (a, b) for a, b in zip(self.names, self.names[1:])]
+        if frames_fn:
+            self.hops.insert(0, "%s.sink->%s" % (self.names[0], self.names[0]))
+        self.key_fn = key_fn
+        self.source_fn = source_fn
+        self.frames_fn = frames_fn
+        self.output = output
+        self.max_inflight = max_inflight
+        self.clock = clock
+        # source -> (pts, ns) muxer'a varis damgalari, eskiden yeniye
+        self.arrivals = {}
+        self.pad_handlers = []
+
+        self.inflight = OrderedDict()
+        self.hop_histograms = {}
+        self.e2e_histograms = {}
+        # Last end-to-end samples (ms), for controllers that need a recent view
+        self.recent_e2e = deque(maxlen=recent)
+        self.dropped = 0
+        self.probes = []
+        self.lock = Lock()
+
+    def attach(self):
+        for index, element in enumerate(self.elements):
+            pad = element.get_static_pad("src") or element.get_static_pad("sink")
+            if not pad:
+                sys.stderr.write("Latency tracer: no static pad on %s\n" % element.get_name())
+                continue
+            probe_id = pad.add_probe(Gst.PadProbeType.BUFFER, self._probe, index)
+            self.probes.append((pad, probe_id))
+        if self.frames_fn:
+            muxer = self.elements[0]
+            for pad in muxer.sinkpads:
+                self._attach_arrival(muxer, pad)
+            # Calisma sirasinda eklenen / cikarilan kaynaklar
+            self.pad_handlers = [muxer.connect("pad-added", self._attach_arrival),
+                                 muxer.connect("pad-removed", self._drop_arrivals)]
+
+    def _attach_arrival(self, muxer, pad):
+        if pad.get_direction() != Gst.PadDirection.SINK:
+            return
+        source = sink_pad_source(pad)
+        with self.lock:
+            self.arrivals[source] = deque(maxlen=self.max_inflight)
+        self.probes.append((pad, pad.add_probe(Gst.PadProbeType.BUFFER, self._arrival_probe, source)))
+
+    def _drop_arrivals(self, muxer, pad):
+        if pad.get_direction() != Gst.PadDirection.SINK:
+            return
+        with self.lock:
+            self.arrivals.pop(sink_pad_source(pad), None)
+        self.probes = [(other, probe_id) for other, probe_id in self.probes if other != pad]
+
+    def _arrival_probe(self, pad, info, source):
+        buffer = info.get_buffer()
+        if buffer:
+            now = self.clock()
+            with self.lock:
+                arrivals = self.arrivals.get(source)
+                if arrivals is not None:
+                    arrivals.append((buffer.pts, now))
+        return Gst.PadProbeReturn.OK
+
+    def _arrival(self, source, pts):
+        """Arrival stamp of the latest frame of source at or before pts; older stamps are dropped."""
+        arrivals = self.arrivals.get(source)
+        stamp = None
+        while arrivals and arrivals[0][0] <= pts:
+            stamp = arrivals.popleft()[1]
+        return stamp
+
+    def replace_element(self, old, new):
+        """Move the probe of old to new (same boundary, e.g. a swapped nvinfer)."""
+        index = self.elements.index(old)
+        self.elements[index] = new
+        for i, (pad, probe_id) in enumerate(self.probes):
+            if pad.get_parent_element() == old:
+                pad.remove_probe(probe_id)
+                del self.probes[i]
+                break
+        pad = new.get_static_pad("src") or new.get_static_pad("sink")
+        if pad:
+            self.probes.append((pad, pad.add_probe(Gst.PadProbeType.BUFFER, self._probe, index)))
+
+    def detach(self):
+        for pad, probe_id in self.probes:
+            pad.remove_probe(probe_id)
+        self.probes = []
+        for handler in self.pad_handlers:
+            self.elements[0].disconnect(handler)
+        self.pad_handlers = []
+
+    def _probe(self, pad, info, index):
+        buffer = info.get_buffer()
+        if buffer:
+            self.stamp(index, buffer)
+        return Gst.PadProbeReturn.OK
+
+    def stamp(self, index, buffer):
+        now = self.clock()
+        key = self.key_fn(buffer)
+        last = len(self.elements) - 1
+        with self.lock:
+            stamps = self.inflight.get(key)
+            if stamps is None:
+                if index != 0:
+                    return
+                stamps = self.inflight[key] = [None] * len(self.elements)
+                while len(self.inflight) > self.max_inflight:
+                    self.inflight.popitem(last=False)
+                    self.dropped += 1
+            stamps[index] = now
+            if index != last:
+                return
+            del self.inflight[key]
+
+        if self.frames_fn:
+            frames = self.frames_fn(buffer)
+            with self.lock:
+                arrivals = {source: self._arrival(source, pts) for source, pts in frames}
+            self.record(list(arrivals), stamps, arrivals)
+        else:
+            self.record(self.source_fn(buffer), stamps)
+
+    def record(self, sources, stamps, arrivals=None):
+        """Observe one batch; arrivals maps source -> muxer arrival stamp of its frame."""
+        # Muxer bekleme hop'u kaynaga gore degisir, zincir hop'lari batch icin ortak
+        chain_hops = self.hops[1:] if self.frames_fn else self.hops
+        hops = []
+        for i, hop in enumerate(chain_hops):
+            if stamps[i] is not None and stamps[i + 1] is not None:
+                hops.append((hop, (stamps[i + 1] - stamps[i]) / 1e6))
+
+        with self.lock:
+            for source in sources:
+                start = stamps[0]
+                arrival = arrivals.get(source) if arrivals else None
+                source_hops = hops
+                if arrival is not None:
+                    start = arrival
+                    if stamps[0] is not None:
+                        source_hops = [(self.hops[0], (stamps[0] - arrival) / 1e6)] + hops
+                histograms = self.hop_histograms.get(source)
+                if histograms is None:
+                    histograms = self.hop_histograms[source] = {
+                        hop: LatencyHistogram() for hop in self.hops}
+                    self.e2e_histograms[source] = LatencyHistogram()
+                for hop, value in source_hops:
+                    histograms[hop].observe(value)
+                if start is not None and stamps[-1] is not None:
+                    e2e = (stamps[-1] - start) / 1e6
+                    self.e2e_histograms[source].observe(e2e)
+                    self.recent_e2e.append(e2e)
+
+    def recent_quantile(self, q=0.95):
+        """Quantile (ms) of the most recent end-to-end samples, or None."""
+        samples = sorted(self.recent_e2e)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def summary(self):
+        with self.lock:
+            return {
+                "elements": self.names,
+                "dropped_stamps": self.dropped,
+                "sources": {
+                    str(source): {
+                        "end_to_end": self.e2e_histograms[source].to_dict(),
+                        "hops": {hop: histogram.to_dict() for hop, histogram in histograms.items()},
+                    }
+                    for source, histograms in sorted(self.hop_histograms.items())
+                },
+            }
+
+    def dump(self, path=None):
+        path = path or self.output
+        summary = self.summary()
+        if path:
+            with open(path, "w") as file:
+                json.dump(summary, file, indent=2)
+        else:
+            for source, data in summary["sources"].items():
+                e2e = data["end_to_end"]
+                print("**LATENCY stream%s: e2e p50=%.2fms p95=%.2fms p99=%.2fms" % (
+                    source, e2e["p50_ms"], e2e["p95_ms"], e2e["p99_ms"]))
+        return summary
+
+    def dump_callback(self):
+        self.dump()
+        return True
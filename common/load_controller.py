@@ -0,0 +1,147 @@
+from collections import namedtuple
+
+Decision = namedtuple("Decision", ["interval", "shed_sources", "changed", "state"])
+
+
+class IntervalController:
+    """Closed-loop controller for the nvinfer interval and source shedding.
+
+    Pure Python: feed it per-stream FPS and (optionally) end-to-end latency
+    samples and it returns the interval to use and which sources to shed.
+    Overload must persist for overload_samples ticks before the interval
+    goes up, and headroom for recover_samples ticks before it comes down;
+    after every change the controller waits cooldown_samples ticks. The
+    asymmetric thresholds and dwell times keep it from oscillating. If a
+    step down is followed by overload within probe_window ticks, the
+    headroom dwell time doubles (up to max_recover_samples), so a level the
+    pipeline cannot sustain is probed less and less often.
+
+    When the interval is already at max_interval and overload persists,
+    the slowest sources are shed (decimated) one at a time, and restored
+    in reverse order before the interval is lowered again.
+
+    The FPS target of a source is target_ratio x its nominal FPS
+    (nominal_fps(source), e.g. the framerate of its caps), so a 15 FPS
+    camera is not taken for an overloaded 25 FPS one. A non-zero
+    target_fps is used as an absolute target for every source instead.
+    Sources without a known target are left out of the FPS check.
+    """
+
+    def __init__(self, target_fps=None, target_latency_ms=None, min_interval=0, max_interval=4,
+                 overload_margin=0.10, recover_margin=0.25, overload_samples=3,
+                 recover_samples=10, cooldown_samples=5, probe_window=20,
+                 max_recover_samples=160, allow_shedding=True, target_ratio=0.9, nominal_fps=None):
+        self.target_fps = target_fps
+        self.target_ratio = target_ratio
+        self.nominal_fps = nominal_fps
+        self.target_latency_ms = target_latency_ms
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.overload_margin = overload_margin
+        self.recover_margin = recover_margin
+        self.overload_samples = overload_samples
+        self.recover_samples = recover_samples
+        self.cooldown_samples = cooldown_samples
+        self.probe_window = probe_window
+        self.max_recover_samples = max_recover_samples
+        self.allow_shedding = allow_shedding
+
+        self.interval = min_interval
+        self.shed_sources = []
+        self.overload_count = 0
+        self.recover_count = 0
+        self.cooldown = 0
+        self.recover_required = recover_samples
+        self.ticks = 0
+        self.last_step_down = None
+
+    def target_for(self, source):
+        if self.target_fps:
+            return self.target_fps
+        nominal = self.nominal_fps(source) if self.nominal_fps else None
+        return nominal * self.target_ratio if nominal else None
+
+    def classify(self, stream_fps, latency_ms=None):
+        """Return "overload", "headroom" or "ok" for one sample.
+
+        Shed sources run decimated on purpose and are left out of the FPS check.
+        """
+        # Her kaynak kendi hedefine gore: en kotu oran (fps / hedef) belirleyici
+        ratios = []
+        for source, fps in stream_fps.items():
+            target = self.target_for(source)
+            if fps is not None and target and source not in self.shed_sources:
+                ratios.append(fps / target)
+        worst_ratio = min(ratios) if ratios else None
+        overload = False
+        headroom = True
+        if worst_ratio is not None:
+            overload |= worst_ratio < 1.0 - self.overload_margin
+            headroom &= worst_ratio >= 1.0 - self.overload_margin / 2
+        if self.target_latency_ms and latency_ms is not None:
+            overload |= latency_ms > self.target_latency_ms * (1.0 + self.overload_margin)
+            headroom &= latency_ms < self.target_latency_ms * (1.0 - self.recover_margin)
+        if overload:
+            return "overload"
+        return "headroom" if headroom else "ok"
+
+    def update(self, stream_fps, latency_ms=None):
+        state = self.classify(stream_fps, latency_ms)
+        self.ticks += 1
+        if self.cooldown > 0:
+            self.cooldown -= 1
+            return Decision(self.interval, list(self.shed_sources), False, state)
+
+        if state == "overload":
+            self.overload_count += 1
+            self.recover_count = 0
+        elif state == "headroom":
+            self.recover_count += 1
+            self.overload_count = 0
+        else:
+            self.overload_count = 0
+            self.recover_count = 0
+
+        changed = False
+        if self.overload_count >= self.overload_samples:
+            changed = self._step_up(stream_fps)
+            if changed and self.last_step_down is not None \
+                    and self.ticks - self.last_step_down <= self.probe_window:
+                self.recover_required = min(self.max_recover_samples, self.recover_required * 2)
+        elif self.recover_count >= self.recover_required:
+            changed = self._step_down()
+            if changed:
+                self.last_step_down = self.ticks
+        if changed:
+            self.overload_count = 0
+            self.recover_count = 0
+            self.cooldown = self.cooldown_samples
+        return Decision(self.interval, list(self.shed_sources), changed, state)
+
+    def _step_up(self, stream_fps):
+        if self.interval < self.max_interval:
+            self.interval += 1
+            return True
+        if not self.allow_shedding:
+            return False
+        candidates = [(fps / (self.target_for(source) or 1.0), source) for source, fps in stream_fps.items()
+                      if source not in self.shed_sources and fps is not None]
+        # Her zaman en az bir kaynak tam hizda kalsin
+        if len(candidates) <= 1:
+            return False
+        self.shed_sources.append(min(candidates)[1])
+        return True
+
+    def _step_down(self):
+        if self.shed_sources:
+            self.shed_sources.pop()
+            return True
+        if self.interval > self.min_interval:
+            self.interval -= 1
+            return True
+        return False
+
+    def drop_source(self, source):
+        """Forget a removed source so its pad index is not kept as shed."""
+        if source in self.shed_sources:
+            self.shed_sources.remove(source)
@@ -0,0 +1,108 @@
+import gi
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst
+
+
+class SourceShedder:
+    """Decimates buffers of shed sources at their source bin pads.
+
+    A shed source keeps one buffer out of keep_one_in; others pass as is.
+    """
+
+    def __init__(self, keep_one_in=2):
+        self.keep_one_in = keep_one_in
+        self.shed = set()
+        self.counters = {}
+        self.dropped = 0
+
+    def attach(self, index, source_bin):
+        pad = source_bin.get_static_pad("src")
+        if pad:
+            pad.add_probe(Gst.PadProbeType.BUFFER, self._probe, index)
+
+    def _probe(self, pad, info, index):
+        if index not in self.shed:
+            return Gst.PadProbeReturn.OK
+        count = self.counters.get(index, 0) + 1
+        self.counters[index] = count
+        if count % self.keep_one_in:
+            self.dropped += 1
+            return Gst.PadProbeReturn.DROP
+        return Gst.PadProbeReturn.OK
+
+    def set_shed(self, sources):
+        self.shed = set(sources)
+
+    def drop_source(self, index):
+        self.shed.discard(index)
+        self.counters.pop(index, None)
+
+
+class NominalFps:
+    """Nominal framerate of each source, read from the caps at its source bin pad.
+
+    Variable framerate caps (0/1) leave the source without a nominal FPS.
+    """
+
+    def __init__(self):
+        self.fps = {}
+
+    def attach(self, index, source_bin):
+        pad = source_bin.get_static_pad("src")
+        if pad:
+            pad.add_probe(Gst.PadProbeType.EVENT_DOWNSTREAM, self._probe, index)
+
+    def _probe(self, pad, info, index):
+        event = info.get_event()
+        if event and event.type == Gst.EventType.CAPS:
+            structure = event.parse_caps().get_structure(0)
+            found, numerator, denominator = structure.get_fraction("framerate")
+            if found and numerator > 0 and denominator > 0:
+                self.fps[index] = numerator / denominator
+            else:
+                self.fps.pop(index, None)
+        return Gst.PadProbeReturn.OK
+
+    def get(self, index):
+        return self.fps.get(index)
+
+    def drop_source(self, index):
+        self.fps.pop(index, None)
+
+
+class LoadControlLoop:
+    """Applies IntervalController decisions to a running pipeline.
+
+    fps_source() returns {pad_index: fps}; latency_source() returns a
+    recent end-to-end latency in ms or None.
+    """
+
+    def __init__(self, controller, pgie, fps_source, latency_source=None, shedder=None,
+                 metrics=None):
+        self.controller = controller
+        self.pgie = pgie
+        self.fps_source = fps_source
+        self.latency_source = latency_source
+        self.shedder = shedder
+        self.metrics = metrics
+        self.pgie.set_property("interval", controller.interval)
+
+    def drop_source(self, index):
+        """SourceManager.on_removed callback: a freed pad slot must not stay shed."""
+        self.controller.drop_source(index)
+        if self.shedder:
+            self.shedder.drop_source(index)
+
+    def tick(self):
+        latency = self.latency_source() if self.latency_source else None
+        decision = self.controller.update(self.fps_source(), latency)
+        if decision.changed:
+            self.pgie.set_property("interval", decision.interval)
+            if self.shedder:
+                self.shedder.set_shed(decision.shed_sources)
+            print("Load control (%s): interval=%d shed=%s" % (
+                decision.state, decision.interval, decision.shed_sources))
+        if self.metrics:
+            self.metrics.set_gauge("pgie_interval", decision.interval)
+            self.metrics.set_gauge("shed_sources", len(decision.shed_sources))
+        return True
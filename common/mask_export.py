@@ -0,0 +1,275 @@
+import sys
+import time
+from threading import Event, Thread
+
+import numpy as np
+
+from common.analytics import AnalyticsQueue, FLUSH_INTERVAL
+
+SEGMENTATION_THRESHOLD = 0.5
+POLYGON_EPSILON = 1.0
+_cv2 = None
+
+
+def _load_cv2():
+    # OpenCV ilk polygon isteginde yuklenir (baslangic suresi)
+    global _cv2
+    if _cv2 is None:
+        try:
+            import cv2
+            _cv2 = cv2
+        except ImportError:
+            _cv2 = False
+    return _cv2
+
+
+def mask_areas(stack):
+    """Foreground pixel count of each mask in a (k, h, w) bool stack."""
+    return np.count_nonzero(stack.reshape(len(stack), -1), axis=1)
+
+
+def rle_encode_many(stack):
+    """COCO-style uncompressed RLE of each mask in a (k, h, w) bool stack.
+
+    Pixels are read in column-major order and runs alternate starting with
+    background, as in pycocotools. Run boundaries of the whole stack are
+    found with one vectorized diff.
+    """
+    k, h, w = stack.shape
+    if not k:
+        return []
+    flat = stack.transpose(0, 2, 1).reshape(k, h * w)
+    rows, cols = np.nonzero(flat[:, 1:] != flat[:, :-1])
+    splits = np.searchsorted(rows, np.arange(1, k))
+    results = []
+    for i, positions in enumerate(np.split(cols + 1, splits)):
+        bounds = np.concatenate(([0], positions, [h * w]))
+        counts = np.diff(bounds).tolist()
+        if flat[i, 0]:
+            counts.insert(0, 0)
+        results.append({"size": [h, w], "counts": counts})
+    return results
+
+
+def rle_encode(mask):
+    return rle_encode_many(np.asarray(mask, dtype=bool)[None])[0]
+
+
+def rle_decode(rle):
+    h, w = rle["size"]
+    values = np.zeros(len(rle["counts"]), dtype=bool)
+    values[1::2] = True
+    flat = np.repeat(values, rle["counts"])
+    return flat.reshape(w, h).T
+
+
+def rle_to_string(counts):
+    """Compress RLE counts to the COCO string format (pycocotools rleToString)."""
+    out = []
+    for i, count in enumerate(counts):
+        x = count - counts[i - 2] if i > 2 else count
+        more = True
+        while more:
+            c = x & 0x1f
+            x >>= 5
+            more = (x != -1) if c & 0x10 else (x != 0)
+            if more:
+                c |= 0x20
+            out.append(chr(c + 48))
+    return "".join(out)
+
+
+def _simplify(points, epsilon):
+    """Ramer-Douglas-Peucker on an (n, 2) array."""
+    if len(points) < 3:
+        return points
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        segment = points[end] - points[start]
+        middle = points[start + 1:end] - points[start]
+        norm = np.hypot(*segment)
+        if norm == 0:
+            distance = np.hypot(middle[:, 0], middle[:, 1])
+        else:
+            distance = np.abs(segment[0] * middle[:, 1] - segment[1] * middle[:, 0]) / norm
+        i = int(np.argmax(distance))
+        if distance[i] > epsilon:
+            split = start + 1 + i
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+    return points[keep]
+
+
+def mask_polygon(mask, epsilon=POLYGON_EPSILON):
+    """Simplified outer polygon of a bool mask, as (n, 2) float x/y in mask pixels.
+
+    With OpenCV the largest external contour is used. Without it the
+    polygon is the row envelope (leftmost/rightmost pixel of each row),
+    which is exact for row-convex shapes.
+    """
+    cv2 = _load_cv2()
+    if cv2:
+        contours, _ = cv2.findContours(mask.astype(np.uint8), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        if not contours:
+            return np.zeros((0, 2), dtype=np.float32)
+        contour = max(contours, key=cv2.contourArea)
+        return cv2.approxPolyDP(contour, epsilon, True).reshape(-1, 2).astype(np.float32)
+
+    rows = np.flatnonzero(mask.any(axis=1))
+    if not len(rows):
+        return np.zeros((0, 2), dtype=np.float32)
+    sub = mask[rows]
+    left = np.argmax(sub, axis=1)
+    right = sub.shape[1] - 1 - np.argmax(sub[:, ::-1], axis=1)
+    outline = np.concatenate((np.stack((left, rows), axis=1),
+                              np.stack((right + 1, rows), axis=1)[::-1])).astype(np.float32)
+    return _simplify(outline, epsilon)
+
+
+class MaskBatch:
+    """Binarized masks of one batch, grouped by mask shape.
+
+    groups is a list of (rows, stack): object rows of the batch columns and
+    the (k, h, w) bool masks of those objects. area has one entry per
+    object row (mask pixels, 0 without a mask) and frame_area the same
+    area scaled to frame pixels through the object rect.
+    """
+
+    __slots__ = ("timestamp", "pad_index", "frame_num", "object_id", "class_id", "rect",
+                 "groups", "area", "frame_area")
+
+
+class MaskExtractor:
+    """Reads obj_meta.mask_params of a batch into NumPy, binarized.
+
+    get_mask_array() is a view on the mask buffer of the meta; the only
+    copy is the thresholded bool written straight into a per-shape stack.
+    Areas are computed per shape group in one call.
+    """
+
+    def __init__(self, backend, threshold=SEGMENTATION_THRESHOLD):
+        self.pyds = backend
+        self.threshold = threshold
+
+    def extract(self, columns, timestamp=None):
+        n = columns.num_objects
+        shapes = {}
+        for i in range(n):
+            mask_params = columns.objects[i].mask_params
+            if mask_params.width and mask_params.height and mask_params.size:
+                shapes.setdefault((mask_params.height, mask_params.width), []).append(i)
+
+        batch = MaskBatch()
+        batch.timestamp = time.time() if timestamp is None else timestamp
+        batch.pad_index = columns.pad_index[:n].copy()
+        batch.frame_num = columns.frame_num[:n].copy()
+        batch.object_id = columns.object_id[:n].copy()
+        batch.class_id = columns.class_id[:n].copy()
+        batch.rect = columns.rect[:n].copy()
+        batch.groups = []
+        batch.area = np.zeros(n, dtype=np.int64)
+        pixel_scale = np.zeros(n, dtype=np.float64)
+        for (h, w), rows in shapes.items():
+            stack = np.empty((len(rows), h, w), dtype=bool)
+            for j, i in enumerate(rows):
+                data = columns.objects[i].mask_params.get_mask_array()
+                np.greater_equal(data[:h * w].reshape(h, w), self.threshold, out=stack[j])
+            rows = np.asarray(rows, dtype=np.int64)
+            batch.groups.append((rows, stack))
+            batch.area[rows] = mask_areas(stack)
+            pixel_scale[rows] = 1.0 / (h * w)
+        # Maske nesne kutusunu kaplar: maske pikselini kare pikseline olcekle
+        batch.frame_area = batch.area * pixel_scale * batch.rect[:, 2] * batch.rect[:, 3]
+        return batch
+
+
+class MaskExporter:
+    """Streams per-object masks as RLE or polygons, off the streaming thread.
+
+    put() runs in the probe: it binarizes the masks (MaskExtractor) and
+    queues the result. A daemon thread encodes and writes records in bulk
+    through a common.analytics writer. The queue drops the oldest batch
+    when full, like the analytics pipeline.
+    """
+
+    def __init__(self, extractor, writer, encoding="rle", compress=True, epsilon=POLYGON_EPSILON,
+                 queue=None, metrics=None, flush_interval=FLUSH_INTERVAL):
+        if encoding not in ("rle", "polygon"):
+            raise ValueError("unknown mask encoding: %s" % encoding)
+        self.extractor = extractor
+        self.writer = writer
+        self.encoding = encoding
+        self.compress = compress
+        self.epsilon = epsilon
+        self.queue = queue or AnalyticsQueue()
+        self.metrics = metrics
+        self.flush_interval = flush_interval
+        self.stopping = Event()
+        self.thread = None
+        self.reported_dropped = 0
+
+    def put(self, columns):
+        self.queue.put(self.extractor.extract(columns))
+
+    def start(self):
+        self.thread = Thread(target=self._run, name="mask-export", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        self.stopping.set()
+        if self.thread:
+            self.thread.join(timeout)
+        self.writer.close()
+
+    def _run(self):
+        while not self.stopping.wait(self.flush_interval):
+            self.flush()
+        self.flush()
+
+    def encode(self, batch):
+        records = []
+        for rows, stack in batch.groups:
+            if self.encoding == "rle":
+                shapes = rle_encode_many(stack)
+                if self.compress:
+                    for rle in shapes:
+                        rle["counts"] = rle_to_string(rle["counts"])
+            else:
+                shapes = []
+                h, w = stack.shape[1:]
+                for i, mask in zip(rows.tolist(), stack):
+                    left, top, width, height = batch.rect[i].tolist()
+                    polygon = mask_polygon(mask, self.epsilon)
+                    # Maske koordinatlarini kare koordinatlarina cevir
+                    polygon = polygon * (width / w, height / h) + (left, top)
+                    shapes.append(np.round(polygon, 1).ravel().tolist())
+            for i, shape in zip(rows.tolist(), shapes):
+                records.append({
+                    "type": "mask", "ts": batch.timestamp,
+                    "source": int(batch.pad_index[i]), "frame": int(batch.frame_num[i]),
+                    "object_id": int(batch.object_id[i]), "class_id": int(batch.class_id[i]),
+                    "bbox": [round(v, 1) for v in batch.rect[i].tolist()],
+                    "area": round(float(batch.frame_area[i]), 1),
+                    self.encoding: shape,
+                })
+        return records
+
+    def flush(self):
+        records = []
+        for batch in self.queue.drain():
+            records.extend(self.encode(batch))
+        try:
+            self.writer.write(records)
+        except (OSError, ValueError) as e:
+            sys.stderr.write("Mask export write failed: %s\n" % e)
+        if self.metrics and self.queue.dropped > self.reported_dropped:
+            self.metrics.inc("mask_export_dropped_batches_total", self.queue.dropped - self.reported_dropped)
+            self.reported_dropped = self.queue.dropped
+        return len(records)
@@ -0,0 +1,58 @@
+import configparser
+import os
+import sys
+from collections import namedtuple
+
+MEDIA_SECTION_PREFIX = "MediaSettings"
+
+# width/height/gpu_id are optional hints in a [MediaSettings-N] section,
+# used by the supervisor to place sources on workers.
+MediaSource = namedtuple("MediaSource", ["key", "name", "uri", "width", "height", "gpu_id"])
+
+# Bu semalar canli yayin: kareler kaynak hizinda gelir, bekletilirse bayatlar
+LIVE_URI_SCHEMES = ("rtsp", "rtsps", "rtmp", "rtp", "udp", "srt", "v4l2")
+
+
+def media_uri(media_type, url):
+    """Convert a media.ini entry to a uridecodebin URI, or None if unsupported."""
+    if media_type == "file" and "://" not in url:
+        return "file://" + os.path.abspath(url)
+    if media_type == "youtube":
+        return None
+    return url
+
+
+def is_live_uri(uri):
+    return uri.split("://", 1)[0].lower() in LIVE_URI_SCHEMES
+
+
+def load_media_entries(media_path):
+    """Return a MediaSource for every enabled [MediaSettings-N] section, in file order."""
+    parser = configparser.ConfigParser(interpolation=None)
+    parser.read(media_path)
+    entries = []
+    for section in parser.sections():
+        if not section.startswith(MEDIA_SECTION_PREFIX):
+            continue
+        if parser.get(section, "enable", fallback="0").strip() != "1":
+            continue
+        media_type = parser.get(section, "type", fallback="").strip()
+        url = parser.get(section, "url", fallback="").strip()
+        uri = media_uri(media_type, url)
+        if uri is None:
+            sys.stderr.write("Skipping %s: %s sources are not supported\n" % (section, media_type))
+            continue
+        entries.append(MediaSource(
+            key=section,
+            name=parser.get(section, "media_name", fallback=section).strip(),
+            uri=uri,
+            width=parser.getint(section, "width", fallback=0),
+            height=parser.getint(section, "height", fallback=0),
+            gpu_id=parser.getint(section, "gpu_id", fallback=0),
+        ))
+    return entries
+
+
+def load_media_sources(media_path):
+    """Return the URIs of the enabled [MediaSettings-N] sections, in file order."""
+    return [entry.uri for entry in load_media_entries(media_path)]
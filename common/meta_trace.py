@@ -0,0 +1,250 @@
+import mmap
+import os
+import struct
+import time
+
+import numpy as np
+
+from common.batch_columns import BatchMetaExtractor
+from common.mask_export import MaskExtractor, SEGMENTATION_THRESHOLD, rle_encode_many
+
+TRACE_MAGIC = b"DSMTRACE"
+TRACE_VERSION = 1
+HEADER_FORMAT = "<8sIIQ"
+HEADER_SIZE = 64
+FLUSH_EVERY = 64
+
+KIND_FRAME = 0
+KIND_OBJECT = 1
+
+# Sabit boyutlu kayit: her kare bir FRAME kaydi, ardindan nesneleri OBJECT kaydi olarak yazilir
+RECORD_DTYPE = np.dtype([
+    ("kind", "<u1"),
+    ("batch", "<u4"),
+    ("pad_index", "<i4"),
+    ("ts_ns", "<u8"),
+    ("frame_num", "<i8"),
+    ("buf_pts", "<u8"),
+    ("class_id", "<i4"),
+    ("object_id", "<u8"),
+    ("confidence", "<f4"),
+    ("rect", "<f4", (4,)),
+    ("mask_height", "<u2"),
+    ("mask_width", "<u2"),
+    ("mask_offset", "<u8"),
+    ("mask_len", "<u4"),
+])
+
+
+def mask_path(path):
+    return path + ".masks"
+
+
+class TraceRecorder:
+    """Appends the frame/object metadata of each batch to a fixed-record file.
+
+    Records are RECORD_DTYPE, written after a 64 byte header; a batch is
+    the run of records sharing a batch number. With record_masks, instance
+    masks are binarized and stored as uncompressed COCO RLE counts (uint32)
+    in a sidecar <path>.masks file referenced by mask_offset/mask_len.
+    Appending to an existing trace continues its batch numbering.
+    """
+
+    def __init__(self, path, backend, record_masks=False, mask_threshold=SEGMENTATION_THRESHOLD,
+                 flush_every=FLUSH_EVERY, clock=time.monotonic_ns):
+        self.path = path
+        self.extractor = BatchMetaExtractor(backend)
+        self.masks = MaskExtractor(backend, mask_threshold) if record_masks else None
+        self.flush_every = flush_every
+        self.clock = clock
+
+        self.batches = 0
+        if not os.path.exists(path) or os.path.getsize(path) < HEADER_SIZE:
+            self.file = open(path, "wb")
+            header = struct.pack(HEADER_FORMAT, TRACE_MAGIC, TRACE_VERSION, RECORD_DTYPE.itemsize, time.time_ns())
+            self.file.write(header.ljust(HEADER_SIZE, b"\0"))
+        else:
+            _check_header(path)
+            count = _record_count(path)
+            self.file = open(path, "r+b")
+            # Yarim kalan son kaydi at, kayit hizasini koru
+            self.file.truncate(HEADER_SIZE + count * RECORD_DTYPE.itemsize)
+            if count:
+                self.file.seek(HEADER_SIZE + (count - 1) * RECORD_DTYPE.itemsize)
+                last = np.frombuffer(self.file.read(RECORD_DTYPE.itemsize), dtype=RECORD_DTYPE)
+                self.batches = int(last["batch"][0]) + 1
+            self.file.seek(0, os.SEEK_END)
+        self.mask_file = open(mask_path(path), "ab") if record_masks else None
+        self.mask_offset = self.mask_file.tell() if self.mask_file else 0
+
+    def record(self, batch_meta, ts_ns=None):
+        columns = self.extractor.extract(batch_meta)
+        n = columns.num_objects
+        f = columns.num_frames
+        records = np.zeros(f + n, dtype=RECORD_DTYPE)
+        records["batch"] = self.batches
+        records["ts_ns"] = self.clock() if ts_ns is None else ts_ns
+
+        # Kare kaydi, o karenin nesnelerinden hemen once gelir
+        frame_pos = columns.frame_start[:f] + np.arange(f)
+        frames = records[frame_pos]
+        frames["kind"] = KIND_FRAME
+        frames["pad_index"] = columns.frame_pad_index[:f]
+        frames["frame_num"] = columns.frame_frame_num[:f]
+        frames["buf_pts"] = [frame_meta.buf_pts for frame_meta in columns.frames]
+        records[frame_pos] = frames
+
+        object_pos = np.arange(n) + columns.frame_row[:n] + 1
+        objects = records[object_pos]
+        objects["kind"] = KIND_OBJECT
+        objects["pad_index"] = columns.pad_index[:n]
+        objects["frame_num"] = columns.frame_num[:n]
+        objects["class_id"] = columns.class_id[:n]
+        objects["object_id"] = columns.object_id[:n]
+        objects["confidence"] = columns.confidence[:n]
+        objects["rect"] = columns.rect[:n]
+        if self.masks is not None and n:
+            self._record_masks(columns, objects)
+        records[object_pos] = objects
+
+        self.file.write(records.tobytes())
+        self.batches += 1
+        if self.batches % self.flush_every == 0:
+            self.flush()
+        return len(records)
+
+    def _record_masks(self, columns, objects):
+        mask_batch = self.masks.extract(columns)
+        chunks = []
+        for rows, stack in mask_batch.groups:
+            height, width = stack.shape[1:]
+            objects["mask_height"][rows] = height
+            objects["mask_width"][rows] = width
+            for row, rle in zip(rows.tolist(), rle_encode_many(stack)):
+                counts = np.asarray(rle["counts"], dtype="<u4")
+                objects["mask_offset"][row] = self.mask_offset
+                objects["mask_len"][row] = len(counts)
+                self.mask_offset += counts.nbytes
+                chunks.append(counts.tobytes())
+        self.mask_file.write(b"".join(chunks))
+
+    def flush(self):
+        self.file.flush()
+        if self.mask_file:
+            self.mask_file.flush()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+        if self.mask_file:
+            self.mask_file.close()
+
+
+def _check_header(path):
+    with open(path, "rb") as file:
+        magic, version, record_size, created = struct.unpack_from(HEADER_FORMAT, file.read(HEADER_SIZE))
+    if magic != TRACE_MAGIC:
+        raise ValueError("%s is not a metadata trace" % path)
+    if version != TRACE_VERSION or record_size != RECORD_DTYPE.itemsize:
+        raise ValueError("%s: unsupported trace version %d (record size %d)" % (path, version, record_size))
+    return created
+
+
+def _record_count(path):
+    # Yarim kalan son kayit (crash) yok sayilir
+    return (os.path.getsize(path) - HEADER_SIZE) // RECORD_DTYPE.itemsize
+
+
+class TraceReader:
+    """Memory-mapped, read-only view of a trace written by TraceRecorder.
+
+    records is a structured NumPy array backed by the mapping; batch(i)
+    returns a view of the records of batch i without copying.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.created = _check_header(path)
+        count = _record_count(path)
+        self.file = open(path, "rb")
+        self.mmap = None
+        if count:
+            self.mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.records = np.frombuffer(self.mmap, dtype=RECORD_DTYPE, count=count, offset=HEADER_SIZE)
+        else:
+            self.records = np.zeros(0, dtype=RECORD_DTYPE)
+        batch = self.records["batch"]
+        self.starts = np.concatenate(([0], np.flatnonzero(batch[1:] != batch[:-1]) + 1, [count])) \
+            if count else np.zeros(1, dtype=np.int64)
+
+        self.mask_data = np.zeros(0, dtype="<u4")
+        if os.path.exists(mask_path(path)) and os.path.getsize(mask_path(path)):
+            self.mask_data = np.memmap(mask_path(path), dtype="<u4", mode="r")
+
+    def __len__(self):
+        return len(self.starts) - 1
+
+    def batch(self, i):
+        return self.records[self.starts[i]:self.starts[i + 1]]
+
+    def mask(self, record):
+        """Decoded bool mask of an object record, or None."""
+        if not record["mask_len"]:
+            return None
+        start = int(record["mask_offset"]) // 4
+        counts = self.mask_data[start:start + int(record["mask_len"])]
+        h, w = int(record["mask_height"]), int(record["mask_width"])
+        values = np.zeros(len(counts), dtype=bool)
+        values[1::2] = True
+        return np.repeat(values, counts).reshape(w, h).T
+
+    def make_batch_meta(self, i, backend):
+        """Rebuild batch i as NvDsBatchMeta of a pure-Python pyds (common.fake_pyds)."""
+        frames = []
+        for record in self.batch(i):
+            if record["kind"] == KIND_FRAME:
+                frame_meta = backend.NvDsFrameMeta(int(record["pad_index"]), int(record["frame_num"]),
+                                                   buf_pts=int(record["buf_pts"]))
+                frames.append(frame_meta)
+                continue
+            left, top, width, height = record["rect"].tolist()
+            class_id = int(record["class_id"])
+            obj_meta = backend.make_object(int(record["object_id"]), class_id, left, top, width, height,
+                                           confidence=float(record["confidence"]), label=str(class_id))
+            mask = self.mask(record)
+            if mask is not None:
+                obj_meta.mask_params = backend.NvOSD_MaskParams(
+                    mask.astype(np.float32).ravel(), mask.shape[1], mask.shape[0], 0.5)
+            frame_meta.objects.append(obj_meta)
+        for frame_meta in frames:
+            frame_meta.obj_meta_list = backend.to_glist(frame_meta.objects)
+            frame_meta.num_obj_meta = len(frame_meta.objects)
+        return backend.NvDsBatchMeta(frames)
+
+    def replay(self, callback, backend, speed=None, start=0, stop=None):
+        """Call callback(i, batch_meta) for each batch.
+
+        speed None replays as fast as possible; otherwise the recorded
+        inter-batch gaps are divided by speed (1.0 is real time).
+        """
+        stop = len(self) if stop is None else min(stop, len(self))
+        first_ts = None
+        wall_start = time.monotonic_ns()
+        for i in range(start, stop):
+            batch_meta = self.make_batch_meta(i, backend)
+            if speed:
+                ts = int(self.records["ts_ns"][self.starts[i]])
+                if first_ts is None:
+                    first_ts = ts
+                delay = (ts - first_ts) / speed - (time.monotonic_ns() - wall_start)
+                if delay > 0:
+                    time.sleep(delay / 1e9)
+            callback(i, batch_meta)
+
+    def close(self):
+        # Mapping'e bakan view'lar birakilmadan mmap kapatilamaz
+        self.records = None
+        self.mask_data = None
+        if self.mmap:
+            self.mmap.close()
+        self.file.close()
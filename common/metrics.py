@@ -0,0 +1,249 @@
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+
+import numpy as np
+
+FRAME_WINDOW = 300
+WINDOW_SECONDS = 5.0
+TIMING_WINDOW = 1024
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class StreamMetrics:
+    """Sliding-window frame statistics for one stream.
+
+    There is a single writer (the streaming thread calling frame()), so
+    updates are plain stores into a preallocated ring and need no lock.
+    Readers take a snapshot and tolerate seeing a frame more or less.
+    """
+
+    def __init__(self, window=FRAME_WINDOW, window_seconds=WINDOW_SECONDS):
+        self.window = window
+        self.window_seconds = window_seconds
+        self.times = np.zeros(window, dtype=np.float64)
+        self.count = 0
+        self.dropped = 0
+        self.last_frame_num = None
+        self.last_time = None
+
+    def frame(self, frame_num=None, now=None):
+        if now is None:
+            now = time.monotonic()
+        self.times[self.count % self.window] = now
+        self.count += 1
+        self.last_time = now
+        if frame_num is not None:
+            last = self.last_frame_num
+            if last is not None and frame_num > last + 1:
+                self.dropped += frame_num - last - 1
+            self.last_frame_num = frame_num
+
+    def snapshot(self, now=None):
+        if now is None:
+            now = time.monotonic()
+        count = self.count
+        times = self.times.copy()
+        valid = min(count, self.window)
+        if valid < self.window:
+            times = times[:valid]
+        else:
+            times = np.roll(times, -(count % self.window))
+        times = times[times >= now - self.window_seconds]
+
+        fps = 0.0
+        gaps = np.zeros(0)
+        if len(times) >= 2:
+            span = now - times[0]
+            fps = (len(times) - 1) / span if span > 0 else 0.0
+            gaps = np.diff(times)
+        return {
+            "frames": count,
+            "dropped": self.dropped,
+            "fps": float(fps),
+            "gaps": {q: float(np.quantile(gaps, q)) if len(gaps) else 0.0 for q in QUANTILES},
+        }
+
+
+class TimingMetrics:
+    """Ring of recent durations (seconds) plus lifetime count and sum."""
+
+    def __init__(self, window=TIMING_WINDOW):
+        self.window = window
+        self.samples = np.zeros(window, dtype=np.float64)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds):
+        self.samples[self.count % self.window] = seconds
+        self.count += 1
+        self.total += seconds
+
+    def snapshot(self):
+        count = self.count
+        samples = self.samples[:min(count, self.window)].copy()
+        return {
+            "count": count,
+            "sum": self.total,
+            "quantiles": {q: float(np.quantile(samples, q)) if len(samples) else 0.0
+                          for q in QUANTILES},
+        }
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{%s}" % ",".join('%s="%s"' % (key, value) for key, value in labels)
+
+
+class MetricsRegistry:
+    """Per-stream frame metrics, probe timings and free-form counters/gauges.
+
+    Stream and timing entries are created on first use; afterwards every
+    per-frame update touches only the object of its own stream. Counters
+    and gauges have writers on several threads (probes, queue signals,
+    snapshot workers) and are updated under a lock.
+    """
+
+    def __init__(self, prefix="ds", window=FRAME_WINDOW, window_seconds=WINDOW_SECONDS):
+        self.prefix = prefix
+        self.window = window
+        self.window_seconds = window_seconds
+        self.streams = {}
+        self.timings = {}
+        self.counters = {}
+        self.gauges = {}
+        self.lock = Lock()
+
+    def stream(self, pad_index):
+        metrics = self.streams.get(pad_index)
+        if metrics is None:
+            metrics = self.streams.setdefault(
+                pad_index, StreamMetrics(self.window, self.window_seconds))
+        return metrics
+
+    def remove_stream(self, pad_index):
+        self.streams.pop(pad_index, None)
+
+    def timing(self, name):
+        metrics = self.timings.get(name)
+        if metrics is None:
+            metrics = self.timings.setdefault(name, TimingMetrics())
+        return metrics
+
+    def timed(self, name, probe):
+        """Wrap a pad probe callback so its execution time is recorded."""
+        metrics = self.timing(name)
+
+        def wrapper(*args):
+            start = time.perf_counter()
+            try:
+                return probe(*args)
+            finally:
+                metrics.observe(time.perf_counter() - start)
+
+        return wrapper
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def set_gauge(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.gauges[key] = value
+
+    def remove_gauge(self, name, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.gauges.pop(key, None)
+
+    def fps(self):
+        return {"stream{0}".format(pad_index): round(float(metrics.snapshot()["fps"]), 2)
+                for pad_index, metrics in sorted(self.streams.items())}
+
+    def perf_print_callback(self):
+        print("\n**PERF: ", self.fps(), "\n")
+        return True
+
+    def render_prometheus(self):
+        p = self.prefix
+        lines = [
+            "# TYPE %s_stream_fps gauge" % p,
+            "# TYPE %s_stream_frames_total counter" % p,
+            "# TYPE %s_stream_dropped_frames_total counter" % p,
+            "# TYPE %s_stream_frame_gap_seconds summary" % p,
+        ]
+        for pad_index, metrics in sorted(self.streams.items()):
+            snap = metrics.snapshot()
+            stream = 'stream="%s"' % pad_index
+            lines.append('%s_stream_fps{%s} %.3f' % (p, stream, snap["fps"]))
+            lines.append('%s_stream_frames_total{%s} %d' % (p, stream, snap["frames"]))
+            lines.append('%s_stream_dropped_frames_total{%s} %d' % (p, stream, snap["dropped"]))
+            for q, value in snap["gaps"].items():
+                lines.append('%s_stream_frame_gap_seconds{%s,quantile="%s"} %.6f' % (p, stream, q, value))
+
+        lines.append("# TYPE %s_probe_duration_seconds summary" % p)
+        for name, metrics in sorted(self.timings.items()):
+            snap = metrics.snapshot()
+            probe = 'probe="%s"' % name
+            for q, value in snap["quantiles"].items():
+                lines.append('%s_probe_duration_seconds{%s,quantile="%s"} %.6f' % (p, probe, q, value))
+            lines.append('%s_probe_duration_seconds_sum{%s} %.6f' % (p, probe, snap["sum"]))
+            lines.append('%s_probe_duration_seconds_count{%s} %d' % (p, probe, snap["count"]))
+
+        with self.lock:
+            counters, gauges = sorted(self.counters.items()), sorted(self.gauges.items())
+        for kind, values in (("counter", counters), ("gauge", gauges)):
+            declared = set()
+            for (name, labels), value in values:
+                if name not in declared:
+                    lines.append("# TYPE %s_%s %s" % (p, name, kind))
+                    declared.add(name)
+                lines.append("%s_%s%s %s" % (p, name, _labels(labels), value))
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """Serves a registry as Prometheus text on http://host:port/metrics.
+
+    Runs in its own daemon thread, away from the GStreamer streaming threads.
+    """
+
+    def __init__(self, registry, host="127.0.0.1", port=9108):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.httpd = None
+        self.thread = None
+
+    def start(self):
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry.render_prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.port = self.httpd.server_address[1]
+        self.thread = Thread(target=self.httpd.serve_forever, name="metrics-http", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
@@ -0,0 +1,218 @@
+import sys
+import time
+from threading import Lock, Thread
+
+import gi
+gi.require_version('Gst', '1.0')
+from gi.repository import GLib, Gst
+
+SWAP_DRAIN_TIMEOUT = 5.0
+
+
+class ModelSwapper:
+    """Replaces the inference element of a PLAYING pipeline between two buffers.
+
+    swap(config_path) first prepares the new model off the main loop:
+    prepare(config_path) (e.g. the engine cache build, which may return
+    the config copy to use instead) and make_element(config_path) brought
+    to PAUSED, which is where nvinfer deserializes its engine, while the
+    old element keeps running. Then the pad feeding the old element is
+    blocked, the old element is drained with an EOS that is dropped at its
+    src pad, and the new element is linked in its place. Sources and
+    everything downstream stay up; the swap gap is the time between the
+    last buffer out of the old element and the first one out of the new
+    element. If the new element does not link, the old one is put back
+    with its probes and the swap ends "failed".
+
+    on_swapped callbacks get (old, new, config_path) on the main loop,
+    before the first buffer reaches the new element, to move probes and
+    reload labels. Any element with static sink/src pads works, so the
+    sequence can be exercised with stand-ins (identity).
+    """
+
+    def __init__(self, pipeline, element, make_element, prepare=None, on_swapped=(), config_path=None,
+                 metrics=None, drain_timeout=SWAP_DRAIN_TIMEOUT, clock=time.monotonic):
+        self.pipeline = pipeline
+        self.element = element
+        self.config_path = config_path
+        self.make_element = make_element
+        self.prepare = prepare
+        self.on_swapped = list(on_swapped)
+        self.metrics = metrics
+        self.drain_timeout = drain_timeout
+        self.clock = clock
+        self.lock = Lock()
+        # idle -> preparing -> draining -> starting -> idle (veya failed)
+        self.state = "idle"
+        self.error = None
+        self.swaps = 0
+        self.last_gap_ms = None
+        self.last_drain_ms = None
+        self.pending = None
+        self.upstream = None
+        self.downstream = None
+        self.block_probe = None
+        self.old_probes = []
+        self.timeout_id = None
+        self.last_output = None
+        self.blocked_at = None
+
+    def swap(self, config_path):
+        """Start swapping to config_path; False if a swap is already in progress. Thread safe."""
+        with self.lock:
+            if self.state in ("preparing", "draining"):
+                return False
+            self.state = "preparing"
+            self.error = None
+        Thread(target=self._prepare, args=(config_path,), name="model-swap", daemon=True).start()
+        return True
+
+    def status(self):
+        return {"state": self.state, "config": self.config_path, "swaps": self.swaps,
+                "last_gap_ms": self.last_gap_ms, "error": self.error}
+
+    def _fail(self, message, element=None):
+        if element is not None:
+            element.set_state(Gst.State.NULL)
+        with self.lock:
+            self.state = "failed"
+            self.error = message
+        sys.stderr.write("Model swap failed: %s\n" % message)
+        if self.metrics:
+            self.metrics.inc("model_swap_failures_total")
+
+    def _prepare(self, config_path):
+        element = None
+        try:
+            if self.prepare:
+                config_path = self.prepare(config_path) or config_path
+            element = self.make_element(config_path)
+            if element is None:
+                raise RuntimeError("unable to create the element for %s" % config_path)
+            # Engine burada yuklenir; eski model bu sirada calismaya devam eder
+            if element.set_state(Gst.State.PAUSED) == Gst.StateChangeReturn.FAILURE:
+                raise RuntimeError("%s failed to start with %s" % (element.get_name(), config_path))
+        except Exception as e:
+            self._fail(str(e), element)
+            return
+        GLib.idle_add(self._begin, element, config_path)
+
+    def _begin(self, element, config_path):
+        old = self.element
+        self.upstream = old.get_static_pad("sink").get_peer()
+        self.downstream = old.get_static_pad("src").get_peer()
+        if self.upstream is None or self.downstream is None:
+            self._fail("%s is not linked" % old.get_name(), element)
+            return False
+        self.pending = (element, config_path)
+        self.last_output = self.blocked_at = None
+        with self.lock:
+            self.state = "draining"
+
+        src_pad = old.get_static_pad("src")
+        self.old_probes = [
+            (src_pad, src_pad.add_probe(Gst.PadProbeType.BUFFER, self._old_output)),
+            (src_pad, src_pad.add_probe(Gst.PadProbeType.EVENT_DOWNSTREAM, self._old_event)),
+        ]
+        self.block_probe = self.upstream.add_probe(Gst.PadProbeType.BLOCK_DOWNSTREAM, self._blocked)
+        self.timeout_id = GLib.timeout_add(int(self.drain_timeout * 1000), self._drain_timeout)
+        return False
+
+    def _blocked(self, pad, info):
+        # Upstream thread'i burada bekler; eski elemandaki kareler EOS ile bosaltilir
+        if self.blocked_at is None:
+            self.blocked_at = self.clock()
+            self.element.get_static_pad("sink").send_event(Gst.Event.new_eos())
+        return Gst.PadProbeReturn.OK
+
+    def _old_output(self, pad, info):
+        self.last_output = self.clock()
+        return Gst.PadProbeReturn.OK
+
+    def _old_event(self, pad, info):
+        event = info.get_event()
+        if event is None or event.type != Gst.EventType.EOS or self.state != "draining":
+            return Gst.PadProbeReturn.OK
+        # EOS downstream'e gecmez: tiler / sink'ler akisin bittigini gormez
+        GLib.idle_add(self._relink)
+        return Gst.PadProbeReturn.DROP
+
+    def _drain_timeout(self):
+        self.timeout_id = None
+        if self.state == "draining":
+            sys.stderr.write("Model swap: %s did not drain in %.1fs, relinking\n" % (
+                self.element.get_name(), self.drain_timeout))
+            self._relink()
+        return False
+
+    def _relink(self):
+        if self.state != "draining":
+            return False
+        if self.timeout_id is not None:
+            GLib.source_remove(self.timeout_id)
+            self.timeout_id = None
+        old = self.element
+        element, config_path = self.pending
+        self.pending = None
+        for pad, probe_id in self.old_probes:
+            pad.remove_probe(probe_id)
+        self.old_probes = []
+
+        self._unlink(old)
+        old.set_state(Gst.State.NULL)
+        self.pipeline.remove(old)
+        self.pipeline.add(element)
+        if not self._link(element):
+            # Geri al: eski eleman (kendi probe'lariyla) yeniden baglanir, akis eski modelle devam eder
+            self._unlink(element)
+            element.set_state(Gst.State.NULL)
+            self.pipeline.remove(element)
+            self.pipeline.add(old)
+            restored = self._link(old)
+            if restored:
+                old.sync_state_with_parent()
+            self.upstream.remove_probe(self.block_probe)
+            self.block_probe = None
+            self._fail("unable to link %s, %s" % (
+                element.get_name(), "kept %s" % old.get_name() if restored else "unable to relink %s" % old.get_name()))
+            return False
+        element.sync_state_with_parent()
+
+        old_config = self.config_path
+        self.element = element
+        self.config_path = config_path
+        self.last_drain_ms = (self.clock() - self.blocked_at) * 1000.0 if self.blocked_at else None
+        if self.last_output is None:
+            self.last_output = self.blocked_at or self.clock()
+        with self.lock:
+            self.state = "starting"
+        element.get_static_pad("src").add_probe(Gst.PadProbeType.BUFFER, self._first_output, old_config)
+        for callback in self.on_swapped:
+            callback(old, element, config_path)
+        self.upstream.remove_probe(self.block_probe)
+        self.block_probe = None
+        return False
+
+    def _link(self, element):
+        return (self.upstream.link(element.get_static_pad("sink")) == Gst.PadLinkReturn.OK
+                and element.get_static_pad("src").link(self.downstream) == Gst.PadLinkReturn.OK)
+
+    def _unlink(self, element):
+        sink, src = element.get_static_pad("sink"), element.get_static_pad("src")
+        if sink.is_linked():
+            self.upstream.unlink(sink)
+        if src.is_linked():
+            src.unlink(self.downstream)
+
+    def _first_output(self, pad, info, old_config):
+        gap_ms = (self.clock() - self.last_output) * 1000.0
+        self.last_gap_ms = gap_ms
+        self.swaps += 1
+        with self.lock:
+            if self.state == "starting":
+                self.state = "idle"
+        if self.metrics:
+            self.metrics.inc("model_swaps_total")
+            self.metrics.set_gauge("model_swap_gap_ms", gap_ms)
+        print("Model swapped: %s -> %s, gap %.1f ms" % (old_config, self.config_path, gap_ms))
+        return Gst.PadProbeReturn.REMOVE
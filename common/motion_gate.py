@@ -0,0 +1,210 @@
+import sys
+import time
+
+import gi
+import numpy as np
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst
+
+from common.metrics import StreamMetrics
+
+GATE_WIDTH = 64
+GATE_HEIGHT = 36
+
+# Kucultme zinciri; GPU'suz makinede (videotestsrc) CPU_ELEMENTS kullanilir
+DEFAULT_ELEMENTS = {"convert": ("nvvideoconvert",)}
+CPU_ELEMENTS = {"convert": ("videoconvert", "videoscale")}
+
+
+class ChangeDetector:
+    """Fraction of pixels changed against a per-source reference frame.
+
+    Frames are small grayscale arrays. A pixel counts as changed when it
+    differs from the reference by more than pixel_delta, which ignores
+    sensor noise and compression flicker. The reference is the frame of
+    the last inference (rebase), so slow drift adds up until it triggers.
+    """
+
+    def __init__(self, pixel_delta=12):
+        self.pixel_delta = pixel_delta
+        self.reference = {}
+        self.latest = {}
+        self.scores = {}
+
+    def update(self, index, frame):
+        frame = frame.astype(np.int16)
+        self.latest[index] = frame
+        reference = self.reference.get(index)
+        if reference is None or reference.shape != frame.shape:
+            score = 1.0
+        else:
+            score = np.count_nonzero(np.abs(frame - reference) > self.pixel_delta) / frame.size
+        self.scores[index] = score
+        return score
+
+    def rebase(self, index):
+        frame = self.latest.get(index)
+        if frame is not None:
+            self.reference[index] = frame
+
+    def drop_source(self, index):
+        self.reference.pop(index, None)
+        self.latest.pop(index, None)
+        self.scores.pop(index, None)
+
+
+class MotionGate:
+    """Skips inference of sources whose picture has not changed.
+
+    A side branch per source (tee -> leaky queue -> downscale to a small
+    GRAY8 frame -> fakesink) feeds the ChangeDetector; the gate probe on
+    the source bin pad then drops frames whose latest change score is
+    below threshold, so they never reach the muxer and nvinfer. A frame
+    is still inferred at least every refresh_every frames, and for
+    hold_frames after motion so objects that stop are seen settling. The
+    score lags the gated frame by at most the side branch's one buffer.
+
+    Skipped frames are gone for everything after the source bin: the
+    muxer, nvinfer, the tiler / OSD output and its sinks (recordings and
+    the RTSP stream run at the inferred rate), and the per-stream metrics
+    at the PGIE (fps drops, skipped frames count as dropped). Consumers
+    that must see the source rate (load control, the stall watchdog) use
+    arrival_fps() / last_arrival(), measured before the gate.
+    """
+
+    def __init__(self, threshold=0.005, refresh_every=30, hold_frames=5, detector=None, metrics=None,
+                 elements=None, width=GATE_WIDTH, height=GATE_HEIGHT, clock=time.monotonic):
+        self.threshold = threshold
+        self.refresh_every = refresh_every
+        self.hold_frames = hold_frames
+        self.detector = detector or ChangeDetector()
+        self.metrics = metrics
+        self.elements = dict(DEFAULT_ELEMENTS, **(elements or {}))
+        self.width = width
+        self.height = height
+        self.clock = clock
+        self.since_inference = {}
+        self.hold = {}
+        self.frames = {}
+        self.skipped = {}
+        # Kapi oncesi gelis hizi (atlanan kareler dahil)
+        self.arrivals = {}
+
+    def should_infer(self, index, now=None):
+        self.frames[index] = self.frames.get(index, 0) + 1
+        arrivals = self.arrivals.get(index)
+        if arrivals is None:
+            arrivals = self.arrivals[index] = StreamMetrics()
+        arrivals.frame(now=self.clock() if now is None else now)
+        score = self.detector.scores.get(index)
+        moving = score is None or score >= self.threshold
+        if moving:
+            self.hold[index] = self.hold_frames
+        hold = self.hold.get(index, 0)
+        since = self.since_inference.get(index, 0)
+        infer = moving or hold > 0 or since + 1 >= self.refresh_every
+        if infer:
+            self.since_inference[index] = 0
+            if not moving and hold > 0:
+                self.hold[index] = hold - 1
+            self.detector.rebase(index)
+        else:
+            self.since_inference[index] = since + 1
+            self.skipped[index] = self.skipped.get(index, 0) + 1
+        if self.metrics:
+            self.metrics.inc("motion_gate_frames_total", source=index)
+            if not infer:
+                self.metrics.inc("motion_gate_skipped_total", source=index)
+            self.metrics.set_gauge("motion_gate_skip_ratio", round(self.skip_ratio(index), 4), source=index)
+        return infer
+
+    def skip_ratio(self, index=None):
+        if index is None:
+            frames = sum(self.frames.values())
+            skipped = sum(self.skipped.values())
+        else:
+            frames = self.frames.get(index, 0)
+            skipped = self.skipped.get(index, 0)
+        return skipped / frames if frames else 0.0
+
+    def arrival_fps(self, index, now=None):
+        """Frame rate of a source before the gate, skipped frames included."""
+        arrivals = self.arrivals.get(index)
+        return arrivals.snapshot(self.clock() if now is None else now)["fps"] if arrivals else None
+
+    def last_arrival(self, index):
+        arrivals = self.arrivals.get(index)
+        return arrivals.last_time if arrivals else None
+
+    def drop_source(self, index):
+        """SourceManager.on_removed callback."""
+        self.detector.drop_source(index)
+        for state in (self.since_inference, self.hold, self.frames, self.skipped, self.arrivals):
+            state.pop(index, None)
+        if self.metrics:
+            self.metrics.remove_gauge("motion_gate_skip_ratio", source=index)
+
+    def add_branch(self, parent, index):
+        """Add the tee and the scoring branch to parent (a bin); returns the tee (None on failure).
+
+        The caller links its input to the tee sink pad and takes the main
+        output from a requested src_%u pad.
+        """
+        chain = [("tee", "motion-tee"), ("queue", "motion-queue")]
+        chain += [(factory, "motion-convert-%d" % i) for i, factory in enumerate(self.elements["convert"])]
+        chain += [("capsfilter", "motion-caps"), ("fakesink", "motion-sink")]
+        elements = []
+        for factory, name in chain:
+            element = Gst.ElementFactory.make(factory, name)
+            if not element:
+                sys.stderr.write("Unable to create %s for the motion gate\n" % factory)
+                return None
+            elements.append(element)
+        tee, queue, caps, sink = elements[0], elements[1], elements[-2], elements[-1]
+        # Yan dal ana dali asla bekletmez
+        queue.set_property("max-size-buffers", 1)
+        queue.set_property("leaky", 2)
+        caps.set_property("caps", Gst.Caps.from_string(
+            "video/x-raw, format=GRAY8, width=%d, height=%d" % (self.width, self.height)))
+        sink.set_property("sync", False)
+        sink.set_property("async", False)
+        for element in elements:
+            parent.add(element)
+        for upstream, downstream in zip(elements, elements[1:]):
+            if not upstream.link(downstream):
+                sys.stderr.write("Unable to link %s to %s\n" % (upstream.get_name(), downstream.get_name()))
+                return None
+        sink.get_static_pad("sink").add_probe(Gst.PadProbeType.BUFFER, self._sample_probe, index)
+        return tee
+
+    def _sample_probe(self, pad, info, index):
+        buffer = info.get_buffer()
+        caps = pad.get_current_caps()
+        if buffer is None or caps is None:
+            return Gst.PadProbeReturn.OK
+        structure = caps.get_structure(0)
+        width = structure.get_value("width")
+        height = structure.get_value("height")
+        ok, map_info = buffer.map(Gst.MapFlags.READ)
+        if not ok:
+            return Gst.PadProbeReturn.OK
+        try:
+            data = np.frombuffer(map_info.data, dtype=np.uint8)
+            stride = data.size // height
+            self.detector.update(index, data[:stride * height].reshape(height, stride)[:, :width])
+        finally:
+            buffer.unmap(map_info)
+        return Gst.PadProbeReturn.OK
+
+    def attach(self, index, source_bin):
+        """SourceManager.on_added callback: gate the source bin output."""
+        self.attach_pad(source_bin.get_static_pad("src"), index)
+
+    def attach_pad(self, pad, index):
+        if pad:
+            pad.add_probe(Gst.PadProbeType.BUFFER, self._gate_probe, index)
+
+    def _gate_probe(self, pad, info, index):
+        if self.should_infer(index):
+            return Gst.PadProbeReturn.OK
+        return Gst.PadProbeReturn.DROP
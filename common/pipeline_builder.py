@@ -0,0 +1,189 @@
+import math
+import sys
+from collections import namedtuple
+
+import gi
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst
+
+from common.media_config import is_live_uri
+from common.platform_info import get_platform_info
+
+# Ana zincirin elemanlari; chain LatencyTracer sinirlari (muxer -> tee)
+PipelineElements = namedtuple("PipelineElements", ["chain", "streammux", "pgie", "tiler", "osd", "tee"])
+
+
+def cb_newpad(decodebin, decoder_src_pad, data):
+    print("In cb_newpad\n")
+    caps = decoder_src_pad.get_current_caps()
+    if not caps:
+        caps = decoder_src_pad.query_caps()
+    gststruct = caps.get_structure(0)
+    gstname = gststruct.get_name()
+    source_bin = data
+    features = caps.get_features(0)
+
+    # Need to check if the pad created by the decodebin is for video and not
+    # audio.
+    print("gstname=", gstname)
+    if (gstname.find("video") != -1):
+        print("features=", features)
+        if features.contains("memory:NVMM"):
+            # Hareket tee'si / kaynak queue'su varsa ghost pad zaten onlarin arkasinda
+            entry = source_bin.get_by_name("motion-tee") or source_bin.get_by_name("source-queue")
+            if entry:
+                if decoder_src_pad.link(entry.get_static_pad("sink")) != Gst.PadLinkReturn.OK:
+                    sys.stderr.write(f"Failed to link decoder src pad to {entry.get_name()}\n")
+                return
+            # Get the source bin ghost pad
+            bin_ghost_pad = source_bin.get_static_pad("src")
+            if not bin_ghost_pad.set_target(decoder_src_pad):
+                sys.stderr.write("Failed to link decoder src pad to source bin ghost pad\n")
+        else:
+            sys.stderr.write(" Error: Decodebin did not pick nvidia decoder plugin.\n")
+
+
+def decodebin_child_added(child_proxy, Object, name, user_data):
+    platform_info = get_platform_info()
+    print("Decodebin child added:", name, "\n")
+    if name.find("decodebin") != -1:
+        Object.connect("child-added", decodebin_child_added, user_data)
+
+    if (name.find("nvv4l2decoder") != -1):
+        if (platform_info.is_integrated_gpu()):
+            Object.set_property("enable-max-performance", True)
+            Object.set_property("drop-frame-interval", 0)
+            Object.set_property("num-extra-surfaces", 0)
+
+    if "source" in name:
+        source_element = child_proxy.get_by_name("source")
+        if source_element.find_property('drop-on-latency') != None:
+            Object.set_property("drop-on-latency", True)
+
+
+def create_source_bin(index, uri, queue_policy=None, motion_gate=None):
+    print("Creating source bin")
+
+    bin_name = "source-bin-%02d" % index
+    print(bin_name)
+    nbin = Gst.Bin.new(bin_name)
+    if not nbin:
+        sys.stderr.write(" Unable to create source bin \n")
+
+    uri_decode_bin = Gst.ElementFactory.make("uridecodebin", "uri-decode-bin")
+
+    if not uri_decode_bin:
+        sys.stderr.write(" Unable to create uri decode bin \n")
+
+    uri_decode_bin.set_property("uri", uri)
+    uri_decode_bin.connect("pad-added", cb_newpad, nbin)
+    uri_decode_bin.connect("child-added", decodebin_child_added, nbin)
+
+    Gst.Bin.add(nbin, uri_decode_bin)
+    # Hareket kapisi: tee'nin bir kolu kucuk gri kopyayi skorlar, digeri ana dal
+    main_pad = None
+    if motion_gate:
+        motion_tee = motion_gate.add_branch(nbin, index)
+        if not motion_tee:
+            return None
+        main_pad = motion_tee.request_pad_simple("src_%u")
+    # Kaynak bazli queue: decode ile muxer arasinda thread siniri
+    source_queue = queue_policy.make_source(index, live=is_live_uri(uri)) if queue_policy else None
+    if source_queue:
+        Gst.Bin.add(nbin, source_queue)
+        if main_pad and main_pad.link(source_queue.get_static_pad("sink")) != Gst.PadLinkReturn.OK:
+            sys.stderr.write(" Failed to link motion tee to source queue \n")
+            return None
+        bin_pad = nbin.add_pad(Gst.GhostPad.new("src", source_queue.get_static_pad("src")))
+    elif main_pad:
+        bin_pad = nbin.add_pad(Gst.GhostPad.new("src", main_pad))
+    else:
+        bin_pad = nbin.add_pad(Gst.GhostPad.new_no_target("src", Gst.PadDirection.SRC))
+    if not bin_pad:
+        sys.stderr.write(" Failed to add ghost pad in source bin \n")
+        return None
+    return nbin
+
+
+def make_pgie(config_path, batch_size):
+    pgie = Gst.ElementFactory.make("nvinfer", "primary-inference")
+    if not pgie:
+        sys.stderr.write(" Unable to create pgie \n")
+        return None
+    pgie.set_property('config-file-path', config_path)
+    pgie.set_property("batch-size", batch_size)
+    pgie.set_property('output-tensor-meta', True)
+    return pgie
+
+
+def make_streammux(width, height, batch_size, batch_timeout_usec, live=True):
+    streammux = Gst.ElementFactory.make("nvstreammux", "Stream-muxer")
+    streammux.set_property('width', width)
+    streammux.set_property('height', height)
+    streammux.set_property('batch-size', batch_size)
+    streammux.set_property('batched-push-timeout', batch_timeout_usec)
+    streammux.set_property('live-source', int(live))
+    return streammux
+
+
+def make_tiler(max_sources, width, height):
+    # Bu demux/mux dongusu yerine cok daha kararlidir
+    tiler = Gst.ElementFactory.make("nvmultistreamtiler", "nvtiler")
+    tiler.set_property("rows", int(math.sqrt(max_sources)))
+    tiler.set_property("columns", int(math.ceil((1.0 * max_sources) / int(math.sqrt(max_sources)))))
+    tiler.set_property("width", width)
+    tiler.set_property("height", height)
+    return tiler
+
+
+def build_pipeline(pipeline, streammux, pgie, queue_policy, max_sources, tiled_size, snapshot_rgba=False,
+                   is_tegra=False):
+    """Add and link muxer -> nvinfer -> tiler -> nvdsosd -> tee with the stage queues of queue_policy.
+
+    Used by ds-segmentation.py and the DeepStream pipeline of
+    scripts/tune_pipeline.py, so a tuning run measures the same chain.
+
+    The tiler is sized for max_sources tiles of tiled_size (width, height).
+    With snapshot_rgba the batch is converted to CPU-mappable RGBA before
+    the tiler, for crops of the source frames. Returns PipelineElements,
+    or None if two elements do not link.
+    """
+    # 3. Tiler (Izgara gorunumu)
+    tiler = make_tiler(max_sources, *tiled_size)
+
+    # Convert
+    nvvidconv = Gst.ElementFactory.make("nvvideoconvert", "nvvidconv")
+
+    # Snapshot kesitleri tiler'dan once kaynak karesinden CPU'dan okunur: RGBA ve (dGPU'da) unified bellek
+    snapshot_convert = snapshot_caps = None
+    if snapshot_rgba:
+        snapshot_convert = Gst.ElementFactory.make("nvvideoconvert", "snapshot_convert")
+        if not is_tegra:
+            snapshot_convert.set_property("nvbuf-memory-type", 3)
+        snapshot_caps = Gst.ElementFactory.make("capsfilter", "snapshot_caps")
+        snapshot_caps.set_property("caps", Gst.Caps.from_string("video/x-raw(memory:NVMM), format=RGBA"))
+
+    # TEK OSD (GLOBAL)
+    osd = Gst.ElementFactory.make("nvdsosd", "global_osd")
+    osd.set_property('display-mask', True)
+
+    # Asama queue'lari (devre disi olanlar None, zincirden cikar)
+    queue_pre_pgie = queue_policy.make("pre_pgie", "queue_pre_pgie")
+    queue_post_pgie = queue_policy.make("post_pgie", "queue_post_pgie")
+    queue_post_osd = queue_policy.make("post_osd", "queue_post_osd")
+
+    # Global Tee
+    tee_global = Gst.ElementFactory.make("tee", "global_tee")
+
+    chain = [element for element in (streammux, queue_pre_pgie, pgie, queue_post_pgie, snapshot_convert,
+                                     snapshot_caps, tiler, nvvidconv, osd, queue_post_osd, tee_global)
+             if element is not None]
+    # Muxer kaynaklar baglanmadan once pipeline'a eklenmis olabilir
+    for element in chain:
+        if element.get_parent() is None:
+            pipeline.add(element)
+    for upstream, downstream in zip(chain, chain[1:]):
+        if not upstream.link(downstream):
+            sys.stderr.write(f"Unable to link {upstream.get_name()} to {downstream.get_name()}\n")
+            return None
+    return PipelineElements(chain, streammux, pgie, tiler, osd, tee_global)
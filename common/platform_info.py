@@ -15,6 +15,8 @@
 # limitations under the License.
 ################################################################################
 
+import json
+import os
 import sys
 import platform
 from threading import Lock
@@ -24,6 +26,7 @@ from threading import Lock
 # from cuda.bindings import driver
 
 guard_platform_info = Lock()
+_platform_info = None
 
 
 class PlatformInfo:
@@ -34,6 +37,8 @@ class PlatformInfo:
         self.is_integrated_gpu_verified = False
         self.is_aarch64_platform = False
         self.is_aarch64_verified = False
+        # cuInit bir kez denenir; basarisizsa tekrar denenmez
+        self.integrated_gpu_check_failed = False
 
     def is_wsl(self):
         with guard_platform_info:
@@ -56,6 +61,9 @@ class PlatformInfo:
         return self.is_wsl_system
 
     def is_integrated_gpu(self):
+        if self.is_integrated_gpu_verified or self.integrated_gpu_check_failed:
+            return self.is_integrated_gpu_system
+
         # BURAYA EKLEDIK (Lazy Import)
         # Sadece bu fonksiyon cagrilinca cuda yuklenecek.
         try:
@@ -63,6 +71,7 @@ class PlatformInfo:
             from cuda.bindings import driver
         except ImportError:
             print("ERROR: cuda.bindings module not found. Make sure cuda-python is installed.")
+            self.integrated_gpu_check_failed = True
             return False
 
         # Using cuda apis to identify whether integrated/discreet
@@ -94,6 +103,7 @@ class PlatformInfo:
                         print("ERROR: Getting cuda device count failed: {}".format(device_count_result))
                 else:
                     print("ERROR: Cuda init failed: {}".format(cuda_init_result))
+                self.integrated_gpu_check_failed = not self.is_integrated_gpu_verified
 
         return self.is_integrated_gpu_system
 
@@ -105,5 +115,65 @@ class PlatformInfo:
             self.is_aarch64_verified = True
         return self.is_aarch64_platform
 
+    def facts(self):
+        """Verified facts as a dict (for persisting)."""
+        facts = {}
+        if self.wsl_verified:
+            facts["is_wsl"] = self.is_wsl_system
+        if self.is_integrated_gpu_verified:
+            facts["is_integrated_gpu"] = bool(self.is_integrated_gpu_system)
+        if self.is_aarch64_verified:
+            facts["is_aarch64"] = self.is_aarch64_platform
+        return facts
+
+    def load_facts(self, facts):
+        if "is_wsl" in facts:
+            self.is_wsl_system, self.wsl_verified = facts["is_wsl"], True
+        if "is_integrated_gpu" in facts:
+            self.is_integrated_gpu_system, self.is_integrated_gpu_verified = facts["is_integrated_gpu"], True
+        if "is_aarch64" in facts:
+            self.is_aarch64_platform, self.is_aarch64_verified = facts["is_aarch64"], True
+
+
+def _host_key():
+    # Ayni makine + cekirdek surumu icin gecerli
+    uname = platform.uname()
+    return "%s|%s|%s" % (uname.node, uname.release, uname.machine)
+
+
+def get_platform_info(cache_path=None):
+    """Process-wide PlatformInfo; facts are detected once.
+
+    With cache_path, facts verified on an earlier run of the same host and
+    kernel are loaded from that JSON file, and save_platform_info() writes
+    them back.
+    """
+    global _platform_info
+    with guard_platform_info:
+        if _platform_info is None:
+            _platform_info = PlatformInfo()
+            if cache_path:
+                try:
+                    with open(cache_path, "r") as cache_file:
+                        cached = json.load(cache_file)
+                    if cached.get("host") == _host_key():
+                        _platform_info.load_facts(cached.get("facts", {}))
+                except (OSError, ValueError):
+                    pass
+    return _platform_info
+
+
+def save_platform_info(cache_path):
+    if _platform_info is None:
+        return
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+        tmp_path = "%s.tmp.%d" % (cache_path, os.getpid())
+        with open(tmp_path, "w") as cache_file:
+            json.dump({"host": _host_key(), "facts": _platform_info.facts()}, cache_file)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"ERROR: Writing platform cache failed: {e}")
+
 
 sys.path.append('/opt/nvidia/deepstream/deepstream/lib')
\ No newline at end of file
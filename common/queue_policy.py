@@ -0,0 +1,220 @@
+import configparser
+import sys
+from collections import namedtuple
+
+import gi
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst
+
+QUEUE_SECTION_PREFIX = "Queue"
+QUEUE_STAGES = ("source", "pre_pgie", "post_pgie", "post_osd")
+LEAKY_MODES = {"no": 0, "upstream": 1, "downstream": 2}
+MUXER_BATCH_TIMEOUT_USEC = 33000
+
+# Bir asama devre disi ise elemanlar dogrudan baglanir (ayri thread yok)
+QueueSpec = namedtuple("QueueSpec", ["stage", "enabled", "max_buffers", "max_time_ms", "leaky"])
+
+# config.ini'de [Queue-<stage>] yoksa eski davranis: sadece OSD sonrasi leaky queue
+QUEUE_DEFAULTS = {
+    "source": QueueSpec("source", False, 2, 0, "downstream"),
+    "pre_pgie": QueueSpec("pre_pgie", False, 2, 0, "no"),
+    "post_pgie": QueueSpec("post_pgie", False, 2, 0, "no"),
+    "post_osd": QueueSpec("post_osd", True, 1, 0, "downstream"),
+}
+
+
+def load_queue_specs(config_path):
+    """Read the [Queue-<stage>] sections of config/python_app/config.ini."""
+    parser = configparser.ConfigParser()
+    parser.read(config_path)
+    specs = {}
+    for stage in QUEUE_STAGES:
+        default = QUEUE_DEFAULTS[stage]
+        section = "%s-%s" % (QUEUE_SECTION_PREFIX, stage)
+        if not parser.has_section(section):
+            specs[stage] = default
+            continue
+        leaky = parser.get(section, "leaky", fallback=default.leaky).strip().lower()
+        if leaky not in LEAKY_MODES:
+            sys.stderr.write("%s: unknown leaky mode %r, using %r\n" % (section, leaky, default.leaky))
+            leaky = default.leaky
+        specs[stage] = QueueSpec(
+            stage=stage,
+            enabled=parser.getboolean(section, "enable", fallback=True),
+            max_buffers=parser.getint(section, "max_buffers", fallback=default.max_buffers),
+            max_time_ms=parser.getfloat(section, "max_time_ms", fallback=default.max_time_ms),
+            leaky=leaky,
+        )
+    return specs
+
+
+def load_freshness_settings(config_path, section="Settings"):
+    """Muxer batch timeout (usec) and frame age budget (ms, 0: off) from [Settings]."""
+    parser = configparser.ConfigParser()
+    parser.read(config_path)
+    return {
+        "muxer_batch_timeout_usec": parser.getint(section, "muxer_batch_timeout_usec",
+                                                  fallback=MUXER_BATCH_TIMEOUT_USEC),
+        "max_frame_age_ms": parser.getfloat(section, "max_frame_age_ms", fallback=0.0),
+    }
+
+
+class QueuePolicy:
+    """Creates the queues between pipeline stages and reports their fill level.
+
+    Every enabled stage gets a queue (and so a streaming thread boundary)
+    with a bounded size; only the byte limit is lifted so buffers and time
+    are the effective bounds. A leaky queue drops instead of blocking
+    upstream, which keeps latency from growing when a later stage is
+    slower than the sources. Overruns (for leaky queues: drops) are
+    counted from the queue's overrun signal, the fill levels are sampled
+    by sample() into gauges.
+    """
+
+    def __init__(self, specs, metrics=None):
+        self.specs = specs
+        self.metrics = metrics
+        self.queues = {}
+
+    @classmethod
+    def from_config(cls, config_path, metrics=None):
+        return cls(load_queue_specs(config_path), metrics)
+
+    def enabled(self, stage):
+        spec = self.specs.get(stage)
+        return bool(spec and spec.enabled)
+
+    def make(self, stage, name, label=None, leaky=None):
+        """Queue element for stage, or None if the stage is disabled."""
+        if not self.enabled(stage):
+            return None
+        spec = self.specs[stage]
+        if leaky is not None:
+            spec = spec._replace(leaky=leaky)
+        queue = Gst.ElementFactory.make("queue", name)
+        if not queue:
+            sys.stderr.write("Unable to create queue %s\n" % name)
+            return None
+        queue.set_property("max-size-buffers", spec.max_buffers)
+        queue.set_property("max-size-bytes", 0)
+        queue.set_property("max-size-time", int(spec.max_time_ms * Gst.MSECOND))
+        queue.set_property("leaky", LEAKY_MODES[spec.leaky])
+        label = label or stage
+        queue.connect("overrun", self._on_overrun, label)
+        self.queues[label] = queue
+        return queue
+
+    def make_source(self, index, live=True):
+        """Per-source queue, placed inside the source bin.
+
+        The leaky mode only applies to live sources: a file source is
+        throttled by the queue instead, so none of its frames are lost.
+        """
+        return self.make("source", "source-queue", "source_%02d" % index, leaky=None if live else "no")
+
+    def drop_source(self, index):
+        """SourceManager.on_removed callback."""
+        self.forget("source_%02d" % index)
+
+    def forget(self, label):
+        self.queues.pop(label, None)
+        if self.metrics:
+            for name in ("queue_level_buffers", "queue_level_ms", "queue_fill_ratio"):
+                self.metrics.remove_gauge(name, stage=label)
+
+    def _on_overrun(self, queue, label):
+        if self.metrics:
+            self.metrics.inc("queue_overruns_total", stage=label)
+
+    def levels(self):
+        levels = {}
+        for label, queue in list(self.queues.items()):
+            buffers = queue.get_property("current-level-buffers")
+            limit = queue.get_property("max-size-buffers")
+            levels[label] = {
+                "buffers": buffers,
+                "ms": queue.get_property("current-level-time") / 1e6,
+                "fill": buffers / limit if limit else 0.0,
+            }
+        return levels
+
+    def sample(self):
+        """GLib timeout callback: publish queue fill levels."""
+        if self.metrics:
+            for label, level in self.levels().items():
+                self.metrics.set_gauge("queue_level_buffers", level["buffers"], stage=label)
+                self.metrics.set_gauge("queue_level_ms", round(level["ms"], 3), stage=label)
+                self.metrics.set_gauge("queue_fill_ratio", round(level["fill"], 3), stage=label)
+        return True
+
+
+class FrameAgeGate:
+    """Drops frames of live sources that are already too old to be worth inferring.
+
+    Attached at the source bin pads (before the muxer and inference). A
+    frame's age is the pipeline running time now minus the running time
+    of its timestamp, less the latency the live source reports for
+    itself (e.g. the rtsp jitterbuffer), so only delay added inside this
+    pipeline counts against max_age_ms. Non-live sources are never gated.
+    """
+
+    def __init__(self, max_age_ms, metrics=None):
+        self.max_age = int(max_age_ms * Gst.MSECOND)
+        self.metrics = metrics
+        self.segments = {}
+        self.latency = {}
+        self.dropped = 0
+
+    def attach(self, index, source_bin):
+        """SourceManager.on_added callback."""
+        pad = source_bin.get_static_pad("src")
+        if not pad:
+            return
+        self.segments.pop(index, None)
+        self.latency.pop(index, None)
+        pad.add_probe(Gst.PadProbeType.EVENT_DOWNSTREAM, self._event_probe, index)
+        pad.add_probe(Gst.PadProbeType.BUFFER, self._buffer_probe, index)
+
+    def drop_source(self, index):
+        self.segments.pop(index, None)
+        self.latency.pop(index, None)
+
+    def _event_probe(self, pad, info, index):
+        event = info.get_event()
+        if event.type == Gst.EventType.SEGMENT:
+            self.segments[index] = event.parse_segment()
+        return Gst.PadProbeReturn.OK
+
+    def _source_latency(self, pad, index):
+        latency = self.latency.get(index)
+        if latency is None:
+            query = Gst.Query.new_latency()
+            latency = -1
+            if pad.query(query):
+                live, min_latency, _ = query.parse_latency()
+                latency = min_latency if live else -1
+            self.latency[index] = latency
+        return latency
+
+    def _buffer_probe(self, pad, info, index):
+        segment = self.segments.get(index)
+        buffer = info.get_buffer()
+        if segment is None or buffer is None or buffer.pts == Gst.CLOCK_TIME_NONE:
+            return Gst.PadProbeReturn.OK
+        element = pad.get_parent_element()
+        clock = element.get_clock() if element else None
+        if clock is None:
+            return Gst.PadProbeReturn.OK
+        latency = self._source_latency(pad, index)
+        if latency < 0:
+            return Gst.PadProbeReturn.OK
+        running_time = segment.to_running_time(Gst.Format.TIME, buffer.pts)
+        if running_time == Gst.CLOCK_TIME_NONE:
+            return Gst.PadProbeReturn.OK
+        age = clock.get_time() - element.get_base_time() - running_time - latency
+        if age > self.max_age:
+            self.dropped += 1
+            if self.metrics:
+                self.metrics.inc("stale_frames_dropped_total", source=index)
+            return Gst.PadProbeReturn.DROP
+        return Gst.PadProbeReturn.OK
@@ -0,0 +1,98 @@
+import colorsys
+import hashlib
+from collections import namedtuple
+from threading import Lock
+
+import numpy as np
+
+from common.utils import load_labels
+
+MIN_FONT_SIZE = 8
+MAX_FONT_SIZE = 12
+# Nesne yuksekligi bu degere ulasinca font en buyuk boyuta cikar
+FONT_FULL_HEIGHT = 100
+TEXT_BG_ALPHA = 0.6
+TRAIL_ALPHA = 0.9
+
+
+def label_color(label, saturation=0.75, value=0.95):
+    """Deterministic (r, g, b) in [0, 1] derived from the label text."""
+    digest = hashlib.sha1(label.encode("utf-8")).digest()
+    hue = int.from_bytes(digest[:4], "little") / 2.0 ** 32
+    return colorsys.hsv_to_rgb(hue, saturation, value)
+
+
+class RenderStyle(namedtuple("RenderStyle", ["labels", "text_bg", "trail_color", "font_size_by_height"])):
+    """Immutable render style of one label set and source count, indexed by class_id."""
+    __slots__ = ()
+
+    def font_sizes(self, heights):
+        """Font size for an array of object heights."""
+        return self.font_size_by_height[np.clip(heights, 0, FONT_FULL_HEIGHT)]
+
+
+def _font_size_by_height(number_sources):
+    # Kaynak sayisi arttikca en buyuk font kuculur
+    max_fsize = MAX_FONT_SIZE
+    if number_sources > 1:
+        max_fsize = max(MIN_FONT_SIZE, MAX_FONT_SIZE - (number_sources - 1))
+    heights = np.arange(FONT_FULL_HEIGHT + 1)
+    sizes = (MIN_FONT_SIZE + (max_fsize - MIN_FONT_SIZE) * (heights / FONT_FULL_HEIGHT)).astype(np.int64)
+    return np.clip(sizes, MIN_FONT_SIZE, max_fsize)
+
+
+class RenderStyleTable:
+    """Per-class render style, built once and indexed by class_id.
+
+    Holds the capitalized label, the text background and trail RGBA tuples
+    and a font size for every object height (in pixels) up to
+    FONT_FULL_HEIGHT, so the OSD probe only does lookups per object.
+    Colors are seeded from the label and stay the same across restarts.
+    Class ids outside the label file get a color seeded from the id.
+
+    The columns are published together as one immutable RenderStyle in
+    self.style; writers (model swap, source changes, unknown classes)
+    build a new one under a lock and replace it, so the probe reads
+    self.style once per batch and never sees a half-updated table.
+    """
+
+    def __init__(self, labels, number_sources=1):
+        self.lock = Lock()
+        self.style = RenderStyle((), (), (), _font_size_by_height(number_sources))
+        self.set_labels(labels)
+
+    @classmethod
+    def from_pgie_config(cls, config_path, number_sources=1):
+        return cls(load_labels(config_path), number_sources)
+
+    def set_labels(self, labels):
+        """Rebuild the label / color columns (e.g. after a model swap)."""
+        rgb = [label_color(label) for label in labels]
+        text_bg = tuple((r, g, b, TEXT_BG_ALPHA) for r, g, b in rgb)
+        trail_color = tuple((r, g, b, TRAIL_ALPHA) for r, g, b in rgb)
+        display = tuple(label.capitalize() for label in labels)
+        with self.lock:
+            self.style = self.style._replace(labels=display, text_bg=text_bg, trail_color=trail_color)
+
+    def set_source_count(self, number_sources):
+        font_size_by_height = _font_size_by_height(number_sources)
+        with self.lock:
+            self.style = self.style._replace(font_size_by_height=font_size_by_height)
+
+    def font_sizes(self, heights):
+        """Font size for an array of object heights."""
+        return self.style.font_sizes(heights)
+
+    def ensure_class(self, class_id):
+        """Style whose columns can be indexed by class_id (unknown classes); returns the published style."""
+        with self.lock:
+            style = self.style
+            missing = range(len(style.labels), class_id + 1)
+            if not missing:
+                return style
+            rgb = [label_color(str(c)) for c in missing]
+            self.style = style._replace(
+                labels=style.labels + (None,) * len(rgb),
+                text_bg=style.text_bg + tuple((r, g, b, TEXT_BG_ALPHA) for r, g, b in rgb),
+                trail_color=style.trail_color + tuple((r, g, b, TRAIL_ALPHA) for r, g, b in rgb))
+            return self.style
@@ -0,0 +1,195 @@
+import configparser
+import os
+import sys
+import time
+
+import gi
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst
+
+SINK_MODES = ("display", "fake", "file", "rtsp")
+
+OUTPUT_DEFAULTS = {
+    "output_directory": "./videos_output",
+    "output_prefix": "deepstream_out",
+    "rtsp_port": "8554",
+    "rtsp_factory": "/live",
+    "rtsp_udpsync": "8255",
+    "encoder_codec": "H264",
+    "encoder_bitrate": "4000000",
+}
+
+# Element factories per role; override entries to build the branches on a CPU
+# box (e.g. videoconvert / x264enc / autovideosink).
+DEFAULT_ELEMENTS = {
+    "convert": "nvvideoconvert",
+    "encoder_caps": "video/x-raw(memory:NVMM), format=I420",
+    "encoder_H264": "nvv4l2h264enc",
+    "encoder_H265": "nvv4l2h265enc",
+    "parser_H264": "h264parse",
+    "parser_H265": "h265parse",
+    "payloader_H264": "rtph264pay",
+    "payloader_H265": "rtph265pay",
+    "muxer": "matroskamux",
+    "display_caps": "video/x-raw(memory:NVMM), format=RGBA",
+    "display_sink": "nveglglessink",
+    "display_transform": "nvegltransform",
+}
+
+
+def load_output_settings(config_path, section="Settings"):
+    """Read the output related keys of config/python_app/config.ini."""
+    parser = configparser.ConfigParser()
+    parser.read(config_path)
+    settings = dict(OUTPUT_DEFAULTS)
+    if parser.has_section(section):
+        for key in OUTPUT_DEFAULTS:
+            if parser.has_option(section, key):
+                settings[key] = parser.get(section, key).strip().strip("'\"")
+    settings["encoder_codec"] = settings["encoder_codec"].upper()
+    return settings
+
+
+class SinkBuilder:
+    """Builds output branches hanging off the global tee.
+
+    Each branch starts with its own queue on a tee request pad, so several
+    modes (e.g. file + rtsp) can run at the same time.
+    """
+
+    def __init__(self, pipeline, tee, settings, is_tegra=False, elements=None):
+        self.pipeline = pipeline
+        self.tee = tee
+        self.settings = settings
+        self.is_tegra = is_tegra
+        self.elements = dict(DEFAULT_ELEMENTS)
+        if elements:
+            self.elements.update(elements)
+        self.rtsp_server = None
+        self.output_files = []
+
+    def _make(self, factory, name):
+        element = Gst.ElementFactory.make(factory, name)
+        if not element:
+            sys.stderr.write(" Unable to create %s (%s)\n" % (name, factory))
+            return None
+        self.pipeline.add(element)
+        return element
+
+    def _capsfilter(self, caps, name):
+        caps_filter = self._make("capsfilter", name)
+        if caps_filter:
+            caps_filter.set_property("caps", Gst.Caps.from_string(caps))
+        return caps_filter
+
+    def _link_chain(self, chain):
+        if None in chain:
+            return False
+        for upstream, downstream in zip(chain, chain[1:]):
+            if not upstream.link(downstream):
+                sys.stderr.write(" Unable to link %s -> %s\n" % (upstream.get_name(), downstream.get_name()))
+                return False
+        return True
+
+    def _branch(self, mode, chain):
+        queue = self._make("queue", "queue_%s" % mode)
+        if not queue or None in chain:
+            return False
+        tee_src_pad = self.tee.request_pad_simple("src_%u")
+        if tee_src_pad.link(queue.get_static_pad("sink")) != Gst.PadLinkReturn.OK:
+            sys.stderr.write(" Unable to link tee to %s branch\n" % mode)
+            return False
+        return self._link_chain([queue] + chain)
+
+    def _encoder_chain(self, mode):
+        codec = self.settings["encoder_codec"]
+        convert = self._make(self.elements["convert"], "convert_%s" % mode)
+        caps_filter = self._capsfilter(self.elements["encoder_caps"], "encoder_caps_%s" % mode)
+        encoder = self._make(self.elements["encoder_%s" % codec], "encoder_%s" % mode)
+        if encoder and encoder.find_property("bitrate") is not None:
+            encoder.set_property("bitrate", int(self.settings["encoder_bitrate"]))
+        return [convert, caps_filter, encoder]
+
+    def add(self, mode):
+        if mode == "display":
+            return self.add_display()
+        if mode == "fake":
+            return self.add_fake()
+        if mode == "file":
+            return self.add_file()
+        if mode == "rtsp":
+            return self.add_rtsp()
+        sys.stderr.write(" Unknown sink mode: %s\n" % mode)
+        return False
+
+    def add_display(self):
+        # Format Zorlayici (Siyah ekrani onlemek icin RGBA zorluyoruz)
+        caps_filter = self._capsfilter(self.elements["display_caps"], "display_caps")
+        sink = self._make(self.elements["display_sink"], "nvvideo-renderer")
+        if sink:
+            sink.set_property("sync", False)  # Canli yayin oldugu icin False
+            sink.set_property("qos", False)
+        chain = [caps_filter]
+        if self.is_tegra:
+            print("Platform: Jetson. nvegltransform ekleniyor.")
+            chain.append(self._make(self.elements["display_transform"], "nvegl-transform"))
+        else:
+            print("Platform: dGPU. nvegltransform gerekmez.")
+        chain.append(sink)
+        return self._branch("display", chain)
+
+    def add_fake(self):
+        # Sadece analiz: goruntu cizilmez, kodlanmaz
+        sink = self._make("fakesink", "fake-sink")
+        if sink:
+            sink.set_property("sync", False)
+            sink.set_property("async", False)
+        return self._branch("fake", [sink])
+
+    def add_file(self):
+        codec = self.settings["encoder_codec"]
+        directory = self.settings["output_directory"]
+        os.makedirs(directory, exist_ok=True)
+        location = os.path.join(directory, "%s_%s.mkv" % (
+            self.settings["output_prefix"], time.strftime("%Y%m%d_%H%M%S")))
+        parser = self._make(self.elements["parser_%s" % codec], "parser_file")
+        muxer = self._make(self.elements["muxer"], "muxer_file")
+        sink = self._make("filesink", "file-sink")
+        if sink:
+            sink.set_property("location", location)
+            sink.set_property("sync", False)
+            sink.set_property("async", False)
+        self.output_files.append(location)
+        print(f"Recording to {location}")
+        return self._branch("file", self._encoder_chain("file") + [parser, muxer, sink])
+
+    def add_rtsp(self):
+        gi.require_version('GstRtspServer', '1.0')
+        from gi.repository import GstRtspServer
+
+        codec = self.settings["encoder_codec"]
+        udp_port = int(self.settings["rtsp_udpsync"])
+        payloader = self._make(self.elements["payloader_%s" % codec], "payloader_rtsp")
+        sink = self._make("udpsink", "udp-sink")
+        if sink:
+            sink.set_property("host", "127.0.0.1")
+            sink.set_property("port", udp_port)
+            sink.set_property("async", False)
+            sink.set_property("sync", False)
+        if not self._branch("rtsp", self._encoder_chain("rtsp") + [payloader, sink]):
+            return False
+
+        rtsp_port = self.settings["rtsp_port"]
+        factory_path = self.settings["rtsp_factory"]
+        server = GstRtspServer.RTSPServer.new()
+        server.props.service = rtsp_port
+        server.attach(None)
+        factory = GstRtspServer.RTSPMediaFactory.new()
+        factory.set_launch(
+            '( udpsrc name=pay0 port=%d buffer-size=524288 caps="application/x-rtp, media=video, '
+            'clock-rate=90000, encoding-name=(string)%s, payload=96 " )' % (udp_port, codec))
+        factory.set_shared(True)
+        server.get_mount_points().add_factory(factory_path, factory)
+        self.rtsp_server = server
+        print(f"RTSP stream: rtsp://localhost:{rtsp_port}{factory_path}")
+        return True
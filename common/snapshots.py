@@ -0,0 +1,225 @@
+import os
+import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+import numpy as np
+
+from common.heatmap import write_png
+
+SNAPSHOT_WORKERS = 2
+SNAPSHOT_BUDGET_BYTES = 64 * 1024 * 1024
+OBJECT_HISTORY = 4096
+JPEG_QUALITY = 85
+
+_cv2 = None
+
+
+def _load_cv2():
+    # OpenCV ilk snapshot'ta yuklenir (baslangic suresi)
+    global _cv2
+    if _cv2 is None:
+        try:
+            import cv2
+            _cv2 = cv2
+        except ImportError:
+            _cv2 = False
+    return _cv2
+
+
+def crop_region(frame, rect, margin=0.1):
+    """Copy of the rect (left, top, width, height) of an (h, w, c) frame, grown by margin."""
+    height, width = frame.shape[:2]
+    left, top, w, h = rect
+    dx, dy = w * margin, h * margin
+    x0, y0 = max(int(left - dx), 0), max(int(top - dy), 0)
+    x1, y1 = min(int(left + w + dx + 0.5), width), min(int(top + h + dy + 0.5), height)
+    if x1 <= x0 or y1 <= y0:
+        return None
+    return np.array(frame[y0:y1, x0:x1, :3], copy=True)
+
+
+class ArrayFrames:
+    """Frame access over NumPy frames: the frame handle is an (h, w, 3|4) array."""
+
+    def crop(self, frame, rect, margin=0.1):
+        return crop_region(frame, rect, margin)
+
+
+class NvBufSurfaceFrames:
+    """Frame access over a DeepStream batch: the handle is (buffer hash, batch_id).
+
+    Needs RGBA buffers the CPU can map (unified memory on dGPU). Only
+    the crop is copied out of the mapped surface.
+    """
+
+    def __init__(self, backend, is_tegra=False):
+        self.pyds = backend
+        self.is_tegra = is_tegra
+
+    def crop(self, frame, rect, margin=0.1):
+        buffer_hash, batch_id = frame
+        surface = self.pyds.get_nvds_buf_surface(buffer_hash, batch_id)
+        try:
+            return crop_region(surface, rect, margin)
+        finally:
+            if self.is_tegra:
+                self.pyds.unmap_nvds_buf_surface(buffer_hash, batch_id)
+
+
+class SnapshotLimiter:
+    """Per-stream token bucket, per-object minimum interval and a global in-flight byte budget.
+
+    allow() only checks the rates; the token and the object stamp are
+    spent by commit() once the crop is taken and its bytes are reserved,
+    so a crop dropped for the budget does not silence the object.
+    """
+
+    def __init__(self, stream_rate=1.0, stream_burst=5, object_interval=10.0,
+                 budget_bytes=SNAPSHOT_BUDGET_BYTES, clock=time.monotonic):
+        self.stream_rate = stream_rate
+        self.stream_burst = stream_burst
+        self.object_interval = object_interval
+        self.budget_bytes = budget_bytes
+        self.clock = clock
+        self.tokens = {}
+        self.objects = OrderedDict()
+        self.in_flight = 0
+        self.lock = Lock()
+
+    def _tokens(self, pad_index, now):
+        tokens, stamp = self.tokens.get(pad_index, (self.stream_burst, now))
+        return min(self.stream_burst, tokens + (now - stamp) * self.stream_rate)
+
+    def allow(self, pad_index, object_id):
+        """Rate check before any pixel is touched; returns None or the reason to drop."""
+        with self.lock:
+            now = self.clock()
+            last = self.objects.get((pad_index, object_id))
+            if last is not None and now - last < self.object_interval:
+                return "object_rate"
+            if self._tokens(pad_index, now) < 1.0:
+                return "stream_rate"
+            return None
+
+    def commit(self, pad_index, object_id):
+        """Spend the stream token and stamp the object of an accepted snapshot."""
+        with self.lock:
+            now = self.clock()
+            key = (pad_index, object_id)
+            self.tokens[pad_index] = (self._tokens(pad_index, now) - 1.0, now)
+            self.objects[key] = now
+            self.objects.move_to_end(key)
+            # Bellek sabit: en eski nesneler unutulur
+            while len(self.objects) > OBJECT_HISTORY:
+                self.objects.popitem(last=False)
+
+    def reserve(self, size):
+        with self.lock:
+            if self.in_flight + size > self.budget_bytes:
+                return False
+            self.in_flight += size
+            return True
+
+    def release(self, size):
+        with self.lock:
+            self.in_flight -= size
+
+    def drop_source(self, pad_index):
+        with self.lock:
+            self.tokens.pop(pad_index, None)
+            for key in [key for key in self.objects if key[0] == pad_index]:
+                del self.objects[key]
+
+
+class SnapshotCapture:
+    """Object crops on rule events, encoded off the streaming thread.
+
+    request() runs in the probe before the tiler, on the source's own
+    frame: it checks the rate limits, copies only the object's region
+    (muxer pixels) out of the frame and hands the copy to a thread
+    pool (OpenCV's encoder releases the GIL) that encodes a JPEG and
+    writes it under directory/<pad_index>/. Crops waiting in the pool
+    count against the limiter's byte budget; when it is spent new
+    requests are dropped instead of queueing, so the probe never waits.
+    Without OpenCV crops are written as PNG.
+    """
+
+    def __init__(self, frames, directory, limiter=None, workers=SNAPSHOT_WORKERS, quality=JPEG_QUALITY,
+                 margin=0.1, metrics=None):
+        self.frames = frames
+        self.directory = directory
+        self.limiter = limiter or SnapshotLimiter()
+        self.quality = quality
+        self.margin = margin
+        self.metrics = metrics
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="snapshot")
+        self.requested = 0
+        self.saved = 0
+        self.dropped = {}
+        self.bytes_written = 0
+        self.lock = Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _drop(self, reason):
+        with self.lock:
+            self.dropped[reason] = self.dropped.get(reason, 0) + 1
+        if self.metrics:
+            self.metrics.inc("snapshots_dropped_total", reason=reason)
+
+    def request(self, frame, pad_index, frame_num, object_id, class_id, rect, reason="rule"):
+        self.requested += 1
+        refused = self.limiter.allow(pad_index, object_id)
+        if refused:
+            self._drop(refused)
+            return False
+        crop = self.frames.crop(frame, rect, self.margin)
+        if crop is None:
+            self._drop("empty")
+            return False
+        if not self.limiter.reserve(crop.nbytes):
+            self._drop("budget")
+            return False
+        self.limiter.commit(pad_index, object_id)
+        name = "%06d_%d_%d_%s" % (frame_num, object_id, class_id, reason)
+        self.pool.submit(self._encode, crop, pad_index, name)
+        return True
+
+    def _encode(self, crop, pad_index, name):
+        try:
+            directory = os.path.join(self.directory, "%02d" % pad_index)
+            os.makedirs(directory, exist_ok=True)
+            cv2 = _load_cv2()
+            if cv2:
+                # Kare RGBA/RGB; OpenCV BGR bekler
+                ok, data = cv2.imencode(".jpg", np.ascontiguousarray(crop[:, :, ::-1]),
+                                        [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+                if not ok:
+                    raise ValueError("JPEG encode failed")
+                path = os.path.join(directory, name + ".jpg")
+                with open(path, "wb") as file:
+                    file.write(data.tobytes())
+            else:
+                path = os.path.join(directory, name + ".png")
+                write_png(path, crop)
+            size = os.path.getsize(path)
+            with self.lock:
+                self.saved += 1
+                self.bytes_written += size
+            if self.metrics:
+                self.metrics.inc("snapshots_saved_total", source=pad_index)
+                self.metrics.inc("snapshot_bytes_total", size)
+        except (OSError, ValueError) as e:
+            sys.stderr.write("Snapshot failed: %s\n" % e)
+            self._drop("error")
+        finally:
+            self.limiter.release(crop.nbytes)
+
+    def drop_source(self, pad_index):
+        """SourceManager.on_removed callback."""
+        self.limiter.drop_source(pad_index)
+
+    def stop(self):
+        self.pool.shutdown(wait=True)
@@ -0,0 +1,263 @@
+import os
+import socketserver
+import sys
+from threading import Event, Thread
+
+import gi
+gi.require_version('Gst', '1.0')
+from gi.repository import GLib, Gst
+
+from common.media_config import load_media_sources
+
+
+def call_in_main_loop(func, *args, timeout=10.0):
+    """Run func on the GLib main loop from another thread and return its result."""
+    done = Event()
+    result = {}
+
+    def run():
+        try:
+            result["value"] = func(*args)
+        except Exception as e:
+            result["error"] = e
+        done.set()
+        return False
+
+    GLib.idle_add(run)
+    if not done.wait(timeout):
+        raise TimeoutError("main loop did not run %s in time" % func.__name__)
+    if "error" in result:
+        raise result["error"]
+    return result["value"]
+
+
+class SourceManager:
+    """Attaches and detaches source bins on nvstreammux while PLAYING.
+
+    make_source_bin(index, uri) builds the bin (create_source_bin in
+    common.pipeline_builder). Freed pad slots are reused lowest-first,
+    and the callbacks in on_removed are called with the pad_index of a
+    removed source so per-stream state (trails, metrics) can be dropped.
+    A restart keeps the slot and its metrics but calls on_restarted,
+    since the new bin starts its frame numbers over. All methods must run
+    on the GLib main loop; use call_in_main_loop from other threads.
+    """
+
+    def __init__(self, pipeline, streammux, make_source_bin, max_sources, on_removed=(), on_added=(),
+                 on_restarted=()):
+        self.pipeline = pipeline
+        self.streammux = streammux
+        self.make_source_bin = make_source_bin
+        self.max_sources = max_sources
+        self.on_removed = list(on_removed)
+        self.on_added = list(on_added)
+        self.on_restarted = list(on_restarted)
+        self.sources = {}
+
+    def free_slot(self):
+        for index in range(self.max_sources):
+            if index not in self.sources:
+                return index
+        return None
+
+    def find(self, uri):
+        for index, (source_uri, _) in self.sources.items():
+            if source_uri == uri:
+                return index
+        return None
+
+    def add_source(self, uri, start=True, index=None):
+        if index is None:
+            index = self.free_slot()
+        elif index in self.sources or not 0 <= index < self.max_sources:
+            sys.stderr.write("Source slot %d is not available for %s\n" % (index, uri))
+            return None
+        if index is None:
+            sys.stderr.write("No free source slot (max %d) for %s\n" % (self.max_sources, uri))
+            return None
+
+        source_bin = self.make_source_bin(index, uri)
+        if not source_bin:
+            return None
+        self.pipeline.add(source_bin)
+
+        sinkpad = self.streammux.request_pad_simple("sink_%u" % index)
+        if not sinkpad:
+            sys.stderr.write("Unable to get streammux sink pad %d\n" % index)
+            self.pipeline.remove(source_bin)
+            return None
+        srcpad = source_bin.get_static_pad("src")
+        if srcpad.link(sinkpad) != Gst.PadLinkReturn.OK:
+            sys.stderr.write("Unable to link source %d to streammux\n" % index)
+            self.streammux.release_request_pad(sinkpad)
+            self.pipeline.remove(source_bin)
+            return None
+
+        self.sources[index] = (uri, source_bin)
+        for callback in self.on_added:
+            callback(index, source_bin)
+        if start:
+            source_bin.sync_state_with_parent()
+        print("Source %d added: %s" % (index, uri))
+        return index
+
+    def remove_source(self, index, notify=True):
+        entry = self.sources.pop(index, None)
+        if entry is None:
+            return False
+        uri, source_bin = entry
+
+        state_return = source_bin.set_state(Gst.State.NULL)
+        if state_return == Gst.StateChangeReturn.ASYNC:
+            source_bin.get_state(Gst.CLOCK_TIME_NONE)
+
+        sinkpad = self.streammux.get_static_pad("sink_%u" % index)
+        if sinkpad:
+            # Muxer'in bu pad icin bekledigi kareleri birak
+            sinkpad.send_event(Gst.Event.new_flush_stop(False))
+            self.streammux.release_request_pad(sinkpad)
+        self.pipeline.remove(source_bin)
+
+        if notify:
+            for callback in self.on_removed:
+                callback(index)
+        print("Source %d removed: %s" % (index, uri))
+        return True
+
+    def restart_source(self, index, uri=None):
+        """Rebuild the bin of a source in the same pad slot; returns the index or None.
+
+        uri is needed when an earlier restart left the slot empty.
+        """
+        entry = self.sources.get(index)
+        if entry is not None:
+            uri = uri or entry[0]
+            self.remove_source(index, notify=False)
+        if uri is None:
+            return None
+        for callback in self.on_restarted:
+            callback(index)
+        return self.add_source(uri, index=index)
+
+    def remove_uri(self, uri):
+        index = self.find(uri)
+        return index is not None and self.remove_source(index)
+
+    def list_sources(self):
+        return {index: uri for index, (uri, _) in sorted(self.sources.items())}
+
+
+class MediaFileWatcher:
+    """Polls media.ini and syncs its enabled sources into a SourceManager.
+
+    Only sources added by the watcher are removed when they disappear from
+    the file; sources given on the command line are left alone.
+    """
+
+    def __init__(self, manager, media_path, interval=2):
+        self.manager = manager
+        self.media_path = media_path
+        self.interval = interval
+        self.mtime = None
+        self.owned = set()
+
+    def load(self, start=True):
+        try:
+            self.mtime = os.stat(self.media_path).st_mtime
+        except OSError:
+            sys.stderr.write("Unable to read %s\n" % self.media_path)
+            return
+        self.sync(load_media_sources(self.media_path), start)
+
+    def start(self):
+        GLib.timeout_add_seconds(self.interval, self.check)
+        return self
+
+    def check(self):
+        try:
+            mtime = os.stat(self.media_path).st_mtime
+        except OSError:
+            return True
+        if mtime != self.mtime:
+            self.load()
+        return True
+
+    def sync(self, uris, start=True):
+        wanted = set(uris)
+        for uri in list(self.owned):
+            if uri not in wanted:
+                self.manager.remove_uri(uri)
+                self.owned.discard(uri)
+        current = set(self.manager.list_sources().values())
+        for uri in uris:
+            if uri not in current and self.manager.add_source(uri, start) is not None:
+                self.owned.add(uri)
+
+
+class _ControlHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        manager = self.server.manager
+        swapper = self.server.model_swapper
+        for raw in self.rfile:
+            line = raw.decode(errors="replace").strip()
+            if not line:
+                continue
+            command, _, argument = line.partition(" ")
+            try:
+                if command == "add" and argument:
+                    index = call_in_main_loop(manager.add_source, argument.strip())
+                    reply = "error no free slot" if index is None else "ok %d" % index
+                elif command == "remove" and argument:
+                    removed = call_in_main_loop(manager.remove_source, int(argument))
+                    reply = "ok" if removed else "error unknown source"
+                elif command == "list":
+                    sources = call_in_main_loop(manager.list_sources)
+                    reply = " ".join("%d=%s" % item for item in sources.items()) or "empty"
+                elif command == "model" and swapper:
+                    if argument:
+                        path = argument.strip()
+                        if not os.path.exists(path):
+                            reply = "error no such config"
+                        else:
+                            reply = "ok swapping" if swapper.swap(path) else "error swap in progress"
+                    else:
+                        reply = " ".join("%s=%s" % item for item in swapper.status().items())
+                else:
+                    reply = "error usage: add <uri> | remove <index> | list | model [<pgie config>]"
+            except Exception as e:
+                reply = "error %s" % e
+            self.wfile.write((reply + "\n").encode())
+
+
+class SourceControlServer:
+    """Local UNIX socket for runtime source control.
+
+    One command per line: "add <uri>", "remove <index>" or "list", e.g.
+    echo "add rtsp://cam/stream" | socat - UNIX-CONNECT:/tmp/ds-sources.sock
+    With a model_swapper (common.model_swap.ModelSwapper) "model <pgie
+    config>" hot-swaps the PGIE and "model" reports the swap state.
+    """
+
+    def __init__(self, manager, path, model_swapper=None):
+        self.manager = manager
+        self.path = path
+        self.model_swapper = model_swapper
+        self.server = None
+
+    def start(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self.server = socketserver.ThreadingUnixStreamServer(self.path, _ControlHandler)
+        self.server.manager = self.manager
+        self.server.model_swapper = self.model_swapper
+        self.server.daemon_threads = True
+        Thread(target=self.server.serve_forever, name="source-control", daemon=True).start()
+        return self
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+            if os.path.exists(self.path):
+                os.unlink(self.path)
@@ -0,0 +1,119 @@
+import json
+import sys
+import time
+
+import gi
+gi.require_version('Gst', '1.0')
+from gi.repository import GLib, Gst
+
+
+class StartupProfiler:
+    """Records where cold-start time goes, up to the first inference.
+
+    mark(name) closes a phase that started at the previous mark (or at
+    start, e.g. the first line of the script, so imports are included).
+    Pipeline milestones are stamped from GStreamer: the primary inference
+    element reaching PAUSED (engine deserialization happens in that state
+    change), the first buffer of each source and the first buffer out of
+    the inference element. The report is printed (and optionally written
+    as JSON) once every watched milestone has been seen, or at the
+    deadline set with arm() / on finish() with the missing milestones
+    listed, so a source that never delivers does not hide the report.
+    """
+
+    def __init__(self, start=None, clock=time.perf_counter, output=None):
+        self.clock = clock
+        self.start = clock() if start is None else start
+        self.output = output
+        self.phases = []
+        self.last = self.start
+        self.milestones = {}
+        self.expected = set()
+        self.reported = False
+
+    def mark(self, name):
+        now = self.clock()
+        self.phases.append((name, self.last - self.start, now - self.last))
+        self.last = now
+        return now
+
+    def arm(self, deadline):
+        """Report after deadline seconds even if milestones are still missing."""
+        if deadline > 0:
+            GLib.timeout_add(int(deadline * 1000), self._report_once)
+
+    def finish(self):
+        """Report on shutdown if it has not been reported yet."""
+        self._report_once()
+
+    def milestone(self, name):
+        if name not in self.milestones:
+            self.milestones[name] = self.clock()
+            if self.expected <= set(self.milestones):
+                GLib.idle_add(self._report_once)
+
+    def _first_buffer_probe(self, pad, info, name):
+        self.milestone(name)
+        return Gst.PadProbeReturn.REMOVE
+
+    def watch_pad(self, pad, name):
+        if pad is None:
+            return
+        self.expected.add(name)
+        pad.add_probe(Gst.PadProbeType.BUFFER, self._first_buffer_probe, name)
+
+    def watch_source(self, index, source_bin):
+        """SourceManager.on_added callback: first buffer per source."""
+        self.watch_pad(source_bin.get_static_pad("src"), "first_buffer_source_%d" % index)
+
+    def watch_inference(self, pgie, bus):
+        self.watch_pad(pgie.get_static_pad("src"), "first_inference")
+        self.expected.add("engine_loaded")
+
+        def on_state_changed(bus, message):
+            if message.src == pgie:
+                old, new, pending = message.parse_state_changed()
+                if new == Gst.State.PAUSED:
+                    self.milestone("engine_loaded")
+
+        bus.connect("message::state-changed", on_state_changed)
+
+    def report(self):
+        pipeline_start = self.last
+        milestones = {name: round((stamp - pipeline_start) * 1000.0, 1)
+                      for name, stamp in sorted(self.milestones.items(), key=lambda item: item[1])}
+        return {
+            "phases_ms": [{"phase": name, "offset": round(offset * 1000.0, 1), "duration": round(duration * 1000.0, 1)}
+                          for name, offset, duration in self.phases],
+            "setup_ms": round((pipeline_start - self.start) * 1000.0, 1),
+            # set_state(PLAYING) cagrisindan itibaren
+            "after_play_ms": milestones,
+            "time_to_first_inference_ms": round((self.milestones["first_inference"] - self.start) * 1000.0, 1)
+            if "first_inference" in self.milestones else None,
+            "missing": sorted(self.expected - set(self.milestones)),
+        }
+
+    def print_report(self, report=None):
+        report = report or self.report()
+        print("\n**STARTUP PROFILE (ms)")
+        for phase in report["phases_ms"]:
+            print("  %-28s +%9.1f  %9.1f" % (phase["phase"], phase["offset"], phase["duration"]))
+        for name, value in report["after_play_ms"].items():
+            print("  %-28s  after play %9.1f" % (name, value))
+        for name in report["missing"]:
+            print("  %-28s  MISSING" % name)
+        print("  time to first inference: %s\n" % report["time_to_first_inference_ms"])
+
+    def _report_once(self):
+        if self.reported:
+            return False
+        self.reported = True
+        report = self.report()
+        self.print_report(report)
+        if self.output:
+            try:
+                with open(self.output, "w") as file:
+                    json.dump(report, file, indent=2)
+            except OSError as e:
+                sys.stderr.write("Unable to write startup profile: %s\n" % e)
+        return False
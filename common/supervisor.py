@@ -0,0 +1,367 @@
+import json
+import os
+import re
+import signal
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from collections import namedtuple
+
+SHARD_POLICIES = ("round-robin", "resolution", "gpu")
+DEFAULT_PIXELS = 1920 * 1080
+
+WorkerSpec = namedtuple("WorkerSpec", ["index", "sources", "gpu_id", "metrics_port", "events_dir"])
+
+
+def source_id(source):
+    """Global id of a MediaSource: N of its [MediaSettings-N] section."""
+    match = re.search(r"(\d+)$", source.key)
+    return int(match.group(1)) if match else source.key
+
+
+def _cost(source, policy):
+    if policy == "resolution":
+        return (source.width * source.height) or DEFAULT_PIXELS
+    return 1
+
+
+def plan_shards(sources, workers, policy="round-robin", gpus=(0,), previous=None, rebalance_threshold=0.25):
+    """Assign sources to workers; returns a list of source lists, one per worker.
+
+    round-robin balances the source count, resolution balances the pixel
+    rate (width/height hints, 1080p if unknown) and gpu only places a
+    source on workers of its gpu_id (worker i runs on gpus[i % len(gpus)]).
+    With previous (an earlier plan), sources keep their worker and only
+    new sources are placed, so a change restarts as few workers as
+    possible; a fresh plan is used instead when it lowers the busiest
+    worker's load by more than rebalance_threshold.
+    """
+    if policy not in SHARD_POLICIES:
+        raise ValueError("unknown shard policy: %s" % policy)
+    shards = _place(sources, workers, policy, gpus, previous)
+    if previous:
+        fresh = _place(sources, workers, policy, gpus, None)
+        if _max_load(fresh, policy) < _max_load(shards, policy) * (1.0 - rebalance_threshold):
+            return fresh
+    return shards
+
+
+def _max_load(shards, policy):
+    return max(sum(_cost(source, policy) for source in shard) for shard in shards) if shards else 0
+
+
+def _place(sources, workers, policy, gpus, previous):
+    worker_gpu = [gpus[i % len(gpus)] for i in range(workers)]
+    shards = [[] for _ in range(workers)]
+    load = [0] * workers
+
+    placed = set()
+    if previous:
+        current = {source.key: source for source in sources}
+        for i, shard in enumerate(previous[:workers]):
+            for source in shard:
+                source = current.get(source.key)
+                if source is None or (policy == "gpu" and worker_gpu[i] != source.gpu_id):
+                    continue
+                shards[i].append(source)
+                load[i] += _cost(source, policy)
+                placed.add(source.key)
+
+    pending = [source for source in sources if source.key not in placed]
+    if policy == "resolution":
+        # Buyukten kucuge yerlestirme (LPT) dengeyi iyilestirir
+        pending.sort(key=lambda source: -_cost(source, policy))
+    for source in pending:
+        allowed = range(workers)
+        if policy == "gpu":
+            allowed = [i for i in range(workers) if worker_gpu[i] == source.gpu_id] or allowed
+        target = min(allowed, key=lambda i: (load[i], len(shards[i]), i))
+        shards[target].append(source)
+        load[target] += _cost(source, policy)
+    return shards
+
+
+class DeepStreamWorker:
+    """Launches one worker pipeline as a subprocess.
+
+    The worker script receives the shard as repeated --source arguments,
+    plus --metrics-port and --analytics-dir; any script with the same
+    command line (ds-segmentation.py, or scripts/stand_in_worker.py on a
+    CPU-only host) can be used. The GPU is selected with
+    CUDA_VISIBLE_DEVICES.
+    """
+
+    def __init__(self, script, extra_args=(), python=sys.executable):
+        self.script = script
+        self.extra_args = list(extra_args)
+        self.python = python
+
+    def command(self, spec):
+        command = [self.python, self.script]
+        for source in spec.sources:
+            command += ["--source", source.uri]
+        command += ["--batch-size", str(max(len(spec.sources), 1)),
+                    "--metrics-port", str(spec.metrics_port),
+                    "--analytics-dir", spec.events_dir,
+                    "--perf-interval", "0"]
+        return command + self.extra_args
+
+    def __call__(self, spec):
+        env = dict(os.environ, CUDA_VISIBLE_DEVICES=str(spec.gpu_id))
+        return subprocess.Popen(self.command(spec), env=env)
+
+
+class _WorkerState:
+    def __init__(self, spec):
+        self.spec = spec
+        self.process = None
+        self.started = 0.0
+        self.restart_at = None
+        self.attempts = 0
+
+
+_SAMPLE = re.compile(r"^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{(.*)\})?\s+(\S+)$")
+_LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+def merge_prometheus(texts):
+    """Merge worker Prometheus texts, adding a worker label.
+
+    texts is [(worker_index, {local_pad_index: global_source_id}, text)];
+    stream/source labels are rewritten from the worker's pad index to the
+    global source id.
+    """
+    types = {}
+    samples = []
+    for worker, source_map, text in texts:
+        for line in text.splitlines():
+            if line.startswith("# TYPE "):
+                name = line.split()[2]
+                types.setdefault(name, line)
+                continue
+            match = _SAMPLE.match(line)
+            if not match:
+                continue
+            name, _, labels, value = match.groups()
+            pairs = _LABEL.findall(labels or "")
+            rewritten = ['worker="%s"' % worker]
+            for key, label_value in pairs:
+                if key in ("stream", "source") and label_value.isdigit():
+                    label_value = str(source_map.get(int(label_value), label_value))
+                rewritten.append('%s="%s"' % (key, label_value))
+            samples.append((name, "%s{%s} %s" % (name, ",".join(rewritten), value)))
+
+    lines = []
+    declared = set()
+    for name, sample in sorted(samples, key=lambda item: item[0]):
+        family = next((t for t in types if name == t or name.startswith(t + "_")), None)
+        if family and family not in declared:
+            lines.append(types[family])
+            declared.add(family)
+        lines.append(sample)
+    return "\n".join(lines) + "\n"
+
+
+class EventMerger:
+    """Tails worker JSONL event files into one stream.
+
+    Only complete lines are taken; each record gets its worker index and
+    its source rewritten to the global source id.
+    """
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.offsets = {}
+
+    def poll(self, worker, events_dir, source_map):
+        records = []
+        if not os.path.isdir(events_dir):
+            return 0
+        for name in sorted(os.listdir(events_dir)):
+            if not name.endswith(".jsonl"):
+                continue
+            path = os.path.join(events_dir, name)
+            offset = self.offsets.get(path, 0)
+            try:
+                with open(path, "rb") as file:
+                    file.seek(offset)
+                    data = file.read()
+            except OSError:
+                continue
+            end = data.rfind(b"\n") + 1
+            self.offsets[path] = offset + end
+            for line in data[:end].splitlines():
+                records.append(self._rewrite(line, worker, source_map))
+        records = [record for record in records if record is not None]
+        self.writer.write(records)
+        return len(records)
+
+    @staticmethod
+    def _rewrite(line, worker, source_map):
+        try:
+            record = json.loads(line)
+        except ValueError:
+            return None
+        record["worker"] = worker
+        if isinstance(record.get("source"), int):
+            record["source"] = source_map.get(record["source"], record["source"])
+        return record
+
+
+class Supervisor:
+    """Runs the sources of media.ini as N sharded worker pipelines.
+
+    Crashed workers are restarted after an exponential backoff; the
+    attempt count resets once a worker stays up for stable_seconds.
+    reload() re-reads the sources and restarts only the workers whose
+    shard changed. Worker metrics are merged (render_prometheus, so a
+    common.metrics.MetricsServer can serve them) and worker events are
+    merged into one JSONL stream. render_prometheus may run on the metrics
+    server thread; it works on a snapshot of the worker table taken under
+    the lock that guards reload()'s changes to it.
+    """
+
+    def __init__(self, load_sources, launcher, workers, policy="round-robin", gpus=(0,),
+                 base_port=9200, run_dir="supervisor_run", events_writer=None,
+                 base_delay=1.0, max_delay=60.0, stable_seconds=30.0, clock=time.monotonic,
+                 fetch=None):
+        self.load_sources = load_sources
+        self.launcher = launcher
+        self.workers = workers
+        self.policy = policy
+        self.gpus = list(gpus)
+        self.base_port = base_port
+        self.run_dir = run_dir
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.stable_seconds = stable_seconds
+        self.clock = clock
+        self.fetch = fetch or self._fetch
+        self.merger = EventMerger(events_writer) if events_writer else None
+        self.shards = None
+        self.states = {}
+        self.lock = threading.Lock()
+        self.restarts = 0
+
+    def spec(self, index, shard):
+        return WorkerSpec(index=index, sources=tuple(shard), gpu_id=self.gpus[index % len(self.gpus)],
+                          metrics_port=self.base_port + index,
+                          events_dir=os.path.join(self.run_dir, "worker-%d" % index))
+
+    def source_map(self, index):
+        state = self.states.get(index)
+        if state is None:
+            return {}
+        return self._spec_source_map(state.spec)
+
+    @staticmethod
+    def _spec_source_map(spec):
+        return {pad_index: source_id(source) for pad_index, source in enumerate(spec.sources)}
+
+    def start(self):
+        self.reload()
+        return self
+
+    def reload(self):
+        sources = self.load_sources()
+        shards = plan_shards(sources, self.workers, self.policy, self.gpus, previous=self.shards)
+        changed = []
+        for index, shard in enumerate(shards):
+            spec = self.spec(index, shard)
+            state = self.states.get(index)
+            if state is not None and state.spec == spec:
+                continue
+            if state is not None:
+                self._stop(state)
+                # Eski shard'in kalan olaylari eski kaynak eslemesiyle alinir
+                if self.merger:
+                    self.merger.poll(index, state.spec.events_dir, self.source_map(index))
+            changed.append(index)
+            if not shard:
+                with self.lock:
+                    self.states.pop(index, None)
+                continue
+            state = _WorkerState(spec)
+            self._launch(state)
+            with self.lock:
+                self.states[index] = state
+        self.shards = shards
+        return changed
+
+    def _launch(self, state):
+        os.makedirs(state.spec.events_dir, exist_ok=True)
+        state.process = self.launcher(state.spec)
+        state.started = self.clock()
+        state.restart_at = None
+        print("Worker %d started (pid %s): %s" % (state.spec.index, getattr(state.process, "pid", "?"),
+                                                  ", ".join(source.key for source in state.spec.sources)))
+
+    def _stop(self, state, timeout=10.0):
+        process = state.process
+        if process is None or process.poll() is not None:
+            return
+        process.send_signal(signal.SIGINT)
+        try:
+            process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+    def check(self):
+        """Restart crashed workers (call periodically)."""
+        now = self.clock()
+        for state in self.states.values():
+            if state.restart_at is not None:
+                if now >= state.restart_at:
+                    self.restarts += 1
+                    self._launch(state)
+                continue
+            code = state.process.poll()
+            if code is None:
+                if state.attempts and now - state.started > self.stable_seconds:
+                    state.attempts = 0
+                continue
+            delay = min(self.max_delay, self.base_delay * (2 ** state.attempts))
+            state.attempts += 1
+            state.restart_at = now + delay
+            sys.stderr.write("Worker %d exited with %s, restart #%d in %.1fs\n" % (
+                state.spec.index, code, state.attempts, delay))
+
+    def merge_events(self):
+        if not self.merger:
+            return 0
+        return sum(self.merger.poll(index, state.spec.events_dir, self.source_map(index))
+                   for index, state in sorted(self.states.items()))
+
+    @staticmethod
+    def _fetch(port):
+        with urllib.request.urlopen("http://127.0.0.1:%d/metrics" % port, timeout=2) as response:
+            return response.read().decode()
+
+    def render_prometheus(self):
+        texts = []
+        lines = ["# TYPE ds_supervisor_worker_up gauge", "# TYPE ds_supervisor_restarts_total counter",
+                 "ds_supervisor_restarts_total %d" % self.restarts]
+        # Metrik thread'i: reload() tabloyu degistirirken dolasilmaz, kopyasi alinir
+        with self.lock:
+            states = sorted(self.states.items())
+        for index, state in states:
+            up = 0
+            if state.process is not None and state.process.poll() is None and state.restart_at is None:
+                try:
+                    texts.append((index, self._spec_source_map(state.spec), self.fetch(state.spec.metrics_port)))
+                    up = 1
+                except (OSError, ValueError):
+                    pass
+            lines.append('ds_supervisor_worker_up{worker="%d"} %d' % (index, up))
+        return merge_prometheus(texts) + "\n".join(lines) + "\n"
+
+    def stop(self):
+        for state in self.states.values():
+            self._stop(state)
+        self.merge_events()
+        if self.merger:
+            self.merger.writer.close()
+
@@ -0,0 +1,40 @@
+import numpy as np
+
+
+class TileLayout:
+    """Maps between a source's muxer frame and the nvmultistreamtiler output.
+
+    The tiler scales object meta into the tiled frame, source i in tile
+    i (row-major). Rules, heatmaps and snapshots work in muxer pixels
+    before the tiler; to_tile() places points (e.g. trails drawn by the
+    OSD) in the tiled frame and to_source() undoes the tiling.
+    """
+
+    def __init__(self, rows, columns, width, height, source_width, source_height):
+        self.rows = rows
+        self.columns = columns
+        self.tile_width = width / columns
+        self.tile_height = height / rows
+        self.scale_x = source_width / self.tile_width
+        self.scale_y = source_height / self.tile_height
+
+    @classmethod
+    def from_tiler(cls, tiler, source_width, source_height):
+        return cls(tiler.get_property("rows"), tiler.get_property("columns"), tiler.get_property("width"),
+                   tiler.get_property("height"), source_width, source_height)
+
+    def to_source(self, pad_index, xs, ys):
+        """Tiled (xs, ys) of objects of sources pad_index -> muxer pixels (int64)."""
+        pad_index = np.asarray(pad_index, dtype=np.int64)
+        left = (pad_index % self.columns) * self.tile_width
+        top = (pad_index // self.columns) * self.tile_height
+        return (((xs - left) * self.scale_x).astype(np.int64),
+                ((ys - top) * self.scale_y).astype(np.int64))
+
+    def to_tile(self, pad_index, xs, ys):
+        """Muxer (xs, ys) of objects of sources pad_index -> tiled pixels (int64)."""
+        pad_index = np.asarray(pad_index, dtype=np.int64)
+        left = (pad_index % self.columns) * self.tile_width
+        top = (pad_index // self.columns) * self.tile_height
+        return ((xs / self.scale_x + left).astype(np.int64),
+                (ys / self.scale_y + top).astype(np.int64))
@@ -0,0 +1,191 @@
+import heapq
+from collections import defaultdict
+
+import numpy as np
+
+FRAME_EXPIRATION_LIMIT = 60
+TRAIL_LENGTH = 20
+TRAIL_CAPACITY = 4096
+
+
+class TrailStore:
+    """Fixed-size trail storage keyed by (pad_index, object_id).
+
+    Every tracked object owns one slot of a preallocated ring buffer, so
+    appending a point is O(1) and memory does not grow with run time.
+    Expiry is driven by per-source frame buckets: each slot is filed under
+    the frame number at which it would expire, and expire() only visits
+    the buckets that are due instead of walking every object.
+    """
+
+    def __init__(self, trail_length=TRAIL_LENGTH, expiration=FRAME_EXPIRATION_LIMIT,
+                 capacity=TRAIL_CAPACITY):
+        self.trail_length = trail_length
+        self.expiration = expiration
+        self.capacity = capacity
+
+        self.points = np.zeros((capacity, trail_length, 2), dtype=np.int32)
+        self.heads = np.zeros(capacity, dtype=np.int32)
+        self.counts = np.zeros(capacity, dtype=np.int32)
+        self.last_seen = np.zeros(capacity, dtype=np.int64)
+        # Global append sequence, used to pick a victim when the store is full
+        self.touched = np.zeros(capacity, dtype=np.int64)
+        self._seq = 0
+
+        self.keys = [None] * capacity
+        self.slots = {}
+        self.free = list(range(capacity - 1, -1, -1))
+
+        # pad_index -> {expire_frame: [slot, ...]} plus a heap of pending frames
+        self.buckets = defaultdict(dict)
+        self.pending = defaultdict(list)
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.slots)
+
+    def __contains__(self, key):
+        return key in self.slots
+
+    def _acquire(self, key):
+        if not self.free:
+            victim = int(np.argmin(self.touched))
+            self._release(victim)
+            self.evictions += 1
+        slot = self.free.pop()
+        self.keys[slot] = key
+        self.slots[key] = slot
+        self.heads[slot] = 0
+        self.counts[slot] = 0
+        return slot
+
+    def _release(self, slot):
+        key = self.keys[slot]
+        if key is None:
+            return
+        del self.slots[key]
+        self.keys[slot] = None
+        self.counts[slot] = 0
+        self.touched[slot] = 0
+        self.free.append(slot)
+
+    def _schedule(self, pad_index, slot, frame_num):
+        expire_at = frame_num + self.expiration + 1
+        buckets = self.buckets[pad_index]
+        bucket = buckets.get(expire_at)
+        if bucket is None:
+            buckets[expire_at] = bucket = []
+            heapq.heappush(self.pending[pad_index], expire_at)
+        bucket.append(slot)
+
+    def append(self, pad_index, object_id, frame_num, x, y):
+        """Record a point for an object and return its slot."""
+        key = (pad_index, object_id)
+        slot = self.slots.get(key)
+        if slot is None:
+            slot = self._acquire(key)
+
+        head = self.heads[slot]
+        self.points[slot, head, 0] = x
+        self.points[slot, head, 1] = y
+        self.heads[slot] = (head + 1) % self.trail_length
+        if self.counts[slot] < self.trail_length:
+            self.counts[slot] += 1
+
+        self._seq += 1
+        self.touched[slot] = self._seq
+        if self.last_seen[slot] != frame_num or self.counts[slot] == 1:
+            self.last_seen[slot] = frame_num
+            self._schedule(pad_index, slot, frame_num)
+        return slot
+
+    def append_many(self, pad_index, object_ids, frame_num, xs, ys):
+        """Vectorized append for all objects of one frame; returns their slots.
+
+        Without a tracker several objects can share an id; those frames
+        fall back to sequential appends so no point is lost.
+        """
+        slot_list = []
+        for object_id in object_ids:
+            key = (pad_index, int(object_id))
+            slot = self.slots.get(key)
+            if slot is None:
+                slot = self._acquire(key)
+            slot_list.append(slot)
+        if len(set(slot_list)) != len(slot_list):
+            return np.array([self.append(pad_index, int(object_id), frame_num, x, y)
+                             for object_id, x, y in zip(object_ids, xs, ys)], dtype=np.int64)
+        slots = np.array(slot_list, dtype=np.int64)
+        if not len(slots):
+            return slots
+
+        heads = self.heads[slots]
+        self.points[slots, heads, 0] = xs
+        self.points[slots, heads, 1] = ys
+        self.heads[slots] = (heads + 1) % self.trail_length
+        self.counts[slots] = np.minimum(self.counts[slots] + 1, self.trail_length)
+        self.touched[slots] = np.arange(self._seq + 1, self._seq + 1 + len(slots))
+        self._seq += len(slots)
+
+        self.last_seen[slots] = frame_num
+        expire_at = frame_num + self.expiration + 1
+        buckets = self.buckets[pad_index]
+        bucket = buckets.get(expire_at)
+        if bucket is None:
+            buckets[expire_at] = bucket = []
+            heapq.heappush(self.pending[pad_index], expire_at)
+        bucket.extend(slots.tolist())
+        return slots
+
+    def trail(self, slot):
+        """Return the points of a slot in chronological order, shape (n, 2)."""
+        count = self.counts[slot]
+        if count < self.trail_length:
+            return self.points[slot, :count]
+        head = self.heads[slot]
+        if head == 0:
+            return self.points[slot]
+        return np.concatenate((self.points[slot, head:], self.points[slot, :head]))
+
+    def get(self, pad_index, object_id):
+        slot = self.slots.get((pad_index, object_id))
+        if slot is None:
+            return self.points[0, :0]
+        return self.trail(slot)
+
+    def expire(self, pad_index, current_frame_num):
+        """Drop objects of a source that have not been seen for too long.
+
+        Only buckets whose expiry frame is due are visited. Bucket entries
+        left behind by objects that were seen again are skipped.
+        """
+        pending = self.pending.get(pad_index)
+        if not pending:
+            return 0
+        buckets = self.buckets[pad_index]
+        expired = 0
+        while pending and pending[0] <= current_frame_num:
+            expire_at = heapq.heappop(pending)
+            for slot in buckets.pop(expire_at, ()):
+                key = self.keys[slot]
+                if key is None or key[0] != pad_index:
+                    continue
+                if self.last_seen[slot] + self.expiration + 1 != expire_at:
+                    continue
+                self._release(slot)
+                expired += 1
+        return expired
+
+    def drop_source(self, pad_index):
+        """Forget every object of a source, e.g. when the source is removed."""
+        for key, slot in list(self.slots.items()):
+            if key[0] == pad_index:
+                self._release(slot)
+        self.buckets.pop(pad_index, None)
+        self.pending.pop(pad_index, None)
+
+    def clear(self):
+        for slot in list(self.slots.values()):
+            self._release(slot)
+        self.buckets.clear()
+        self.pending.clear()
@@ -0,0 +1,195 @@
+import configparser
+import itertools
+import shutil
+import time
+from collections import namedtuple
+
+import gi
+gi.require_version('Gst', '1.0')
+from gi.repository import GLib, Gst
+
+from common.latency_tracer import LatencyHistogram, LatencyTracer, buffer_pts, single_source
+from common.utils import update_ini_section
+
+TuningSetting = namedtuple("TuningSetting", ["batch_size", "batch_timeout_usec", "width", "height", "precision"])
+
+# chain: LatencyTracer sinirlari (ilk eleman -> son eleman = uctan uca)
+# frames_fn: verilirse ilk eleman muxer'dir, uctan uca sure karenin muxer sink pad'ine varisindan baslar
+# metrics: kare sayilari (streams) ve probe sureleri (timings) bu registry'ye yazilir
+TrialPipeline = namedtuple("TrialPipeline", ["pipeline", "chain", "metrics", "key_fn", "source_fn", "cleanup",
+                                             "frames_fn"])
+TrialPipeline.__new__.__defaults__ = (buffer_pts, single_source, None, None)
+
+
+def sweep_settings(batch_sizes, timeouts_usec, resolutions, precisions=(None,)):
+    """Every combination of the swept values; resolutions are (width, height) pairs."""
+    return [TuningSetting(batch, timeout, width, height, precision)
+            for batch, timeout, (width, height), precision
+            in itertools.product(batch_sizes, timeouts_usec, resolutions, precisions)]
+
+
+def merge_histograms(histograms):
+    merged = LatencyHistogram()
+    for histogram in histograms:
+        merged.counts = [a + b for a, b in zip(merged.counts, histogram.counts)]
+        merged.count += histogram.count
+        merged.total += histogram.total
+        merged.max = max(merged.max, histogram.max)
+    return merged
+
+
+def _frames(metrics):
+    return sum(stream.count for stream in list(metrics.streams.values()))
+
+
+def run_trial(factory, setting, duration=10.0, warmup=3.0, probe="osd"):
+    """Build the pipeline of one setting, run it for warmup + duration seconds and measure it.
+
+    Throughput counts the frames recorded in the trial's metrics after
+    the warm-up, latency is the end-to-end histogram of a LatencyTracer
+    over the trial's chain (from the muxer input when the trial has a
+    frames_fn, so batch waiting counts) and probe time comes from the
+    metrics timing named probe. Returns a flat dict; failed runs carry
+    an "error".
+    """
+    result = dict(setting._asdict())
+    try:
+        trial = factory(setting)
+    except Exception as e:
+        result["error"] = "setup: %s" % e
+        return result
+
+    loop = GLib.MainLoop()
+    tracer = LatencyTracer(trial.chain, key_fn=trial.key_fn, source_fn=trial.source_fn, frames_fn=trial.frames_fn)
+    timing = trial.metrics.timing(probe)
+    state = {}
+    timers = {}
+
+    def on_message(bus, message):
+        if message.type == Gst.MessageType.ERROR:
+            error, _ = message.parse_error()
+            state["error"] = error.message
+            loop.quit()
+        elif message.type == Gst.MessageType.EOS:
+            state["error"] = "end of stream during the run"
+            loop.quit()
+
+    def stop():
+        timers.pop("stop", None)
+        loop.quit()
+        return False
+
+    def start_measuring():
+        # Olcum isinma sonrasi baslar: engine yukleme / ilk kareler sayilmaz
+        timers.pop("start", None)
+        state.update(frames=_frames(trial.metrics), probe_count=timing.count, probe_total=timing.total,
+                     start=time.monotonic())
+        tracer.attach()
+        timers["stop"] = GLib.timeout_add(int(duration * 1000), stop)
+        return False
+
+    bus = trial.pipeline.get_bus()
+    bus.add_signal_watch()
+    handler = bus.connect("message", on_message)
+    timers["start"] = GLib.timeout_add(int(warmup * 1000), start_measuring)
+    if trial.pipeline.set_state(Gst.State.PLAYING) == Gst.StateChangeReturn.FAILURE:
+        state["error"] = "unable to start the pipeline"
+    else:
+        loop.run()
+    elapsed = time.monotonic() - state["start"] if "start" in state else 0.0
+
+    # Hata ile erken biten kosunun zamanlayicilari sonraki kosuya kalmasin
+    for source_id in timers.values():
+        GLib.source_remove(source_id)
+    tracer.detach()
+    trial.pipeline.set_state(Gst.State.NULL)
+    bus.disconnect(handler)
+    bus.remove_signal_watch()
+    if trial.cleanup:
+        trial.cleanup()
+
+    frames = _frames(trial.metrics) - state.get("frames", 0)
+    probe_count = timing.count - state.get("probe_count", 0)
+    latency = merge_histograms(tracer.e2e_histograms.values()).to_dict()
+    result.update(
+        seconds=round(elapsed, 3),
+        frames=frames,
+        streams=len(trial.metrics.streams),
+        fps=round(frames / elapsed, 2) if elapsed > 0 else 0.0,
+        latency_p50_ms=latency["p50_ms"],
+        latency_p95_ms=latency["p95_ms"],
+        latency_p99_ms=latency["p99_ms"],
+        probe_mean_ms=round((timing.total - state.get("probe_total", 0.0)) / probe_count * 1000.0, 3)
+        if probe_count else 0.0,
+        probe_p95_ms=round(timing.snapshot()["quantiles"][0.95] * 1000.0, 3),
+    )
+    if "error" in state:
+        result["error"] = state["error"]
+    elif not frames:
+        result["error"] = "no frames measured"
+    return result
+
+
+def sweep(factory, settings, duration=10.0, warmup=3.0, on_result=None):
+    results = []
+    for setting in settings:
+        result = run_trial(factory, setting, duration, warmup)
+        results.append(result)
+        if on_result:
+            on_result(result)
+    return results
+
+
+def pareto_front(results, maximize="fps", minimize="latency_p95_ms"):
+    """Results no other result beats on both throughput and latency, fastest first."""
+    valid = [result for result in results if "error" not in result]
+    front = []
+    for result in valid:
+        dominated = any(
+            other[maximize] >= result[maximize] and other[minimize] <= result[minimize]
+            and (other[maximize] > result[maximize] or other[minimize] < result[minimize])
+            for other in valid)
+        if not dominated:
+            front.append(result)
+    return sorted(front, key=lambda result: (-result[maximize], result[minimize]))
+
+
+def recommend(front, max_latency_ms=None):
+    """Highest throughput point of the front within the latency budget (lowest latency if none is)."""
+    if not front:
+        return None
+    if max_latency_ms is None:
+        return front[0]
+    within = [result for result in front if result["latency_p95_ms"] <= max_latency_ms]
+    if within:
+        return within[0]
+    return min(front, key=lambda result: result["latency_p95_ms"])
+
+
+def load_pipeline_settings(config_path, section="Settings"):
+    """Muxer batch size (0: number of sources), muxer / tiler output sizes and PGIE config from [Settings]."""
+    parser = configparser.ConfigParser()
+    parser.read(config_path)
+    return {
+        "batch_size": parser.getint(section, "batch_size", fallback=0),
+        "muxer_output_width": parser.getint(section, "muxer_output_width", fallback=1920),
+        "muxer_output_height": parser.getint(section, "muxer_output_height", fallback=1080),
+        "tiled_output_width": parser.getint(section, "tiled_output_width", fallback=1920),
+        "tiled_output_height": parser.getint(section, "tiled_output_height", fallback=1080),
+        "pgie_config_file": parser.get(section, "pgie_config_file", fallback=None),
+    }
+
+
+def write_tuned_config(base_config, path, result, pgie_config=None):
+    """Copy of the app config with the [Settings] of a sweep result."""
+    shutil.copyfile(base_config, path)
+    updates = {
+        "muxer_batch_timeout_usec": result["batch_timeout_usec"],
+        "muxer_output_width": result["width"],
+        "muxer_output_height": result["height"],
+        "batch_size": result["batch_size"],
+    }
+    if pgie_config:
+        updates["pgie_config_file"] = pgie_config
+    update_ini_section(path, "Settings", updates, separator=" = ")
+    return path
@@ -1,8 +1,7 @@
+import configparser
 import ctypes
 import sys
 import os
-from collections import namedtuple
-import random
 
 sys.path.append('/opt/nvidia/deepstream/deepstream/lib')
 
@@ -12,8 +11,6 @@ YELLOW = "\033[93m"  # Yellow for warning messages
 RESET = "\033[0m"  # Reset color
 GREEN = "\033[92m"  # Green for success messages
 
-ColorObject = namedtuple("ColorObject", ["red", "green", "blue", "alpha"])
-
 
 def long_to_uint64(l):
     value = ctypes.c_uint64(l & 0xffffffffffffffff).value
@@ -35,30 +32,73 @@ def display_message(msg_type="d", message=None):
 
 
 
-def create_dynamic_labels(config_path):
-    """Create dynamic colors for labels based on the label file path specified in the config."""
-    
-    # Load label file path from the configuration
-    label_file_path = None
+def load_pgie_config(config_path):
+    """Parse a nvinfer config file and return its [property] section as a dict."""
+    parser = configparser.ConfigParser(interpolation=None, strict=False)
+    # nvinfer anahtarlari buyuk/kucuk harf duyarli
+    parser.optionxform = str
     with open(config_path, 'r') as file:
-        for line in file:
-            if line.startswith("labelfile-path="):
-                label_file_path = line.strip().split('=')[1]
-                break
+        parser.read_file(file)
+    if not parser.has_section("property"):
+        return {}
+    return dict(parser.items("property"))
+
+
+def update_pgie_config(config_path, updates):
+    """Set [property] keys in a nvinfer config file, keeping comments and order."""
+    update_ini_section(config_path, "property", updates)
+
+
+def update_ini_section(config_path, section_name, updates, separator="="):
+    """Set keys of one section of an INI file, keeping comments and order.
+
+    Missing keys are appended to the end of the section. The file is
+    rewritten atomically (temporary file + rename).
+    """
+    with open(config_path, 'r') as file:
+        lines = file.readlines()
+
+    pending = dict(updates)
+    section = None
+    insert_at = None
+    for i, line in enumerate(lines):
+        stripped = line.strip()
+        if stripped.startswith("[") and stripped.endswith("]"):
+            if section == section_name:
+                insert_at = i
+            section = stripped[1:-1]
+            continue
+        if section != section_name or "=" not in stripped or stripped.startswith(("#", ";")):
+            continue
+        key = stripped.split("=", 1)[0].strip()
+        if key in pending:
+            lines[i] = "%s%s%s\n" % (key, separator, pending.pop(key))
+
+    if pending:
+        if insert_at is None:
+            insert_at = len(lines)
+            if lines and not lines[-1].endswith("\n"):
+                lines[-1] += "\n"
+        else:
+            # Sonraki bolumun basindaki yorum / bos satirlar o bolume aittir
+            while insert_at > 0 and (not lines[insert_at - 1].strip()
+                                     or lines[insert_at - 1].lstrip().startswith(("#", ";"))):
+                insert_at -= 1
+        added = ["%s%s%s\n" % (key, separator, value) for key, value in pending.items()]
+        lines[insert_at:insert_at] = added
+
+    tmp_path = "%s.tmp.%d" % (config_path, os.getpid())
+    with open(tmp_path, 'w') as file:
+        file.writelines(lines)
+    os.replace(tmp_path, config_path)
+
 
-    # Load labels from the label file
-    labels = []
+def load_labels(config_path):
+    """Return the labels of the labelfile-path in a nvinfer config, in class_id order."""
+    label_file_path = load_pgie_config(config_path).get("labelfile-path")
+    if not label_file_path:
+        raise ValueError("labelfile-path not set in %s" % config_path)
+    # Goreli yollar config dosyasina goredir (nvinfer davranisi)
+    label_file_path = os.path.join(os.path.dirname(os.path.abspath(config_path)), label_file_path.strip())
     with open(label_file_path, 'r') as file:
-        labels = [line.strip() for line in file if line.strip()]
-
-    # Generate random colors for each label ID (index)
-    dynamic_labels = {}
-    for idx, label in enumerate(labels):
-        dynamic_labels[idx] = ColorObject(
-            red=random.random(),
-            green=random.random(),
-            blue=random.random(),
-            alpha=1.0  # Alpha is set to 1 for full opacity
-        )
-
-    return dynamic_labels
+        return [line.strip() for line in file if line.strip()]
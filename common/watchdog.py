@@ -0,0 +1,178 @@
+import random
+import sys
+import time
+
+import gi
+gi.require_version('Gst', '1.0')
+from gi.repository import GLib, Gst
+
+SOURCE_BIN_PREFIX = "source-bin-"
+
+
+def source_index_of(obj):
+    """Return NN of the source-bin-NN that owns a GStreamer object, or None."""
+    while obj is not None:
+        name = obj.get_name()
+        if name and name.startswith(SOURCE_BIN_PREFIX):
+            try:
+                return int(name[len(SOURCE_BIN_PREFIX):])
+            except ValueError:
+                return None
+        obj = obj.get_parent()
+    return None
+
+
+class _SourceState:
+    def __init__(self, uri, now):
+        self.uri = uri
+        self.attempts = 0
+        self.started = now
+        self.down_since = None
+        self.restart_pending = False
+
+
+class SourceWatchdog:
+    """Restarts failing sources one by one instead of stopping the pipeline.
+
+    Errors and EOS are attributed to their source-bin-NN. That source is
+    rebuilt through the SourceManager after an exponential backoff with
+    jitter, while the other sources keep running. A periodic check also
+    restarts sources whose frames stopped arriving for stall_timeout
+    seconds. last_frame_time(pad_index) returns the monotonic time of the
+    latest frame of a source, or None.
+
+    Reconnects, downtime and up/down state are published to an optional
+    MetricsRegistry. The clock, random source and timer are injectable so
+    the control flow can be driven by a stand-in source.
+    """
+
+    def __init__(self, manager, last_frame_time, metrics=None, stall_timeout=10.0,
+                 base_delay=1.0, max_delay=60.0, jitter=0.3, stable_seconds=30.0,
+                 check_interval=1, restart_on_eos=True, clock=time.monotonic,
+                 rng=None, timeout_add=GLib.timeout_add, idle_add=GLib.idle_add):
+        self.manager = manager
+        self.last_frame_time = last_frame_time
+        self.metrics = metrics
+        self.stall_timeout = stall_timeout
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.stable_seconds = stable_seconds
+        self.check_interval = check_interval
+        self.restart_on_eos = restart_on_eos
+        self.clock = clock
+        self.rng = rng or random.Random()
+        self.timeout_add = timeout_add
+        self.idle_add = idle_add
+        self.states = {}
+        self.stopped = False
+
+        manager.on_added.append(self.source_added)
+        manager.on_removed.append(self.source_removed)
+        for index, (uri, source_bin) in manager.sources.items():
+            self.source_added(index, source_bin)
+
+    def start(self):
+        GLib.timeout_add_seconds(self.check_interval, self.check)
+        return self
+
+    def stop(self):
+        # Kapanista gonderilen EOS muxer'a ulasmali, kaynaklar yeniden baslatilmaz
+        self.stopped = True
+
+    def source_added(self, index, source_bin):
+        uri = self.manager.sources[index][0]
+        state = self.states.get(index)
+        if state is None or state.uri != uri:
+            state = self.states[index] = _SourceState(uri, self.clock())
+        state.started = self.clock()
+        state.restart_pending = False
+        pad = source_bin.get_static_pad("src")
+        if pad and self.restart_on_eos:
+            pad.add_probe(Gst.PadProbeType.EVENT_DOWNSTREAM, self._eos_probe, index)
+
+    def source_removed(self, index):
+        # Explicit removal (not a restart): stop watching this slot
+        self.states.pop(index, None)
+
+    def _eos_probe(self, pad, info, index):
+        event = info.get_event()
+        if event and event.type == Gst.EventType.EOS and not self.stopped:
+            # EOS'u muxer'a iletme, sadece bu kaynagi yeniden baslat
+            self.idle_add(self._report, index, "end of stream")
+            return Gst.PadProbeReturn.DROP
+        return Gst.PadProbeReturn.OK
+
+    def _report(self, index, reason):
+        self.source_failed(index, reason)
+        return False
+
+    def delay(self, attempts):
+        delay = min(self.max_delay, self.base_delay * (2 ** attempts))
+        return delay * (1.0 + self.jitter * (2.0 * self.rng.random() - 1.0))
+
+    def source_failed(self, index, reason):
+        state = self.states.get(index)
+        if state is None or state.restart_pending:
+            return False
+        now = self.clock()
+        if state.down_since is None:
+            state.down_since = now
+        state.restart_pending = True
+        delay = self.delay(state.attempts)
+        state.attempts += 1
+        sys.stderr.write("Source %d failed (%s), restart #%d in %.1fs\n" % (
+            index, reason, state.attempts, delay))
+        self._set_up(index, 0)
+        self.timeout_add(int(delay * 1000), self._restart, index)
+        return True
+
+    def _restart(self, index):
+        state = self.states.get(index)
+        if state is None:
+            return False
+        if self.metrics:
+            self.metrics.inc("source_reconnects_total", source=index)
+        if self.manager.restart_source(index, state.uri) is None:
+            state.restart_pending = False
+            self.source_failed(index, "restart failed")
+        return False
+
+    def _set_up(self, index, value):
+        if self.metrics:
+            self.metrics.set_gauge("source_up", value, source=index)
+
+    def check(self):
+        if self.stopped:
+            return False
+        now = self.clock()
+        for index, state in list(self.states.items()):
+            if state.restart_pending:
+                continue
+            last = self.last_frame_time(index)
+            if state.down_since is not None and last is not None and last > state.down_since:
+                # Ilk kare geldi: kaynak tekrar ayakta
+                downtime = last - state.down_since
+                state.down_since = None
+                if self.metrics:
+                    self.metrics.inc("source_downtime_seconds_total", downtime, source=index)
+                print("Source %d recovered after %.1fs" % (index, downtime))
+            if state.down_since is None:
+                self._set_up(index, 1)
+                if state.attempts and last is not None and now - state.started > self.stable_seconds:
+                    state.attempts = 0
+
+            reference = state.started if last is None or last < state.started else last
+            if now - reference > self.stall_timeout:
+                self.source_failed(index, "no frames for %.1fs" % (now - reference))
+        return True
+
+    def handle_error(self, message):
+        """Handle an ERROR bus message; returns False if no source owns it."""
+        index = source_index_of(message.src)
+        if index is None or index not in self.states:
+            return False
+        err, debug = message.parse_error()
+        sys.stderr.write("Error from source %d: %s: %s\n" % (index, err, debug))
+        self.source_failed(index, "error")
+        return True
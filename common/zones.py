@@ -0,0 +1,325 @@
+import configparser
+import sys
+import time
+from collections import deque, namedtuple
+
+import numpy as np
+
+ZONE_SECTION_PREFIX = "Zone"
+LINE_SECTION_PREFIX = "Line"
+RASTER_CELL = 4
+MAX_ZONES_PER_SOURCE = 64
+EVENT_BACKLOG = 4096
+
+# points: (n, 2) float, muxer cikis cozunurlugunde piksel
+Zone = namedtuple("Zone", ["name", "source", "points", "classes", "roi"])
+Tripwire = namedtuple("Tripwire", ["name", "source", "a", "b", "classes"])
+
+
+def _parse_points(text, scale):
+    points = []
+    for pair in text.replace("\n", ";").split(";"):
+        if pair.strip():
+            x, y = pair.split(",")
+            points.append((float(x), float(y)))
+    return np.array(points, dtype=np.float64).reshape(-1, 2) * scale
+
+
+def _parse_classes(text):
+    text = text.strip()
+    return tuple(int(value) for value in text.split(",")) if text else None
+
+
+def load_zone_config(config_path, frame_size=(1920, 1080)):
+    """Read enabled [Zone-<name>] and [Line-<name>] sections; returns (zones, tripwires).
+
+    points are "x,y; x,y; ..." in muxer output pixels, or fractions of
+    frame_size with normalized = 1. classes is an optional class id list.
+    """
+    parser = configparser.ConfigParser(interpolation=None)
+    if not parser.read(config_path):
+        sys.stderr.write("Zone config not found: %s\n" % config_path)
+    zones, tripwires = [], []
+    for section in parser.sections():
+        prefix, _, name = section.partition("-")
+        if prefix not in (ZONE_SECTION_PREFIX, LINE_SECTION_PREFIX):
+            continue
+        if not parser.getboolean(section, "enable", fallback=True):
+            continue
+        scale = np.array(frame_size, dtype=np.float64) if parser.getboolean(
+            section, "normalized", fallback=False) else 1.0
+        try:
+            points = _parse_points(parser.get(section, "points", fallback=""), scale)
+            source = parser.getint(section, "source", fallback=0)
+            classes = _parse_classes(parser.get(section, "classes", fallback=""))
+        except ValueError as e:
+            sys.stderr.write("Skipping %s: %s\n" % (section, e))
+            continue
+        if prefix == ZONE_SECTION_PREFIX:
+            if len(points) < 3:
+                sys.stderr.write("Skipping %s: a zone needs at least 3 points\n" % section)
+                continue
+            zones.append(Zone(name, source, points, classes, parser.getboolean(section, "roi", fallback=False)))
+        else:
+            if len(points) != 2:
+                sys.stderr.write("Skipping %s: a line needs exactly 2 points\n" % section)
+                continue
+            tripwires.append(Tripwire(name, source, points[0], points[1], classes))
+    return zones, tripwires
+
+
+def points_in_polygon(xs, ys, polygon):
+    """Crossing-number test of every point against one polygon, vectorized over points."""
+    inside = np.zeros(np.shape(xs), dtype=bool)
+    x1, y1 = polygon[:, 0], polygon[:, 1]
+    x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+    for ax, ay, bx, by in zip(x1, y1, x2, y2):
+        if ay == by:
+            continue
+        straddles = (ay > ys) != (by > ys)
+        x_cross = ax + (ys - ay) * (bx - ax) / (by - ay)
+        inside ^= straddles & (xs < x_cross)
+    return inside
+
+
+def rasterize_polygon(polygon, width, height, cell=RASTER_CELL):
+    """Lookup mask of the cells (cell x cell pixels) whose center is inside the polygon."""
+    ys, xs = np.mgrid[0:(height + cell - 1) // cell, 0:(width + cell - 1) // cell]
+    return points_in_polygon((xs + 0.5) * cell, (ys + 0.5) * cell, polygon)
+
+
+def segment_crossings(p, q, a, b):
+    """Crossing direction of movements p->q over lines a->b, shape (n, l).
+
+    p, q are (n, 2) and a, b are (n, l, 2) (lines of each movement's
+    source). +1: from the right of a->b (as seen on screen, y down) to
+    its left, -1: left to right, 0: no crossing.
+    """
+    p = p[:, None, :]
+    q = q[:, None, :]
+    d = b - a
+    side_p = d[..., 0] * (p[..., 1] - a[..., 1]) - d[..., 1] * (p[..., 0] - a[..., 0])
+    side_q = d[..., 0] * (q[..., 1] - a[..., 1]) - d[..., 1] * (q[..., 0] - a[..., 0])
+    r = q - p
+    end_a = r[..., 0] * (a[..., 1] - p[..., 1]) - r[..., 1] * (a[..., 0] - p[..., 0])
+    end_b = r[..., 0] * (b[..., 1] - p[..., 1]) - r[..., 1] * (b[..., 0] - p[..., 0])
+    crossed = (side_p * side_q < 0) & (end_a * end_b <= 0)
+    return np.where(crossed, np.sign(side_p), 0).astype(np.int8)
+
+
+class ZoneEngine:
+    """Zone occupancy, zone enter/exit and line crossing rules for whole batches.
+
+    Geometry is precomputed per source: every zone becomes one bit of a
+    rasterized lookup mask (cell x cell pixels, stacked over sources), so
+    the zone membership of all anchor points of a batch is a single
+    gather. Lines are stacked into padded per-source arrays and tested
+    against each object's movement since its previous point. Membership
+    bits and last points are kept per trail slot, so enter/exit is a
+    bitwise compare. Events go to a bounded deque (drain_events, e.g. for the
+    AnalyticsWorker); occupancy and counters go to an optional
+    MetricsRegistry. With drop_outside_roi, process() returns the mask
+    of objects inside the roi zones of their source (sources without roi
+    zones keep everything).
+    """
+
+    def __init__(self, zones, tripwires, frame_size=(1920, 1080), cell=RASTER_CELL, labels=None,
+                 metrics=None, drop_outside_roi=False):
+        self.frame_size = frame_size
+        self.cell = cell
+        self.labels = labels
+        self.metrics = metrics
+        self.drop_outside_roi = drop_outside_roi
+        self.events = deque(maxlen=EVENT_BACKLOG)
+        self.slot_bits = None
+        self.slot_points = None
+        # Son process() cagrisinin (satir, olay) ciftleri, ornegin snapshot icin
+        self.batch_events = []
+
+        sources = sorted({zone.source for zone in zones} | {line.source for line in tripwires})
+        self.source_row = {source: row for row, source in enumerate(sources)}
+        # Son satir: kurali olmayan kaynaklar (bos maske, cizgi yok)
+        rows = len(sources) + 1
+        self.zone_names = [[] for _ in range(rows)]
+        self.line_names = [[] for _ in range(rows)]
+        class_ids = [c for rule in list(zones) + list(tripwires) for c in (rule.classes or ())]
+        # Son sinif sutunu: filtrelerde gecmeyen sinif id'leri
+        self.num_classes = (max(class_ids) + 2) if class_ids else 1
+
+        width, height = frame_size
+        self.grid_shape = ((height + cell - 1) // cell, (width + cell - 1) // cell)
+        self.raster = np.zeros((rows,) + self.grid_shape, dtype=np.uint64)
+        self.roi_bits = np.zeros(rows, dtype=np.uint64)
+        self.class_bits = np.full((rows, self.num_classes), np.iinfo(np.uint64).max, dtype=np.uint64)
+        for zone in zones:
+            row = self.source_row[zone.source]
+            names = self.zone_names[row]
+            if len(names) >= MAX_ZONES_PER_SOURCE:
+                sys.stderr.write("Source %d: more than %d zones, %s ignored\n" % (
+                    zone.source, MAX_ZONES_PER_SOURCE, zone.name))
+                continue
+            bit = np.uint64(1) << np.uint64(len(names))
+            names.append(zone.name)
+            self.raster[row][rasterize_polygon(zone.points, width, height, cell)] |= bit
+            if zone.roi:
+                self.roi_bits[row] |= bit
+            if zone.classes is not None:
+                allowed = np.zeros(self.num_classes, dtype=bool)
+                allowed[list(zone.classes)] = True
+                self.class_bits[row, ~allowed] &= ~bit
+        self.max_zones = max((len(names) for names in self.zone_names), default=0)
+
+        max_lines = max([sum(1 for line in tripwires if line.source == source) for source in sources] + [1])
+        self.line_a = np.zeros((rows, max_lines, 2), dtype=np.float64)
+        self.line_b = np.zeros((rows, max_lines, 2), dtype=np.float64)
+        self.line_ok = np.zeros((rows, self.num_classes, max_lines), dtype=bool)
+        for line in tripwires:
+            row = self.source_row[line.source]
+            j = len(self.line_names[row])
+            self.line_names[row].append(line.name)
+            self.line_a[row, j] = line.a
+            self.line_b[row, j] = line.b
+            if line.classes is None:
+                self.line_ok[row, :, j] = True
+            else:
+                self.line_ok[row, list(line.classes), j] = True
+
+        self.has_lines = bool(tripwires)
+        self.occupancy = {}
+        self.entries = {}
+        self.crossings = {}
+
+    @classmethod
+    def from_config(cls, config_path, frame_size=(1920, 1080), **kwargs):
+        zones, tripwires = load_zone_config(config_path, frame_size)
+        return cls(zones, tripwires, frame_size, **kwargs)
+
+    def label(self, class_id):
+        if self.labels and 0 <= class_id < len(self.labels) and self.labels[class_id]:
+            return self.labels[class_id]
+        return str(class_id)
+
+    def _rows(self, pad_index):
+        rows = np.full(len(pad_index), len(self.source_row), dtype=np.int64)
+        for source, row in self.source_row.items():
+            rows[pad_index == source] = row
+        return rows
+
+    def zone_bits(self, pad_index, xs, ys, class_id):
+        """Zone membership bits of anchor points (one bit per zone of the point's source)."""
+        rows = self._rows(pad_index)
+        gy = np.clip(np.asarray(ys, dtype=np.int64) // self.cell, 0, self.grid_shape[0] - 1)
+        gx = np.clip(np.asarray(xs, dtype=np.int64) // self.cell, 0, self.grid_shape[1] - 1)
+        classes = np.clip(class_id, 0, self.num_classes - 1)
+        return self.raster[rows, gy, gx] & self.class_bits[rows, classes], rows
+
+    def process(self, columns, xs, ys, slots, trail_store, timestamp=None):
+        """Evaluate every object of a batch; call after the trail points are appended.
+
+        xs, ys are the anchor points (bottom centers, muxer pixels of their
+        source) and slots the trail slots of the object rows. Returns the keep mask or None.
+        """
+        n = columns.num_objects
+        pad_index = columns.pad_index[:n]
+        class_id = columns.class_id[:n]
+        bits, rows = self.zone_bits(pad_index, xs, ys, class_id)
+
+        if self.slot_bits is None or len(self.slot_bits) != trail_store.capacity:
+            self.slot_bits = np.zeros(trail_store.capacity, dtype=np.uint64)
+            self.slot_points = np.zeros((trail_store.capacity, 2), dtype=np.float64)
+        # Slot'un onceki noktasi bu nesneye ait mi (trail'de en az 2 nokta)
+        moved = trail_store.counts[slots] >= 2
+        current = np.stack((np.asarray(xs, dtype=np.float64), np.asarray(ys, dtype=np.float64)), axis=1)
+        previous = self.slot_points[slots]
+        old_bits = np.where(moved, self.slot_bits[slots], bits)
+        self.slot_bits[slots] = bits
+        self.slot_points[slots] = current
+
+        events = []
+        rows_fired = []
+        ts = time.time() if timestamp is None else timestamp
+        if self.max_zones:
+            changed = np.flatnonzero(bits != old_bits)
+            for i in changed.tolist():
+                for kind, mask in (("zone_enter", int(bits[i] & ~old_bits[i])),
+                                   ("zone_exit", int(old_bits[i] & ~bits[i]))):
+                    while mask:
+                        z = (mask & -mask).bit_length() - 1
+                        mask &= mask - 1
+                        events.append(self._event(kind, ts, columns, i, zone=self.zone_names[rows[i]][z]))
+                        rows_fired.append(i)
+            self._occupancy(columns, bits, rows)
+
+        if self.has_lines and moved.any():
+            direction = segment_crossings(previous, current, self.line_a[rows], self.line_b[rows])
+            direction[~(moved[:, None] & self.line_ok[rows, np.clip(class_id, 0, self.num_classes - 1)])] = 0
+            for i, j in zip(*np.nonzero(direction)):
+                events.append(self._event("line_cross", ts, columns, int(i), line=self.line_names[rows[i]][j],
+                                          direction="right_to_left" if direction[i, j] > 0 else "left_to_right"))
+                rows_fired.append(int(i))
+
+        for event in events:
+            self._count(event)
+        self.events.extend(events)
+        self.batch_events = list(zip(rows_fired, events))
+
+        if not self.drop_outside_roi:
+            return None
+        roi = self.roi_bits[rows]
+        return (roi == 0) | ((bits & roi) != 0)
+
+    def _event(self, kind, ts, columns, i, **rule):
+        class_id = int(columns.class_id[i])
+        event = {"type": kind, "ts": ts, "source": int(columns.pad_index[i]), "frame": int(columns.frame_num[i]),
+                 "object_id": int(columns.object_id[i]), "class_id": class_id, "label": self.label(class_id)}
+        event.update(rule)
+        return event
+
+    def _count(self, event):
+        if event["type"] == "line_cross":
+            key = (event["source"], event["line"], event["direction"])
+            self.crossings[key] = self.crossings.get(key, 0) + 1
+            if self.metrics:
+                self.metrics.inc("line_crossings_total", source=event["source"], line=event["line"],
+                                 direction=event["direction"], label=event["label"])
+        elif event["type"] == "zone_enter":
+            key = (event["source"], event["zone"])
+            self.entries[key] = self.entries.get(key, 0) + 1
+            if self.metrics:
+                self.metrics.inc("zone_entries_total", source=event["source"], zone=event["zone"],
+                                 label=event["label"])
+
+    def _occupancy(self, columns, bits, rows):
+        # Her zone bir bit: (nesne, zone) matrisi uzerinden kaynak basina toplam
+        shifts = np.arange(self.max_zones, dtype=np.uint64)
+        members = ((bits[:, None] >> shifts) & np.uint64(1)).astype(np.int64)
+        counts = np.zeros((len(self.zone_names), self.max_zones), dtype=np.int64)
+        np.add.at(counts, rows, members)
+        for source in set(columns.frame_pad_index[:columns.num_frames].tolist()):
+            row = self.source_row.get(source)
+            if row is None:
+                continue
+            for z, name in enumerate(self.zone_names[row]):
+                count = int(counts[row, z])
+                self.occupancy[(source, name)] = count
+                if self.metrics:
+                    self.metrics.set_gauge("zone_occupancy", count, source=source, zone=name)
+
+    def drain_events(self):
+        events = []
+        while self.events:
+            try:
+                events.append(self.events.popleft())
+            except IndexError:
+                break
+        return events
+
+    def drop_source(self, pad_index):
+        """Forget a source; called by probes.apply_pending_drops on the streaming thread.
+
+        Trail slots are released by the trail store.
+        """
+        for key in [key for key in self.occupancy if key[0] == pad_index]:
+            del self.occupancy[key]
+            if self.metrics:
+                self.metrics.remove_gauge("zone_occupancy", source=pad_index, zone=key[1])
@@ -1,192 +1,174 @@
+import time
+# Baslangic profili import suresini de kapsasin
+STARTUP_T0 = time.perf_counter()
 import sys
 import gi
 import platform
 import os
 import argparse
-import time
-import math
+import functools
 # GStreamer kutuphanelerini yukle
+# (GstRtspServer sadece rtsp sink'i kullanilinca common/sinks.py icinde yuklenir)
 gi.require_version('Gst', '1.0')
-gi.require_version('GstRtspServer', '1.0')
-from gi.repository import GLib, Gst, GstRtspServer
-os.environ["GST_DEBUG_DUMP_DOT_DIR"] = os.getcwd()
+from gi.repository import GLib, Gst
 
-from probes import osd_sink_pad_buffer_probe
+import pyds
+import probes
+from probes import osd_sink_pad_buffer_probe, metrics_sink_pad_buffer_probe, batch_pad_indices, batch_frame_pts, \
+    drop_source_state, restart_source_state, trace_record_probe, analytics_pad_buffer_probe
 
-from common.platform_info import PlatformInfo
+from common.bus_call import bus_call, stop_pipeline
+from common.platform_info import get_platform_info, save_platform_info
+from common.startup_profiler import StartupProfiler
 from common.FPS import PERF_DATA
-from common.utils import create_dynamic_labels
+from common.render_style import RenderStyleTable
+from common.latency_tracer import LatencyTracer
+from common.metrics import MetricsRegistry, MetricsServer
+from common.sinks import SINK_MODES, SinkBuilder, load_output_settings
+from common.source_manager import SourceManager, MediaFileWatcher, SourceControlServer, load_media_sources
+from common.watchdog import SourceWatchdog
+from common.load_controller import IntervalController
+from common.load_shedding import LoadControlLoop, NominalFps, SourceShedder
+from common.engine_cache import EngineCache, ensure_engine
+from common.analytics import AnalyticsQueue, AnalyticsWorker, EventDetector, JsonlWriter, ParquetWriter
+from common.mask_export import MaskExporter, MaskExtractor, SEGMENTATION_THRESHOLD
+from common.meta_trace import TraceRecorder
+from common.motion_gate import ChangeDetector, MotionGate
+from common.zones import ZoneEngine
+from common.tile_layout import TileLayout
+from common.heatmap import HeatmapAccumulator, HeatmapSnapshotter
+from common.snapshots import NvBufSurfaceFrames, SnapshotCapture, SnapshotLimiter
+from common.model_swap import ModelSwapper
+from common.tuning import load_pipeline_settings
+from common.queue_policy import FrameAgeGate, QueuePolicy, load_freshness_settings
+from common.pipeline_builder import build_pipeline, create_source_bin, make_pgie, make_streammux
+from common.utils import load_labels, load_pgie_config
 
 # Sabitler
 MUXER_OUTPUT_WIDTH = 1920
 MUXER_OUTPUT_HEIGHT = 1080
-MUXER_BATCH_TIMEOUT_USEC = 4000000
-TILED_OUTPUT_WIDTH = 1920
-TILED_OUTPUT_HEIGHT = 1080
 IS_TEGRA = platform.machine() == 'aarch64'
+platform_cache_file = os.path.expanduser("~/.cache/deepstream-yolo/platform.json")
 pgie_conf_file="/apps/deepstream-yolo-e2e/config/pgie/config_pgie_yolo_seg.txt"
+app_conf_file=os.path.join(os.path.dirname(os.path.abspath(__file__)), "config/python_app/config.ini")
+media_conf_file=os.path.join(os.path.dirname(os.path.abspath(__file__)), "config/python_app/media.ini")
+zones_conf_file=os.path.join(os.path.dirname(os.path.abspath(__file__)), "config/python_app/zones.ini")
 
 
-def bus_call(bus, message, loop):
-    t = message.type
-    if t == Gst.MessageType.EOS:
-        sys.stdout.write("End-of-stream\n")
-        loop.quit()
-    elif t==Gst.MessageType.WARNING:
-        err, debug = message.parse_warning()
-        sys.stderr.write("Warning: %s: %s\n" % (err, debug))
-    elif t == Gst.MessageType.ERROR:
-        err, debug = message.parse_error()
-        sys.stderr.write("Error: %s: %s\n" % (err, debug))
-        loop.quit()
-    return True
-
-
-def cb_newpad(decodebin, decoder_src_pad, data):
-    print("In cb_newpad\n")
-    caps = decoder_src_pad.get_current_caps()
-    if not caps:
-        caps = decoder_src_pad.query_caps()
-    gststruct = caps.get_structure(0)
-    gstname = gststruct.get_name()
-    source_bin = data
-    features = caps.get_features(0)
-
-    # Need to check if the pad created by the decodebin is for video and not
-    # audio.
-    print("gstname=", gstname)
-    if (gstname.find("video") != -1):
-        print("features=", features)
-        if features.contains("memory:NVMM"):
-            # Get the source bin ghost pad
-            bin_ghost_pad = source_bin.get_static_pad("src")
-            if not bin_ghost_pad.set_target(decoder_src_pad):
-                sys.stderr.write("Failed to link decoder src pad to source bin ghost pad\n")
-        else:
-            sys.stderr.write(" Error: Decodebin did not pick nvidia decoder plugin.\n")
-
-
-def decodebin_child_added(child_proxy, Object, name, user_data):
-    platform_info = PlatformInfo()
-    print("Decodebin child added:", name, "\n")
-    if name.find("decodebin") != -1:
-        Object.connect("child-added", decodebin_child_added, user_data)
-
-    if (name.find("nvv4l2decoder") != -1):
-        if (platform_info.is_integrated_gpu()):
-            Object.set_property("enable-max-performance", True)
-            Object.set_property("drop-frame-interval", 0)
-            Object.set_property("num-extra-surfaces", 0)
-
-    if "source" in name:
-        source_element = child_proxy.get_by_name("source")
-        if source_element.find_property('drop-on-latency') != None:
-            Object.set_property("drop-on-latency", True)
-
-
-def create_source_bin(index, uri):
-    print("Creating source bin")
-
-    bin_name = "source-bin-%02d" % index
-    print(bin_name)
-    nbin = Gst.Bin.new(bin_name)
-    if not nbin:
-        sys.stderr.write(" Unable to create source bin \n")
-
-    uri_decode_bin = Gst.ElementFactory.make("uridecodebin", "uri-decode-bin")
-
-    if not uri_decode_bin:
-        sys.stderr.write(" Unable to create uri decode bin \n")
-
-    uri_decode_bin.set_property("uri", uri)
-    uri_decode_bin.connect("pad-added", cb_newpad, nbin)
-    uri_decode_bin.connect("child-added", decodebin_child_added, nbin)
-
-    Gst.Bin.add(nbin, uri_decode_bin)
-    bin_pad = nbin.add_pad(Gst.GhostPad.new_no_target("src", Gst.PadDirection.SRC))
-    if not bin_pad:
-        sys.stderr.write(" Failed to add ghost pad in source bin \n")
-        return None
-    return nbin
-
-
+def dump_pipeline_graph(bus, message, pipeline, name):
+    """Write the pipeline DOT graph once, when it first reaches PLAYING."""
+    if message.src != pipeline:
+        return
+    old, new, pending = message.parse_state_changed()
+    if new != Gst.State.PLAYING or getattr(pipeline, "graph_dumped", False):
+        return
+    pipeline.graph_dumped = True
+    Gst.debug_bin_to_dot_file(pipeline, Gst.DebugGraphDetails.ALL, name)
+    print(f"Pipeline graph: {os.environ['GST_DEBUG_DUMP_DOT_DIR']}/{name}.dot")
 
 
 def main(args):
+    profiler = StartupProfiler(STARTUP_T0, output=args.profile_output) if args.profile_startup else None
+    if profiler:
+        profiler.mark("imports")
+    # Platform bilgisi surec basina bir kez (ve istenirse diskten) okunur
+    get_platform_info(None if args.no_platform_cache else platform_cache_file)
 
     # Ayarlar
-    sources = args.source
-    number_sources = len(sources)
-    batch_size = args.batch_size if args.batch_size > 0 else number_sources
+    sources = list(args.source or [])
+    initial_sources = len(sources)
+    if args.watch_media:
+        initial_sources += len([uri for uri in load_media_sources(args.media) if uri not in sources])
+    if not initial_sources and not args.control_socket:
+        sys.stderr.write("No sources: use --source, --watch-media or --control-socket\n")
+        return -1
+    # Calisma sirasinda eklenebilecek kaynaklar icin tiler boyutu
+    max_sources = max(initial_sources, args.max_sources, 1)
+    number_sources = max(initial_sources, 1)
+    # Komut satiri > config.ini [Settings] (scripts/tune_pipeline.py ciktisi) > varsayilan
+    pipeline_settings = load_pipeline_settings(args.config)
+    batch_size = args.batch_size or pipeline_settings["batch_size"] or number_sources
+    args.mux_width = args.mux_width or pipeline_settings["muxer_output_width"]
+    args.mux_height = args.mux_height or pipeline_settings["muxer_output_height"]
+    pgie_config = args.pgie_config or pipeline_settings["pgie_config_file"] or pgie_conf_file
 
     # GStreamer Başlat
+    if args.dot_dump:
+        # Gst.init'ten once ayarlanmali
+        os.environ.setdefault("GST_DEBUG_DUMP_DOT_DIR", os.getcwd())
     Gst.init(None)
     pipeline = Gst.Pipeline.new("deepstream-linear-pipeline")
     loop = GLib.MainLoop()
-
-    # 1. Stream Muxer (Kaynak birlestirici)
-    streammux = Gst.ElementFactory.make("nvstreammux", "Stream-muxer")
-    streammux.set_property('width', args.mux_width)
-    streammux.set_property('height', args.mux_height)
-    streammux.set_property('batch-size', batch_size)
-    streammux.set_property('batched-push-timeout', MUXER_BATCH_TIMEOUT_USEC)
-    streammux.set_property('live-source', 1)
+    if profiler:
+        profiler.mark("gst_init")
+
+    # Asamalar arasi queue'lar ve tazelik ayarlari (config.ini)
+    metrics = MetricsRegistry()
+    freshness = load_freshness_settings(args.config)
+    if args.max_frame_age_ms is not None:
+        freshness["max_frame_age_ms"] = args.max_frame_age_ms
+    queue_policy = QueuePolicy.from_config(args.config, metrics)
+    motion_gate = None
+    if args.motion_gate:
+        motion_gate = MotionGate(args.motion_threshold, refresh_every=args.motion_refresh,
+                                 hold_frames=args.motion_hold, detector=ChangeDetector(args.motion_pixel_delta),
+                                 metrics=metrics)
+
+    # 1. Stream Muxer (Kaynak birlestirici); kaynaklar baglanmadan once pipeline'da olmali
+    streammux = make_streammux(args.mux_width, args.mux_height, batch_size, freshness["muxer_batch_timeout_usec"])
     pipeline.add(streammux)
 
     # Kaynaklari olustur ve Muxer'a bagla
-    for i in range(number_sources):
-        uri_name = sources[i]
-        source_bin = create_source_bin(i, uri_name)
-        pipeline.add(source_bin)
-
-        padname = "sink_%u" % i
-        sinkpad = streammux.request_pad_simple(padname)
-        srcpad = source_bin.get_static_pad("src")
-        srcpad.link(sinkpad)
+    source_manager = SourceManager(pipeline, streammux,
+                                   functools.partial(create_source_bin, queue_policy=queue_policy,
+                                                     motion_gate=motion_gate), max_sources,
+                                   on_removed=[drop_source_state, queue_policy.drop_source],
+                                   on_added=[profiler.watch_source] if profiler else (),
+                                   on_restarted=[restart_source_state])
+    # Inference oncesi bayat kareleri at (sadece canli kaynaklar)
+    if freshness["max_frame_age_ms"] > 0:
+        age_gate = FrameAgeGate(freshness["max_frame_age_ms"], metrics)
+        source_manager.on_added.append(age_gate.attach)
+        source_manager.on_removed.append(age_gate.drop_source)
+    # Degismeyen kareler muxer'a (ve nvinfer'e) hic girmez
+    if motion_gate:
+        source_manager.on_added.append(motion_gate.attach)
+        source_manager.on_removed.append(motion_gate.drop_source)
+        source_manager.on_restarted.append(motion_gate.drop_source)
+    for uri_name in sources:
+        if source_manager.add_source(uri_name, start=False) is None:
+            sys.stderr.write(f"Unable to add source {uri_name}\n")
+    media_watcher = None
+    if args.watch_media:
+        media_watcher = MediaFileWatcher(source_manager, args.media)
+        media_watcher.load(start=False)
 
 
     # 2. Inference (PGIE) - Model
-    pgie = Gst.ElementFactory.make("nvinfer", "primary-inference")
-    pgie.set_property('config-file-path', pgie_conf_file)
-    pgie.set_property("batch-size", batch_size)
-    pgie.set_property('output-tensor-meta', True)
-    pipeline.add(pgie)
-
-    # 3. Tiler (Izgara gorunumu) - Bu demux/mux dongusu yerine cok daha kararlidir
-    tiler = Gst.ElementFactory.make("nvmultistreamtiler", "nvtiler")
-    tiler.set_property("rows", int(math.sqrt(number_sources)))
-    tiler.set_property("columns", int(math.ceil((1.0 * number_sources) / int(math.sqrt(number_sources)))))
-    tiler.set_property("width", TILED_OUTPUT_WIDTH)
-    tiler.set_property("height", TILED_OUTPUT_HEIGHT)
-    pipeline.add(tiler)
-
-    # Convert
-    nvvidconv = Gst.ElementFactory.make("nvvideoconvert", "nvvidconv")
-    pipeline.add(nvvidconv)
-
-    # TEK OSD (GLOBAL)
-    osd = Gst.ElementFactory.make("nvdsosd", "global_osd")
-    osd.set_property('display-mask', True)
-    pipeline.add(osd)
-
-    # OSD sonrası queue
-    queue_post_osd = Gst.ElementFactory.make("queue", "queue_post_osd")
-    queue_post_osd.set_property("max-size-buffers", 1)
-    queue_post_osd.set_property("leaky", 2)
-    pipeline.add(queue_post_osd)
-
-    # Global Tee
-    tee_global = Gst.ElementFactory.make("tee", "global_tee")
-    pipeline.add(tee_global)
-
-    streammux.link(pgie)
-    pgie.link(tiler)
-    tiler.link(nvvidconv)
-    nvvidconv.link(osd)
-    osd.link(queue_post_osd)
-    queue_post_osd.link(tee_global)
-
-    dynamic_labels = create_dynamic_labels(pgie_conf_file)
+    if args.engine_cache:
+        # Engine'i batch boyutuna gore cache'ten al (yoksa uret); asil config degil, kopyasi ona yonlendirilir
+        pgie_config = ensure_engine(pgie_config, EngineCache(args.engine_cache), batch_size)
+        print(f"PGIE config: {pgie_config}")
+        if profiler:
+            profiler.mark("engine_cache")
+    pgie = make_pgie(pgie_config, batch_size)
+
+    # 3. Tiler, OSD, tee ve asama queue'lari (scripts/tune_pipeline.py ayni zinciri kurar)
+    elements = build_pipeline(pipeline, streammux, pgie, queue_policy, max_sources,
+                              (pipeline_settings["tiled_output_width"], pipeline_settings["tiled_output_height"]),
+                              snapshot_rgba=bool(args.snapshot_dir), is_tegra=IS_TEGRA)
+    if elements is None:
+        return -1
+    chain, tiler, osd, tee_global = elements.chain, elements.tiler, elements.osd, elements.tee
+    if profiler:
+        profiler.mark("elements")
+
+    # Sinif bazli label / renk / font tablosu (bir kez)
+    render_styles = RenderStyleTable.from_pgie_config(pgie_config, number_sources)
+    # Calisma sirasinda kaynak eklenip cikarildikca font boyutu kaynak sayisina uyar
+    source_manager.on_added.append(
+        lambda index, source_bin: render_styles.set_source_count(len(source_manager.sources)))
+    source_manager.on_removed.append(lambda index: render_styles.set_source_count(len(source_manager.sources)))
 
     """
     # Probe Ekleme (PGIE Cikisina)
@@ -195,68 +177,237 @@ def main(args):
         pgie_src_pad.add_probe(Gst.PadProbeType.BUFFER, pgie_src_pad_buffer_probe, None)
     """
 
+    # Metadata kaydi (benchmarks/replay_trace.py ile GPU'suz tekrar oynatilir)
+    trace_recorder = None
+    if args.record_trace:
+        threshold = float(load_pgie_config(pgie_config).get("segmentation-threshold", SEGMENTATION_THRESHOLD))
+        trace_recorder = TraceRecorder(args.record_trace, pyds, record_masks=args.record_masks,
+                                       mask_threshold=threshold)
+        print(f"Recording batch metadata: {args.record_trace}")
+
+    # Stream bazli FPS / kare araligi / probe suresi metrikleri (model degisiminde yeni pgie'ye tasinir)
+    source_manager.on_removed.append(metrics.remove_stream)
+
+    def attach_pgie_probes(element):
+        src_pad = element.get_static_pad("src")
+        if not src_pad:
+            sys.stdout.write("Unable to get pgie src pad\n")
+            return
+        src_pad.add_probe(Gst.PadProbeType.BUFFER, metrics_sink_pad_buffer_probe, None, metrics)
+
+    attach_pgie_probes(pgie)
+
+    # Takip / kurallar / isi haritasi / snapshot tiler'dan once, kaynagin muxer koordinatinda
+    # (tiler ile OSD arasinda queue yok: iki probe ayni thread'de sirayla calisir)
+    tiler_sink_pad = tiler.get_static_pad("sink")
+    # Kayit analytics probe'undan once, muxer koordinatinda (ID / ROI degisikliklerinden once) alinir
+    if trace_recorder:
+        tiler_sink_pad.add_probe(Gst.PadProbeType.BUFFER, trace_record_probe, None, trace_recorder)
+    tiler_sink_pad.add_probe(Gst.PadProbeType.BUFFER, metrics.timed("analytics", analytics_pad_buffer_probe), None)
+
     osd_sink_pad = osd.get_static_pad("sink")
     if not osd_sink_pad:
         sys.stdout.write("Unable to create sink pad\n")
     else:
-        osd_sink_pad.add_probe(Gst.PadProbeType.BUFFER, osd_sink_pad_buffer_probe, None, dynamic_labels, number_sources)
-
-    # --- EKRAN CIKISI (DISPLAY SINK) ---
-    queue_display = Gst.ElementFactory.make("queue", "queue_display")
-    pipeline.add(queue_display)
-
-    # Format Zorlayici (Siyah ekrani onlemek icin RGBA zorluyoruz)
-    caps_filter = Gst.ElementFactory.make("capsfilter", "display_caps")
-    caps = Gst.Caps.from_string("video/x-raw(memory:NVMM), format=RGBA")
-    caps_filter.set_property("caps", caps)
-    pipeline.add(caps_filter)
-
-    # Sink Secimi
-    sink = Gst.ElementFactory.make("nveglglessink", "nvvideo-renderer")
-    sink.set_property("sync", False)  # Canli yayin oldugu icin False
-    sink.set_property("qos", False)
-    pipeline.add(sink)
-
-    # Ekran Baglantilari
-    # Tee -> Queue -> Caps -> (Transform if Tegra) -> Sink
-    tee_src_pad = tee_global.request_pad_simple("src_%u")
-    queue_sink_pad = queue_display.get_static_pad("sink")
-    tee_src_pad.link(queue_sink_pad)
-
-    if IS_TEGRA:
-        print("Platform: Jetson. nvegltransform ekleniyor.")
-        transform = Gst.ElementFactory.make("nvegltransform", "nvegl-transform")
-        pipeline.add(transform)
-        queue_display.link(caps_filter)
-        caps_filter.link(transform)
-        transform.link(sink)
-    else:
-        print("Platform: dGPU. nvegltransform gerekmez.")
-        queue_display.link(caps_filter)
-        caps_filter.link(sink)
+        osd_sink_pad.add_probe(Gst.PadProbeType.BUFFER, metrics.timed("osd", osd_sink_pad_buffer_probe),
+                               None, render_styles)
+
+    # --- BOLGE / CIZGI KURALLARI (kamera basina, zones.ini) ---
+    zone_engine = None
+    if args.zones:
+        zone_engine = ZoneEngine.from_config(args.zones, frame_size=(args.mux_width, args.mux_height),
+                                             labels=load_labels(pgie_config), metrics=metrics,
+                                             drop_outside_roi=args.roi_only)
+        probes.zone_engine = zone_engine
+        # Kaynak silmeleri drop_source_state uzerinden (streaming thread'inde) uygulanir
+        print(f"Zone rules: {sum(map(len, zone_engine.zone_names))} zones, "
+              f"{sum(map(len, zone_engine.line_names))} lines ({args.zones})")
+
+    # Trail noktalari OSD'nin cizdigi karo koordinatinda saklanir
+    probes.tile_layout = TileLayout.from_tiler(tiler, args.mux_width, args.mux_height)
+
+    # --- ISI HARITASI (kamera basina dwell / doluluk) ---
+    heatmap_snapshotter = None
+    if args.heatmap_dir:
+        probes.heatmap = HeatmapAccumulator((args.mux_width, args.mux_height), cell=args.heatmap_cell,
+                                            half_life=args.heatmap_half_life, max_sources=max_sources)
+        heatmap_snapshotter = HeatmapSnapshotter(probes.heatmap, args.heatmap_dir, interval=args.heatmap_interval,
+                                                 formats=args.heatmap_format.split("+"),
+                                                 keep=args.heatmap_keep).start()
+        print(f"Heatmaps: {args.heatmap_dir} ({args.heatmap_format}, every {args.heatmap_interval}s)")
+
+    # --- SNAPSHOT (kural olaylarinda nesne kesitleri, JPEG) ---
+    snapshot_capture = None
+    if args.snapshot_dir:
+        if not zone_engine:
+            sys.stderr.write("--snapshot-dir has no effect without --zones\n")
+        limiter = SnapshotLimiter(stream_rate=args.snapshot_rate, stream_burst=args.snapshot_burst,
+                                  object_interval=args.snapshot_object_interval,
+                                  budget_bytes=args.snapshot_budget_mb * 1024 * 1024)
+        snapshot_capture = SnapshotCapture(NvBufSurfaceFrames(pyds, IS_TEGRA), args.snapshot_dir, limiter,
+                                           workers=args.snapshot_workers, quality=args.snapshot_quality,
+                                           metrics=metrics)
+        probes.snapshot_capture = snapshot_capture
+        source_manager.on_removed.append(snapshot_capture.drop_source)
+        print(f"Snapshots: {args.snapshot_dir} ({args.snapshot_rate}/s per source, "
+              f"{args.snapshot_workers} encode workers)")
+
+    # --- ANALITIK (giris/cikis olaylari, sinif sayilari) ---
+    # Probe sadece kolonlari kuyruga koyar, yazim ayri thread'de
+    analytics_worker = None
+    if args.analytics_dir:
+        writer_class = ParquetWriter if args.analytics_format == "parquet" else JsonlWriter
+        writer = writer_class(args.analytics_dir, max_bytes=args.analytics_rotate_mb * 1024 * 1024)
+        probes.analytics_queue = AnalyticsQueue()
+        analytics_worker = AnalyticsWorker(
+            probes.analytics_queue, writer,
+            EventDetector(exit_after=args.analytics_exit_frames, labels=load_labels(pgie_config)),
+            metrics=metrics, event_sources=[zone_engine] if zone_engine else ()).start()
+        source_manager.on_removed.append(analytics_worker.drop_source)
+        # Yeniden baslayan bin kare sayisina 0'dan baslar: eski nesnelerin cikis olaylari simdi yazilir
+        source_manager.on_restarted.append(analytics_worker.drop_source)
+        print(f"Analytics events: {args.analytics_dir} ({args.analytics_format})")
+
+    # --- INSTANCE MASK CIKTISI (RLE / polygon) ---
+    mask_exporter = None
+    if args.mask_dir:
+        threshold = float(load_pgie_config(pgie_config).get("segmentation-threshold", SEGMENTATION_THRESHOLD))
+        writer_class = ParquetWriter if args.analytics_format == "parquet" else JsonlWriter
+        mask_exporter = MaskExporter(
+            MaskExtractor(pyds, threshold),
+            writer_class(args.mask_dir, prefix="masks", max_bytes=args.analytics_rotate_mb * 1024 * 1024),
+            encoding=args.mask_format, metrics=metrics).start()
+        probes.mask_exporter = mask_exporter
+        print(f"Instance masks: {args.mask_dir} ({args.mask_format})")
+
+    metrics_server = None
+    if args.metrics_port > 0:
+        metrics_server = MetricsServer(metrics, host=args.metrics_host, port=args.metrics_port).start()
+        print(f"Metrics: http://{args.metrics_host}:{metrics_server.port}/metrics")
+    if args.perf_interval > 0:
+        GLib.timeout_add_seconds(args.perf_interval, metrics.perf_print_callback)
+    if queue_policy.queues:
+        GLib.timeout_add(args.queue_sample_ms, queue_policy.sample)
+
+    # --- CIKIS (SINK) DALLARI ---
+    # Tee -> Queue -> ... -> Sink (display / fake / file / rtsp)
+    output_settings = load_output_settings(args.config)
+    sink_builder = SinkBuilder(pipeline, tee_global, output_settings, is_tegra=IS_TEGRA)
+    for mode in args.sink or ["display"]:
+        if not sink_builder.add(mode):
+            sys.stderr.write(f"Failed to create {mode} sink branch\n")
+            return -1
+
+    # --- LATENCY TRACING (opsiyonel) ---
+    tracer = None
+    if args.trace_latency:
+        # Uctan uca sure karenin muxer'a varisindan baslar (batch bekleme dahil)
+        tracer = LatencyTracer(
+            chain,
+            source_fn=batch_pad_indices,
+            frames_fn=batch_frame_pts,
+            output=args.trace_output,
+        )
+        tracer.attach()
+        if args.trace_interval > 0:
+            GLib.timeout_add_seconds(args.trace_interval, tracer.dump_callback)
+
+    # --- ADAPTIF INFERENCE INTERVAL / YUK ATMA ---
+    control_loop = None
+    if args.adaptive_interval:
+        shedder = SourceShedder()
+        nominal_fps = NominalFps()
+        for index, (_, source_bin) in source_manager.sources.items():
+            shedder.attach(index, source_bin)
+            nominal_fps.attach(index, source_bin)
+        source_manager.on_added.append(shedder.attach)
+        source_manager.on_added.append(nominal_fps.attach)
+        source_manager.on_removed.append(nominal_fps.drop_source)
+        # Hedef her kaynagin kendi FPS'ine gore (--target-fps verilirse mutlak)
+        controller = IntervalController(args.target_fps or None, args.target_latency_ms or None,
+                                        max_interval=args.max_interval, target_ratio=args.target_fps_ratio,
+                                        nominal_fps=nominal_fps.get)
+        # Hareket kapisi karelerin cogunu bilerek atar: hiz kapi oncesinden olculur
+        if motion_gate:
+            stream_fps = motion_gate.arrival_fps
+        else:
+            stream_fps = lambda index: metrics.stream(index).snapshot()["fps"]
+        control_loop = LoadControlLoop(
+            controller, pgie,
+            fps_source=lambda: {index: stream_fps(index) for index in source_manager.list_sources()},
+            latency_source=tracer.recent_quantile if tracer else None,
+            shedder=shedder, metrics=metrics)
+        source_manager.on_removed.append(control_loop.drop_source)
+        GLib.timeout_add_seconds(2, control_loop.tick)
+
+    # --- MODEL DEGISIMI (kaynaklar kopmadan pgie degistirilir) ---
+    # Yeni engine arka planda hazirlanir, eleman buffer sinirinda degistirilir
+    engine_cache = EngineCache(args.engine_cache) if args.engine_cache else None
+
+    def on_model_swapped(old, new, config_path):
+        nonlocal pgie
+        pgie = new
+        attach_pgie_probes(new)
+        if tracer:
+            tracer.replace_element(old, new)
+        if control_loop:
+            control_loop.pgie = new
+            new.set_property("interval", control_loop.controller.interval)
+        labels = load_labels(config_path)
+        render_styles.set_labels(labels)
+        if zone_engine:
+            zone_engine.labels = labels
+        if analytics_worker:
+            analytics_worker.detector.labels = labels
+
+    model_swapper = ModelSwapper(
+        pipeline, pgie, functools.partial(make_pgie, batch_size=batch_size),
+        prepare=(lambda path: ensure_engine(path, engine_cache, batch_size)) if engine_cache else None,
+        on_swapped=[on_model_swapped], config_path=pgie_config, metrics=metrics)
+    if args.swap_model:
+        GLib.timeout_add_seconds(args.swap_after, lambda: model_swapper.swap(args.swap_model) and False)
+
+    # --- KAYNAK WATCHDOG ---
+    # Hata / EOS / donma durumunda sadece ilgili kaynagi yeniden baslatir
+    watchdog = None
+    if args.reconnect:
+        if motion_gate:
+            last_frame_time = motion_gate.last_arrival
+        else:
+            last_frame_time = lambda index: metrics.stream(index).last_time
+        watchdog = SourceWatchdog(source_manager, last_frame_time,
+                                  metrics=metrics, stall_timeout=args.stall_timeout)
 
     # --- BUS HANDLER ---
     bus = pipeline.get_bus()
     bus.add_signal_watch()
-    bus.connect("message", bus_call, loop)
+    bus.connect("message", bus_call, loop, watchdog)
+    # Dosya sonu EOS'u ile biten calismada kapanista tekrar EOS beklenmez
+    shutdown = {"eos": False}
+    bus.connect("message::eos", lambda bus, message: shutdown.update(eos=True))
+    if args.dot_dump:
+        bus.connect("message::state-changed", dump_pipeline_graph, pipeline, "pipeline_graph")
+    if profiler:
+        profiler.watch_inference(pgie, bus)
+        profiler.mark("pipeline_setup")
 
     # --- CALISTIRMA ---
-    sys.stdout.write(f"Now playing: {sources}\n")
+    sys.stdout.write(f"Now playing: {list(source_manager.list_sources().values())}\n")
     pipeline.set_state(Gst.State.PLAYING)
+    if profiler:
+        profiler.arm(args.profile_deadline)
 
+    if watchdog:
+        watchdog.start()
 
-    try:
-        # Pipeline'in tam oturmasi icin 1 saniye nefes aldiriyoruz
-        time.sleep(1)
-
-        Gst.debug_bin_to_dot_file(
-            pipeline,
-            Gst.DebugGraphDetails.ALL,
-            "pipeline_graph"
-        )
-        print(f"GRAFIK KAYDEDILDI: {os.getcwd()}/pipeline_graph.dot")
-    except Exception as e:
-        print(f"Grafik hatasi: {e}")
+    # Calisma sirasinda kaynak ekleme / cikarma
+    if media_watcher:
+        media_watcher.start()
+    control_server = None
+    if args.control_socket:
+        control_server = SourceControlServer(source_manager, args.control_socket,
+                                             model_swapper=model_swapper).start()
+        print(f"Source control socket: {args.control_socket}")
 
     sys.stdout.write("Running...\n")
     try:
@@ -267,17 +418,130 @@ def main(args):
         pass
 
     sys.stdout.write("Exiting...\n")
-    pipeline.set_state(Gst.State.NULL)
+    # Tum kilometre taslari gelmeden cikildiysa rapor eksiklerle yazilir
+    if profiler:
+        profiler.finish()
+    # Watchdog kapanis EOS'unu yutup kaynagi yeniden baslatmasin
+    if watchdog:
+        watchdog.stop()
+    stop_pipeline(pipeline, timeout=args.shutdown_timeout, eos_received=shutdown["eos"])
+    if tracer:
+        tracer.dump()
+    if motion_gate:
+        print(f"Motion gate skipped {motion_gate.skip_ratio() * 100.0:.1f}% of frames")
+    if analytics_worker:
+        analytics_worker.stop()
+    if mask_exporter:
+        mask_exporter.stop()
+    if heatmap_snapshotter:
+        heatmap_snapshotter.stop()
+    if snapshot_capture:
+        snapshot_capture.stop()
+        print(f"Snapshots saved: {snapshot_capture.saved}, dropped: {sum(snapshot_capture.dropped.values())}")
+    if trace_recorder:
+        trace_recorder.close()
+    if not args.no_platform_cache:
+        save_platform_info(platform_cache_file)
+    if metrics_server:
+        metrics_server.stop()
+    if control_server:
+        control_server.stop()
     return 0
 
 
 
 def parse_args():
     parser = argparse.ArgumentParser()
-    parser.add_argument("--source", action="append", required=True, help="RTSP URI or File path")
-    parser.add_argument("--batch-size", type=int, default=0)
-    parser.add_argument("--mux-width", type=int, default=1920)
-    parser.add_argument("--mux-height", type=int, default=1080)
+    parser.add_argument("--source", action="append", help="RTSP URI or File path")
+    parser.add_argument("--max-sources", type=int, default=0, help="Source slots for runtime add (tiler size)")
+    parser.add_argument("--media", default=media_conf_file, help="media.ini with [MediaSettings-N] sources")
+    parser.add_argument("--watch-media", action="store_true", help="Load and follow sources from --media")
+    parser.add_argument("--control-socket", default=None, help="UNIX socket for add/remove/list commands")
+    parser.add_argument("--batch-size", type=int, default=0,
+                        help="Muxer / nvinfer batch size (default: config batch_size, else the source count)")
+    parser.add_argument("--mux-width", type=int, default=0, help="Muxer output width (default: config, 1920)")
+    parser.add_argument("--mux-height", type=int, default=0, help="Muxer output height (default: config, 1080)")
+    parser.add_argument("--pgie-config", default=None,
+                        help="nvinfer config (default: config pgie_config_file, else " + pgie_conf_file + ")")
+    parser.add_argument("--sink", action="append", choices=SINK_MODES,
+                        help="Output branch, can be repeated (default: display)")
+    parser.add_argument("--config", default=app_conf_file,
+                        help="Python app config (output, muxer timeout and [Queue-<stage>] settings)")
+    parser.add_argument("--max-frame-age-ms", type=float, default=None,
+                        help="Drop live frames older than this before inference (default: config, 0: off)")
+    parser.add_argument("--motion-gate", action="store_true",
+                        help="Skip inference of frames that did not change (static scenes); skipped frames "
+                             "are also missing from the OSD output, recordings and PGIE stream metrics")
+    parser.add_argument("--motion-threshold", type=float, default=0.005,
+                        help="Changed pixel fraction that counts as motion")
+    parser.add_argument("--motion-pixel-delta", type=int, default=12, help="Gray level change of a changed pixel")
+    parser.add_argument("--motion-refresh", type=int, default=30,
+                        help="Infer at least every N frames")
+    parser.add_argument("--motion-hold", type=int, default=5, help="Frames still inferred after motion stops")
+    parser.add_argument("--queue-sample-ms", type=int, default=1000, help="Queue fill level sampling period")
+    parser.add_argument("--reconnect", action="store_true",
+                        help="Restart failing/stalled sources with backoff instead of exiting")
+    parser.add_argument("--shutdown-timeout", type=float, default=5.0,
+                        help="Seconds to wait for EOS to drain the pipeline on exit")
+    parser.add_argument("--stall-timeout", type=float, default=10.0, help="Seconds without frames before restart")
+    parser.add_argument("--adaptive-interval", action="store_true",
+                        help="Adjust nvinfer interval / shed sources to meet the targets")
+    parser.add_argument("--target-fps", type=float, default=0,
+                        help="Absolute per-stream FPS target (0: --target-fps-ratio of each source's nominal FPS)")
+    parser.add_argument("--target-fps-ratio", type=float, default=0.9,
+                        help="Per-stream FPS target as a fraction of the framerate in the source caps")
+    parser.add_argument("--target-latency-ms", type=float, default=0,
+                        help="End-to-end latency target, needs --trace-latency (0: FPS only)")
+    parser.add_argument("--max-interval", type=int, default=4, help="Upper bound for nvinfer interval")
+    parser.add_argument("--engine-cache", default=None,
+                        help="TensorRT engine cache directory; builds/selects the engine for --batch-size")
+    parser.add_argument("--swap-model", default=None,
+                        help="PGIE config to hot-swap to after --swap-after seconds (also: 'model <config>' "
+                             "on the control socket)")
+    parser.add_argument("--swap-after", type=int, default=60, help="Seconds before the --swap-model swap")
+    parser.add_argument("--analytics-dir", default=None, help="Write enter/exit events to this directory")
+    parser.add_argument("--analytics-format", choices=["jsonl", "parquet"], default="jsonl")
+    parser.add_argument("--analytics-rotate-mb", type=int, default=64, help="Rotate event files at this size")
+    parser.add_argument("--analytics-exit-frames", type=int, default=30,
+                        help="Frames an object must be missing before its exit event")
+    parser.add_argument("--zones", default=None,
+                        help="Zone / line rules ([Zone-<name>], [Line-<name>] per source), e.g. " + zones_conf_file)
+    parser.add_argument("--roi-only", action="store_true",
+                        help="Remove objects outside the roi zones of their source before OSD")
+    parser.add_argument("--heatmap-dir", default=None, help="Write per-source occupancy heatmaps to this directory")
+    parser.add_argument("--heatmap-format", choices=["npz", "png", "npz+png"], default="npz")
+    parser.add_argument("--heatmap-cell", type=int, default=16, help="Heatmap cell size in muxer pixels")
+    parser.add_argument("--heatmap-half-life", type=float, default=0,
+                        help="Decay half-life in frames of a source (0: no decay)")
+    parser.add_argument("--heatmap-interval", type=float, default=60.0, help="Snapshot interval in seconds")
+    parser.add_argument("--heatmap-keep", type=int, default=0, help="Timestamped snapshots kept per source")
+    parser.add_argument("--snapshot-dir", default=None,
+                        help="Save JPEG crops of objects that trigger zone / line events to this directory")
+    parser.add_argument("--snapshot-rate", type=float, default=1.0, help="Snapshots per second per source")
+    parser.add_argument("--snapshot-burst", type=int, default=5, help="Snapshot burst per source")
+    parser.add_argument("--snapshot-object-interval", type=float, default=10.0,
+                        help="Minimum seconds between snapshots of the same object")
+    parser.add_argument("--snapshot-budget-mb", type=int, default=64, help="Memory for crops waiting to be encoded")
+    parser.add_argument("--snapshot-workers", type=int, default=2, help="JPEG encode threads")
+    parser.add_argument("--snapshot-quality", type=int, default=85, help="JPEG quality")
+    parser.add_argument("--mask-dir", default=None, help="Write per-object instance masks to this directory")
+    parser.add_argument("--mask-format", choices=["rle", "polygon"], default="rle")
+    parser.add_argument("--record-trace", default=None, help="Record batch metadata as the analytics probe sees it (muxer coordinates) to this trace file")
+    parser.add_argument("--record-masks", action="store_true", help="Include instance masks (RLE) in the trace")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Print a start-up phase breakdown up to the first inference")
+    parser.add_argument("--profile-output", default=None, help="JSON file for the start-up profile")
+    parser.add_argument("--profile-deadline", type=float, default=60.0,
+                        help="Seconds after PLAYING to report the start-up profile with missing milestones")
+    parser.add_argument("--dot-dump", action="store_true", help="Write pipeline_graph.dot once PLAYING")
+    parser.add_argument("--no-platform-cache", action="store_true",
+                        help="Do not read/write the platform detection cache")
+    parser.add_argument("--metrics-port", type=int, default=0, help="Prometheus endpoint port (0: disabled)")
+    parser.add_argument("--metrics-host", default="127.0.0.1")
+    parser.add_argument("--perf-interval", type=int, default=5, help="FPS print interval in seconds (0: off)")
+    parser.add_argument("--trace-latency", action="store_true", help="Per-element latency tracing")
+    parser.add_argument("--trace-output", default=None, help="JSON file for latency histograms")
+    parser.add_argument("--trace-interval", type=int, default=10, help="Dump interval in seconds (0: on exit)")
     return parser.parse_args()
 
 
@@ -0,0 +1,91 @@
+"""Runs the media.ini sources as N sharded ds-segmentation.py worker processes.
+
+Each worker is its own pipeline, GLib loop and GIL. Arguments after "--"
+are passed to every worker:
+
+    python3 ds-supervisor.py --workers 4 --policy resolution --metrics-port 9108 -- --sink fake --reconnect
+"""
+import argparse
+import os
+import signal
+import sys
+import time
+
+from common.analytics import JsonlWriter
+from common.media_config import load_media_entries
+from common.metrics import MetricsServer
+from common.supervisor import SHARD_POLICIES, DeepStreamWorker, Supervisor
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+media_conf_file = os.path.join(base_dir, "config/python_app/media.ini")
+worker_script = os.path.join(base_dir, "ds-segmentation.py")
+
+
+def parse_args(argv):
+    if "--" in argv:
+        split = argv.index("--")
+        argv, worker_args = argv[:split], argv[split + 1:]
+    else:
+        worker_args = []
+    parser = argparse.ArgumentParser(description="Sharding supervisor for ds-segmentation.py workers")
+    parser.add_argument("--media", default=media_conf_file, help="media.ini with [MediaSettings-N] sources")
+    parser.add_argument("--workers", type=int, default=2, help="Number of worker pipelines")
+    parser.add_argument("--policy", choices=SHARD_POLICIES, default="round-robin")
+    parser.add_argument("--gpus", default="0", help="Comma separated GPU ids; worker i uses gpus[i %% n]")
+    parser.add_argument("--worker-script", default=worker_script,
+                        help="Worker entry point (scripts/stand_in_worker.py for CPU-only tests)")
+    parser.add_argument("--base-port", type=int, default=9200, help="Worker i serves metrics on base-port + i")
+    parser.add_argument("--metrics-port", type=int, default=0, help="Merged Prometheus endpoint (0: disabled)")
+    parser.add_argument("--metrics-host", default="127.0.0.1")
+    parser.add_argument("--run-dir", default="supervisor_run", help="Per-worker event directories")
+    parser.add_argument("--events-dir", default=None, help="Merged JSONL event stream directory")
+    parser.add_argument("--watch-interval", type=float, default=5.0,
+                        help="Seconds between media.ini checks (0: no rebalancing)")
+    args = parser.parse_args(argv)
+    args.worker_args = worker_args
+    return args
+
+
+def main(args):
+    gpus = [int(gpu) for gpu in args.gpus.split(",") if gpu.strip()]
+    supervisor = Supervisor(
+        lambda: load_media_entries(args.media),
+        DeepStreamWorker(args.worker_script, args.worker_args),
+        args.workers, policy=args.policy, gpus=gpus, base_port=args.base_port, run_dir=args.run_dir,
+        events_writer=JsonlWriter(args.events_dir, prefix="merged-events") if args.events_dir else None)
+
+    stopping = []
+    signal.signal(signal.SIGINT, lambda *_: stopping.append(True))
+    signal.signal(signal.SIGTERM, lambda *_: stopping.append(True))
+
+    supervisor.start()
+    if not supervisor.states:
+        sys.stderr.write("No enabled sources in %s\n" % args.media)
+    metrics_server = None
+    if args.metrics_port > 0:
+        metrics_server = MetricsServer(supervisor, host=args.metrics_host, port=args.metrics_port).start()
+        print(f"Merged metrics: http://{args.metrics_host}:{metrics_server.port}/metrics")
+
+    media_mtime = os.path.getmtime(args.media) if os.path.exists(args.media) else None
+    last_check = time.monotonic()
+    while not stopping:
+        time.sleep(0.5)
+        supervisor.check()
+        supervisor.merge_events()
+        if args.watch_interval and time.monotonic() - last_check >= args.watch_interval:
+            last_check = time.monotonic()
+            mtime = os.path.getmtime(args.media) if os.path.exists(args.media) else None
+            if mtime != media_mtime:
+                media_mtime = mtime
+                changed = supervisor.reload()
+                print(f"media.ini changed, restarted workers: {changed}")
+
+    sys.stdout.write("Stopping workers...\n")
+    supervisor.stop()
+    if metrics_server:
+        metrics_server.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(parse_args(sys.argv[1:])))
@@ -1,25 +1,102 @@
+import time
+from collections import deque
+
 import pyds
 import gi
+import numpy as np
 
 gi.require_version('Gst', '1.0')
 from gi.repository import Gst
-from collections import defaultdict
 
-object_trackers = defaultdict(lambda: defaultdict(list))
-last_seen = defaultdict(lambda: defaultdict(int))
+from common.trail_store import TrailStore, FRAME_EXPIRATION_LIMIT, TRAIL_LENGTH
+from common.display_packer import DisplayMetaPacker
+from common.batch_columns import BatchMetaExtractor
+from common.iou_tracker import IouTracker
+
+# Trail'i nokta yerine cizgi olarak cizmek icin True yapin
+TRAIL_AS_POLYLINE = False
+
+trail_store = TrailStore(trail_length=TRAIL_LENGTH, expiration=FRAME_EXPIRATION_LIMIT)
+display_packer = DisplayMetaPacker(pyds, polyline=TRAIL_AS_POLYLINE)
+batch_extractor = BatchMetaExtractor(pyds)
+# OSD probe'unun kendi kolonlari (analytics probe'unun kolonlari uzerine yazilmasin)
+osd_extractor = BatchMetaExtractor(pyds)
+# Pipeline'da nvtracker yok; kalici ID'ler icin hafif IOU tracker.
+# nvtracker eklenirse None yapin.
+iou_tracker = IouTracker()
+# common.analytics.AnalyticsQueue; None ise analitik kapali
+analytics_queue = None
+# common.mask_export.MaskExporter; None ise maske ciktisi kapali
+mask_exporter = None
+# common.zones.ZoneEngine; None ise bolge / cizgi kurallari kapali
+zone_engine = None
+# common.heatmap.HeatmapAccumulator; None ise isi haritasi kapali
+heatmap = None
+# common.tile_layout.TileLayout; trail noktalarini muxer'dan OSD'nin karo koordinatina cevirir
+tile_layout = None
+# common.snapshots.SnapshotCapture; None ise kural olaylarinda kesit kaydi kapali
+snapshot_capture = None
+# (pad_index, removed): main loop'tan gelen silmeler, streaming thread'inde analytics probe'unun basinda uygulanir
+pending_drops = deque()
+
+
+def purge_old_objects(pad_index, current_frame_num):
+    # Sadece bu karede suresi dolan nesnelere dokunulur
+    return trail_store.expire(pad_index, current_frame_num)
+
+
+def drop_source_state(pad_index):
+    """SourceManager.on_removed callback: forget the per-stream probe state of a removed source.
+
+    Callable from any thread; the state is only touched by the streaming
+    thread, so the drop is queued and applied by apply_pending_drops().
+    """
+    pending_drops.append((pad_index, True))
+
+
+def restart_source_state(pad_index):
+    """SourceManager.on_restarted callback: like drop_source_state, but the heatmap is kept."""
+    pending_drops.append((pad_index, False))
+
+
+def apply_pending_drops():
+    """Apply queued source drops; runs at the start of the analytics probe (or with the pipeline stopped)."""
+    while pending_drops:
+        pad_index, removed = pending_drops.popleft()
+        trail_store.drop_source(pad_index)
+        if iou_tracker is not None:
+            iou_tracker.drop_source(pad_index)
+        if zone_engine is not None:
+            zone_engine.drop_source(pad_index)
+        if removed and heatmap is not None:
+            heatmap.drop_source(pad_index)
+
+
+def _batch_frame_metas(gst_buffer):
+    batch_meta = pyds.gst_buffer_get_nvds_batch_meta(hash(gst_buffer))
+    if not batch_meta:
+        return
+    l_frame = batch_meta.frame_meta_list
+    while l_frame is not None:
+        try:
+            frame_meta = pyds.NvDsFrameMeta.cast(l_frame.data)
+        except StopIteration:
+            break
+        yield frame_meta
+        try:
+            l_frame = l_frame.next
+        except StopIteration:
+            break
+
 
-FRAME_EXPIRATION_LIMIT = 60
+def batch_pad_indices(gst_buffer):
+    """Return the pad_index of every frame in a batched buffer."""
+    return [frame_meta.pad_index for frame_meta in _batch_frame_metas(gst_buffer)]
 
 
-def purge_old_objects(current_frame_num):
-    for pad_index, objects in list(object_trackers.items()):
-        for object_id in list(objects.keys()):
-            if current_frame_num - last_seen[pad_index][object_id] > FRAME_EXPIRATION_LIMIT:
-                del object_trackers[pad_index][object_id]
-                del last_seen[pad_index][object_id]
-            else:
-                if len(object_trackers[pad_index][object_id]) > 25:
-                    object_trackers[pad_index][object_id] = object_trackers[pad_index][object_id][-25:]
+def batch_frame_pts(gst_buffer):
+    """Return (pad_index, buf_pts) of every frame in a batched buffer: the PTS the frame had at the muxer input."""
+    return [(frame_meta.pad_index, frame_meta.buf_pts) for frame_meta in _batch_frame_metas(gst_buffer)]
 
 
 # Function for probe to extract metadata
@@ -65,38 +142,165 @@ def sink_pad_buffer_probe(pad, info, u_data, perf_data):
     return Gst.PadProbeReturn.OK
 
 
-def osd_sink_pad_buffer_probe(pad, info, u_data, dynamic_labels, number_sources):
+def metrics_sink_pad_buffer_probe(pad, info, u_data, registry):
+    """Feed per-stream frame arrivals into a common.metrics.MetricsRegistry."""
     gst_buffer = info.get_buffer()
     if not gst_buffer:
-        print("Unable to get GstBuffer ")
         return Gst.PadProbeReturn.OK
 
+    now = time.monotonic()
     batch_meta = pyds.gst_buffer_get_nvds_batch_meta(hash(gst_buffer))
     l_frame = batch_meta.frame_meta_list
-
     while l_frame is not None:
         try:
             frame_meta = pyds.NvDsFrameMeta.cast(l_frame.data)
         except StopIteration:
             break
 
-        pad_index = frame_meta.pad_index
-        frame_number = frame_meta.frame_num
-        l_obj = frame_meta.obj_meta_list
+        registry.stream(frame_meta.pad_index).frame(frame_meta.frame_num, now)
 
-        display_meta = pyds.nvds_acquire_display_meta_from_pool(batch_meta)
+        try:
+            l_frame = l_frame.next
+        except StopIteration:
+            break
 
-        while l_obj is not None:
-            try:
-                obj_meta = pyds.NvDsObjectMeta.cast(l_obj.data)
-            except StopIteration:
-                break
+    return Gst.PadProbeReturn.OK
+
+
+def trace_record_probe(pad, info, u_data, recorder):
+    """Append the batch metadata to a common.meta_trace.TraceRecorder."""
+    gst_buffer = info.get_buffer()
+    if not gst_buffer:
+        return Gst.PadProbeReturn.OK
 
-            object_id = obj_meta.object_id
-            class_id = obj_meta.class_id
+    batch_meta = pyds.gst_buffer_get_nvds_batch_meta(hash(gst_buffer))
+    if batch_meta:
+        recorder.record(batch_meta)
+    return Gst.PadProbeReturn.OK
 
-            # Renk ayari
-            color = dynamic_labels.get(class_id)
+
+def analytics_pad_buffer_probe(pad, info, u_data):
+    """Tracking, trails, rules, heatmap and snapshots of a batch, before the tiler.
+
+    Runs on the muxer frames (tiler sink pad), so boxes are in the pixels
+    of their source and snapshot crops come from the source frame itself.
+    Tracker ids are written into the object meta and ROI-outside objects
+    are removed here; the OSD probe after the tiler only renders.
+    """
+    gst_buffer = info.get_buffer()
+    if not gst_buffer:
+        print("Unable to get GstBuffer ")
+        return Gst.PadProbeReturn.OK
+
+    # Cikarilan / yeniden baslayan kaynaklarin durumu bu thread'de silinir (main loop ile yarismaz)
+    if pending_drops:
+        apply_pending_drops()
+
+    batch_meta = pyds.gst_buffer_get_nvds_batch_meta(hash(gst_buffer))
+
+    # Tum batch metadata'sini tek seferde kolonlara cikar
+    columns = batch_extractor.extract(batch_meta)
+
+    # Izi surmek icin alt orta nokta (kaynagin muxer koordinati)
+    anchor_x, anchor_y = columns.bottom_center()
+    # Trail noktalari OSD'nin cizdigi karo koordinatinda saklanir
+    if tile_layout is not None:
+        trail_x, trail_y = tile_layout.to_tile(columns.pad_index, anchor_x, anchor_y)
+    else:
+        trail_x, trail_y = anchor_x, anchor_y
+
+    # Kalici ID atamasi ve trail noktalari, kurallardan once tum batch icin
+    trail_slots = np.empty(columns.num_objects, dtype=np.int64)
+    for frame_idx in range(columns.num_frames):
+        pad_index = int(columns.frame_pad_index[frame_idx])
+        frame_number = int(columns.frame_frame_num[frame_idx])
+        rows = columns.frame_slice(frame_idx)
+        if iou_tracker is not None:
+            columns.object_id[rows] = iou_tracker.update(pad_index, columns.rect[rows], columns.class_id[rows])
+        trail_slots[rows] = trail_store.append_many(pad_index, columns.object_id[rows], frame_number,
+                                                    trail_x[rows], trail_y[rows])
+        purge_old_objects(pad_index, frame_number)
+
+    # ID'ler meta'ya yazilir: OSD probe'u ve sonraki elemanlar ayni ID'yi gorur
+    if iou_tracker is not None:
+        for obj_meta, object_id in zip(columns.objects, columns.object_id.tolist()):
+            obj_meta.object_id = object_id
+
+    # Isi haritasi: trail ile ayni alt orta noktalar, batch tek scatter-add
+    if heatmap is not None:
+        heatmap.add(columns, anchor_x, anchor_y)
+
+    # Bolge / cizgi kurallari (batch tek seferde); ROI disindaki nesneler cizilmez
+    keep = None
+    if zone_engine is not None:
+        keep = zone_engine.process(columns, anchor_x, anchor_y, trail_slots, trail_store)
+        # Kesit kaynagin kendi karesinden (batch_id) ve muxer koordinatindaki kutudan alinir
+        if snapshot_capture is not None:
+            for i, event in zone_engine.batch_events:
+                frame_meta = columns.frames[columns.frame_row[i]]
+                snapshot_capture.request((hash(gst_buffer), frame_meta.batch_id), int(columns.pad_index[i]),
+                                         int(frame_meta.frame_num), int(columns.object_id[i]),
+                                         int(columns.class_id[i]), columns.rect[i].tolist(), reason=event["type"])
+
+    # Olaylar worker thread'de uretilir; burada sadece kolonlar kopyalanir
+    if analytics_queue is not None:
+        analytics_queue.put_columns(columns)
+    if mask_exporter is not None:
+        mask_exporter.put(columns)
+    # ROI disi nesneler en son cikarilir: tiler / nvdsosd onlarin kutu / maskesini gormez
+    if keep is not None:
+        for i in np.flatnonzero(~keep).tolist():
+            pyds.nvds_remove_obj_meta_from_frame(columns.frames[columns.frame_row[i]], columns.objects[i])
+
+    return Gst.PadProbeReturn.OK
+
+
+def osd_sink_pad_buffer_probe(pad, info, u_data, render_styles):
+    gst_buffer = info.get_buffer()
+    if not gst_buffer:
+        print("Unable to get GstBuffer ")
+        return Gst.PadProbeReturn.OK
+
+    batch_meta = pyds.gst_buffer_get_nvds_batch_meta(hash(gst_buffer))
+
+    # Tum batch metadata'sini tek seferde kolonlara cikar (ID'ler analytics probe'undan)
+    columns = osd_extractor.extract(batch_meta)
+
+    # KOORDINATLARI DETECTOR'DAN ALMA
+    # pipeline'da tracker olmadigi icin tracker_bbox_info bos doner.
+    # Bu yuzden rect_params kullaniyoruz.
+    rect = columns.rect_int()
+
+    # Merkez Nokta Hesabi
+    center_x, center_y = columns.center()
+
+    # YAZIYI ORTALAMA
+    # Yaziyi tam merkeze koyuyoruz, ekrandan tasmayi onle
+    text_x = np.maximum(center_x - 20, 1).tolist()
+    text_y = np.maximum(center_y - 10, 1).tolist()
+
+    # Stil batch basina bir kez okunur: model degisimi / kaynak ekleme yeni bir nesne yayinlar
+    style = render_styles.style
+    class_ids = columns.class_id.tolist()
+    object_ids = columns.object_id.tolist()
+    if class_ids and max(class_ids) >= len(style.labels):
+        style = render_styles.ensure_class(max(class_ids))
+    labels = style.labels
+    text_bg = style.text_bg
+    trail_color = style.trail_color
+
+    # Font boyutu nesne boyutuna gore dinamik (tablodan)
+    font_size = style.font_sizes(rect[:, 3]).tolist()
+
+    for frame_idx, frame_meta in enumerate(columns.frames):
+        pad_index = int(columns.frame_pad_index[frame_idx])
+        rows = columns.frame_slice(frame_idx)
+
+        display_packer.begin(batch_meta, frame_meta)
+
+        for i in range(rows.start, rows.stop):
+            obj_meta = columns.objects[i]
+            class_id = class_ids[i]
 
             # BOUNDING BOX GIZLEME
             obj_rect = obj_meta.rect_params
@@ -105,94 +309,30 @@ def osd_sink_pad_buffer_probe(pad, info, u_data, dynamic_labels, number_sources)
             # Arka plan rengini tamamen seffaf yapiyoruz
             obj_rect.has_bg_color = 0
 
-            # KOORDINATLARI DETECTOR'DAN ALMA
-            # pipeline'da tracker olmadigi icin tracker_bbox_info bos doner.
-            # Bu yuzden rect_params kullaniyoruz.
-            obj_coords_x = int(obj_rect.left)
-            obj_coords_y = int(obj_rect.top)
-            obj_coords_w = int(obj_rect.width)
-            obj_coords_h = int(obj_rect.height)
-
-            # Merkez Nokta Hesabi
-            center_x = obj_coords_x + (obj_coords_w // 2)
-            center_y = obj_coords_y + (obj_coords_h // 2)
-
-            # Izi surmek icin alt orta nokta (Trail icin)
-            bottom_center_x = int(obj_coords_x + obj_coords_w / 2)
-            bottom_center_y = int(obj_coords_y + obj_coords_h)
-
-            # Trail (Iz) Mantigi (Tracker olmadigi icin object_id surekli degisebilir,
-            # ama kodun yapisini bozmamak icin birakiyorum)
-            object_trackers[pad_index][object_id].append((bottom_center_x, bottom_center_y))
-            last_seen[pad_index][object_id] = frame_number
-
-            if len(object_trackers[pad_index][object_id]) > 20:
-                object_trackers[pad_index][object_id].pop(0)
-
-            # YAZIYI ORTALAMA
-            # Yaziyi tam merkeze koyuyoruz.
-            text_x = center_x - 20
-            text_y = center_y - 10
-
-            # Ekrandan tasmayi onle
-            if text_x < 1: text_x = 1
-            if text_y < 1: text_y = 1
-
-            # Font buyuklugu hesaplama
-            min_fsize = 8
-            max_fsize = 12
-            if number_sources > 1:
-                max_fsize = max(min_fsize, max_fsize - (number_sources - 1))
-
-            # Font boyutu nesne boyutuna gore dinamik
-            font_size = min_fsize + (max_fsize - min_fsize) * (obj_coords_h / 100)
-            font_size = max(min_fsize, min(max_fsize, int(font_size)))
-
             # Yazi Ayarlari
             text_params = obj_meta.text_params
-            text_params.display_text = f"{pyds.get_string(text_params.display_text).capitalize()}"
-            text_params.x_offset = int(text_x)
-            text_params.y_offset = int(text_y)
+            label = labels[class_id]
+            if label is None:
+                # Label dosyasinda olmayan sinif: nvinfer'in yazdigi metni kullan
+                label = pyds.get_string(text_params.display_text).capitalize()
+            text_params.display_text = label
+            text_params.x_offset = text_x[i]
+            text_params.y_offset = text_y[i]
 
             # Yazi Stili
             text_params.font_params.font_name = "Serif"
-            text_params.font_params.font_size = int(font_size)
+            text_params.font_params.font_size = font_size[i]
             text_params.font_params.font_color.set(1.0, 1.0, 1.0, 1.0)  # Beyaz Yazi
             text_params.set_bg_clr = 1
             # Arka plani class rengi ile yari seffaf yapiyoruz
-            text_params.text_bg_clr.set(color.red, color.green, color.blue, 0.6)
+            text_params.text_bg_clr.set(*text_bg[class_id])
 
             # Trail (Kuyruk) Cizimi
-            trail = object_trackers[pad_index][object_id]
-            for i in range(len(trail) - 1):
-                x1, y1 = trail[i]
-                if x1 > 0 and y1 > 0:
-                    if i % 16 == 0:
-                        pyds.nvds_add_display_meta_to_frame(frame_meta, display_meta)
-                        display_meta = pyds.nvds_acquire_display_meta_from_pool(batch_meta)
-
-                    display_meta.num_circles += 1
-                    # Circle params indexi dogru yonetilmeli, basitlik icin sona ekliyoruz
-                    circle_idx = display_meta.num_circles - 1
-
-                    if circle_idx < 16:  # Max 16 daire cizilebilir bir meta paketinde
-                        py_nvosd_circle_params = display_meta.circle_params[circle_idx]
-                        py_nvosd_circle_params.circle_color.set(color.red, color.green, color.blue, 0.9)
-                        py_nvosd_circle_params.radius = 3
-                        py_nvosd_circle_params.xc = x1
-                        py_nvosd_circle_params.yc = y1
-
-            try:
-                l_obj = l_obj.next
-            except StopIteration:
-                break
-
-        pyds.nvds_add_display_meta_to_frame(frame_meta, display_meta)
-        purge_old_objects(frame_number)
+            # Noktalar kare bazinda toplanir, display meta'lar kare sonunda doldurulur
+            # (nokta modunda son nokta nesnenin uzerinde kalir; cizgi modunda son parca nesneye kadar uzanir)
+            trail = trail_store.get(pad_index, object_ids[i]).tolist()
+            display_packer.add_trail(trail if TRAIL_AS_POLYLINE else trail[:-1], trail_color[class_id])
 
-        try:
-            l_frame = l_frame.next
-        except StopIteration:
-            break
+        display_packer.flush()
 
     return Gst.PadProbeReturn.OK
@@ -0,0 +1,60 @@
+"""Build, pre-warm and inspect the TensorRT engine cache.
+
+    python3 scripts/engine_cache.py build -f yolo11m-seg.onnx -b 1 2 4 -n 640 -p fp16 -c config_pgie_yolo_seg.txt
+    python3 scripts/engine_cache.py list
+    python3 scripts/engine_cache.py evict --max-entries 4
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.engine_cache import ENGINE_CACHE_DIR, PRECISION_FLAGS, EngineCache, EngineSpec
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="TensorRT engine cache")
+    parser.add_argument("--cache-dir", default=ENGINE_CACHE_DIR)
+    parser.add_argument("--max-gb", type=float, default=20.0, help="Disk budget before LRU eviction")
+    parser.add_argument("--max-entries", type=int, default=16)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="Build (or reuse) engines; first batch size is published to -c")
+    build.add_argument("-f", "--file", required=True, help="ONNX file")
+    build.add_argument("-b", "--batch-size", type=int, nargs="+", default=[1])
+    build.add_argument("-n", "--network-size", type=int, default=640)
+    build.add_argument("-p", "--precision", choices=sorted(PRECISION_FLAGS), default="fp16")
+    build.add_argument("-c", "--config", default=None, help="PGIE config file to update")
+
+    commands.add_parser("list", help="List cached engines, least recently used first")
+    commands.add_parser("evict", help="Apply the disk budget now")
+    return parser.parse_args()
+
+
+def main(args):
+    cache = EngineCache(args.cache_dir, max_bytes=int(args.max_gb * 1024 ** 3), max_entries=args.max_entries)
+    if args.command == "build":
+        if not os.path.isfile(args.file):
+            sys.stderr.write("Error: The file '%s' does not exist.\n" % args.file)
+            return 1
+        specs = [EngineSpec(args.file, batch, args.network_size, args.precision) for batch in args.batch_size]
+        paths = cache.prewarm(specs)
+        for spec, path in zip(specs, paths):
+            print("batch %d: %s" % (spec.batch_size, path))
+        if args.config:
+            cache.publish_to_config(specs[0], args.config, paths[0])
+            print("Configuration file '%s' updated." % args.config)
+    elif args.command == "list":
+        for mtime, size, path in cache.entries():
+            meta = cache.metadata(path)
+            print("%8.1f MB  %s  %s" % (size / 1e6, os.path.basename(path), json.dumps(meta.get("fingerprint", {}))))
+    elif args.command == "evict":
+        for path in cache.evict():
+            print("evicted %s" % path)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(parse_args()))
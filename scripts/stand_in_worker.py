@@ -0,0 +1,79 @@
+"""CPU stand-in for a ds-segmentation.py worker, for testing the supervisor.
+
+Accepts the worker command line used by ds-supervisor.py, serves per-source
+FPS metrics and writes synthetic enter/exit events, without GPU or GStreamer:
+
+    python3 ds-supervisor.py --workers 2 --worker-script scripts/stand_in_worker.py -- --crash-after 20
+"""
+import argparse
+import os
+import random
+import signal
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.analytics import JsonlWriter
+from common.metrics import MetricsRegistry, MetricsServer
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Stand-in worker pipeline")
+    parser.add_argument("--source", action="append", default=[])
+    parser.add_argument("--metrics-port", type=int, default=0)
+    parser.add_argument("--metrics-host", default="127.0.0.1")
+    parser.add_argument("--analytics-dir", default=None)
+    parser.add_argument("--fps", type=float, default=25.0)
+    parser.add_argument("--crash-after", type=float, default=0, help="Exit with code 1 after N seconds (0: never)")
+    parser.add_argument("--seed", type=int, default=None)
+    # ds-segmentation.py secenekleri (--batch-size, --sink, ...) yok sayilir
+    args, _ = parser.parse_known_args()
+    return args
+
+
+def main(args):
+    rng = random.Random(args.seed)
+    metrics = MetricsRegistry()
+    server = MetricsServer(metrics, args.metrics_host, args.metrics_port).start() if args.metrics_port else None
+    writer = JsonlWriter(args.analytics_dir) if args.analytics_dir else None
+
+    stopping = []
+    signal.signal(signal.SIGINT, lambda *_: stopping.append(True))
+    signal.signal(signal.SIGTERM, lambda *_: stopping.append(True))
+
+    start = time.monotonic()
+    frame_num = 0
+    next_id = 1
+    live = {index: [] for index in range(len(args.source))}
+    while not stopping:
+        now = time.monotonic()
+        if args.crash_after and now - start > args.crash_after:
+            sys.stderr.write("stand-in worker: simulated crash\n")
+            return 1
+        records = []
+        for index in live:
+            metrics.stream(index).frame(frame_num, now)
+            if rng.random() < 0.05:
+                live[index].append(next_id)
+                records.append({"type": "enter", "ts": time.time(), "source": index, "frame": frame_num,
+                                "object_id": next_id, "class_id": 0, "label": "person"})
+                next_id += 1
+            if live[index] and rng.random() < 0.04:
+                object_id = live[index].pop(0)
+                records.append({"type": "exit", "ts": time.time(), "source": index, "frame": frame_num,
+                                "object_id": object_id, "class_id": 0, "label": "person"})
+        if writer:
+            writer.write(records)
+        frame_num += 1
+        time.sleep(1.0 / args.fps)
+
+    if writer:
+        writer.close()
+    if server:
+        server.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(parse_args()))
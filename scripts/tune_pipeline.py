@@ -0,0 +1,272 @@
+"""Sweep muxer batch size / batch timeout / resolution and engine precision, write a tuned config.
+
+Every setting runs for a fixed time after a warm-up; throughput,
+end-to-end latency percentiles and OSD probe time are recorded, the
+settings no other setting beats on both throughput and p95 latency
+(Pareto front) are reported and the best one within --max-latency-ms is
+written as a config.ini for ds-segmentation.py (--config):
+
+    python3 scripts/tune_pipeline.py --source rtsp://cam1/stream --source rtsp://cam2/stream \\
+        --batch-sizes 1,2,4 --timeouts-ms 4,16,33 --resolutions 1280x720,1920x1080 \\
+        --precisions fp16,qat --engine-cache ~/.cache/deepstream-yolo/engines --max-latency-ms 150
+
+The deepstream pipeline is the one ds-segmentation.py builds (source
+queues, frame age / motion gates, stage queues and tiler size of
+--config). End-to-end latency starts when a frame reaches the muxer, so
+the time it waits for its batch (the batched-push-timeout trade-off) is
+part of it.
+
+--pipeline stand-in runs the same sweep on a CPU pipeline (videotestsrc,
+compositor as muxer, identity as inference) without GPU or DeepStream.
+It checks the sweep, the measurements and the config output, not the
+choice: its cost model (a batch costs infer_ms * (1 + batch_cost *
+(batch - 1)), ceil(sources / batch) batches per frame) is cheaper per
+frame for every larger batch while batch_cost < 1, so the largest batch
+always wins on throughput.
+"""
+import argparse
+import functools
+import json
+import math
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import gi
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst
+
+from common.engine_cache import PRECISION_FLAGS, EngineCache, config_variant
+from common.media_config import is_live_uri
+from common.metrics import MetricsRegistry
+from common.tuning import (TrialPipeline, load_pipeline_settings, pareto_front, recommend, sweep, sweep_settings,
+                           write_tuned_config)
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PGIE_CONFIG = "/apps/deepstream-yolo-e2e/config/pgie/config_pgie_yolo_seg.txt"
+APP_CONFIG = os.path.join(APP_DIR, "config/python_app/config.ini")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Batch / muxer tuning sweep")
+    parser.add_argument("--pipeline", choices=["deepstream", "stand-in"], default="deepstream")
+    parser.add_argument("--source", action="append", default=[], help="Source URI (deepstream pipeline)")
+    parser.add_argument("--stand-in-sources", type=int, default=4, help="videotestsrc count (stand-in pipeline)")
+    parser.add_argument("--stand-in-fps", type=int, default=30)
+    parser.add_argument("--stand-in-infer-ms", type=float, default=8.0, help="Simulated batch-1 inference time")
+    parser.add_argument("--stand-in-batch-cost", type=float, default=0.35,
+                        help="Extra inference time per additional batch frame, relative to batch 1 "
+                             "(below 1 the largest batch always wins)")
+    parser.add_argument("--motion-gate", action="store_true", help="Motion gate in the source bins (deepstream pipeline)")
+    parser.add_argument("--batch-sizes", default="1,2,4")
+    parser.add_argument("--timeouts-ms", default="4,16,33", help="nvstreammux batched-push-timeout values")
+    parser.add_argument("--resolutions", default="1920x1080", help="Muxer output sizes, e.g. 1280x720,1920x1080")
+    parser.add_argument("--precisions", default="", help="Engine precisions (%s); empty: the config's"
+                        % ",".join(sorted(PRECISION_FLAGS)))
+    parser.add_argument("--pgie-config", default=PGIE_CONFIG)
+    parser.add_argument("--config", default=APP_CONFIG, help="config.ini the tuned config is based on")
+    parser.add_argument("--engine-cache", default=None, help="Build / reuse an engine per batch size and precision")
+    parser.add_argument("--duration", type=float, default=20.0, help="Measured seconds per setting")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Unmeasured seconds per setting")
+    parser.add_argument("--max-latency-ms", type=float, default=None, help="p95 end-to-end latency budget")
+    parser.add_argument("--output-dir", default="tuning")
+    return parser.parse_args()
+
+
+def split_list(value, convert=str):
+    return [convert(item.strip()) for item in value.split(",") if item.strip()]
+
+
+def parse_resolution(value):
+    width, height = value.lower().split("x")
+    return int(width), int(height)
+
+
+def stand_in_factory(args):
+    """CPU stand-in: compositor batches the sources, identity sleeps for the simulated inference."""
+    sources = args.stand_in_sources
+
+    def build(setting):
+        metrics = MetricsRegistry()
+        pipeline = Gst.Pipeline.new("tune-stand-in")
+        muxer = Gst.ElementFactory.make("compositor", "muxer")
+        # Aggregator gecikmesi nvstreammux batched-push-timeout yerine
+        muxer.set_property("latency", setting.batch_timeout_usec * 1000)
+        muxer_caps = Gst.ElementFactory.make("capsfilter", "muxer-caps")
+        muxer_caps.set_property("caps", Gst.Caps.from_string(
+            "video/x-raw, width=%d, height=%d" % (setting.width, setting.height)))
+        infer = Gst.ElementFactory.make("identity", "primary-inference")
+        # Batch basina sure: infer_ms * (1 + batch_cost * (batch - 1)); kare basina ceil(n / batch) batch
+        batch_ms = args.stand_in_infer_ms * (1.0 + args.stand_in_batch_cost * (setting.batch_size - 1))
+        infer.set_property("sleep-time", int(math.ceil(sources / setting.batch_size) * batch_ms * 1000))
+        osd = Gst.ElementFactory.make("identity", "osd")
+        sink = Gst.ElementFactory.make("fakesink", "sink")
+        sink.set_property("sync", False)
+        for element in (muxer, muxer_caps, infer, osd, sink):
+            pipeline.add(element)
+        for index in range(sources):
+            source = Gst.ElementFactory.make("videotestsrc", "source-%d" % index)
+            source.set_property("is-live", True)
+            source.set_property("pattern", "ball")
+            caps = Gst.ElementFactory.make("capsfilter", "source-caps-%d" % index)
+            caps.set_property("caps", Gst.Caps.from_string(
+                "video/x-raw, format=AYUV, width=640, height=360, framerate=%d/1" % args.stand_in_fps))
+            pipeline.add(source)
+            pipeline.add(caps)
+            if not source.link(caps) or not caps.link(muxer):
+                raise RuntimeError("unable to link stand-in source %d" % index)
+        chain = [muxer, muxer_caps, infer, osd, sink]
+        for upstream, downstream in zip(chain, chain[1:]):
+            if not upstream.link(downstream):
+                raise RuntimeError("unable to link %s to %s" % (upstream.get_name(), downstream.get_name()))
+
+        def count_frames(pad, info):
+            for index in range(sources):
+                metrics.stream(index).frame()
+            return Gst.PadProbeReturn.OK
+
+        infer.get_static_pad("src").add_probe(Gst.PadProbeType.BUFFER, count_frames)
+        osd.get_static_pad("sink").add_probe(Gst.PadProbeType.BUFFER,
+                                             metrics.timed("osd", lambda pad, info: Gst.PadProbeReturn.OK))
+        # Compositor cikis PTS'i (canli, running time) her kaynagin o ana kadar gelen son karesini kapsar
+        return TrialPipeline(pipeline, [muxer, infer, osd], metrics,
+                             frames_fn=lambda buffer: [(index, buffer.pts) for index in range(sources)])
+
+    return build
+
+
+def deepstream_factory(args):
+    """The ds-segmentation.py pipeline (common.pipeline_builder) with its analytics and OSD probes.
+
+    Source bins with their queues, the frame age / motion gates, the
+    stage queues of --config and the tiler size of its [Settings] are
+    the ones the application builds; the outputs are a fakesink.
+    """
+    import probes
+    from common.motion_gate import MotionGate
+    from common.pipeline_builder import build_pipeline, create_source_bin, make_pgie, make_streammux
+    from common.queue_policy import FrameAgeGate, QueuePolicy, load_freshness_settings
+    from common.render_style import RenderStyleTable
+    from common.source_manager import SourceManager
+    from common.tile_layout import TileLayout
+
+    cache = EngineCache(args.engine_cache) if args.engine_cache else None
+    configs = {}
+    live = any(is_live_uri(uri) for uri in args.source)
+    pipeline_settings = load_pipeline_settings(args.config)
+    tiled_size = (pipeline_settings["tiled_output_width"], pipeline_settings["tiled_output_height"])
+    max_frame_age_ms = load_freshness_settings(args.config)["max_frame_age_ms"]
+
+    def build(setting):
+        # Her batch / precision icin config kopyasi (ve engine) bir kez hazirlanir
+        key = (setting.batch_size, setting.precision)
+        if key not in configs:
+            configs[key] = config_variant(args.pgie_config, os.path.join(args.output_dir, "pgie"),
+                                          setting.batch_size, setting.precision, cache)
+        metrics = MetricsRegistry()
+        pipeline = Gst.Pipeline.new("tune")
+        queue_policy = QueuePolicy.from_config(args.config, metrics)
+        motion_gate = MotionGate(metrics=metrics) if args.motion_gate else None
+        streammux = make_streammux(setting.width, setting.height, setting.batch_size, setting.batch_timeout_usec,
+                                   live=live)
+        pipeline.add(streammux)
+
+        source_manager = SourceManager(pipeline, streammux,
+                                       functools.partial(create_source_bin, queue_policy=queue_policy,
+                                                         motion_gate=motion_gate), len(args.source),
+                                       on_removed=[probes.drop_source_state, queue_policy.drop_source])
+        if max_frame_age_ms > 0:
+            source_manager.on_added.append(FrameAgeGate(max_frame_age_ms, metrics).attach)
+        if motion_gate:
+            source_manager.on_added.append(motion_gate.attach)
+        for uri in args.source:
+            if source_manager.add_source(uri, start=False) is None:
+                raise RuntimeError("unable to add source %s" % uri)
+
+        elements = build_pipeline(pipeline, streammux, make_pgie(configs[key], setting.batch_size), queue_policy,
+                                  len(args.source), tiled_size)
+        if elements is None:
+            raise RuntimeError("unable to link the pipeline")
+        sink = Gst.ElementFactory.make("fakesink", "sink")
+        sink.set_property("sync", False)
+        pipeline.add(sink)
+        if not elements.tee.link(sink):
+            raise RuntimeError("unable to link the tee to the sink")
+
+        render_styles = RenderStyleTable.from_pgie_config(configs[key], len(args.source))
+        elements.pgie.get_static_pad("src").add_probe(Gst.PadProbeType.BUFFER, probes.metrics_sink_pad_buffer_probe,
+                                                      None, metrics)
+        probes.tile_layout = TileLayout.from_tiler(elements.tiler, setting.width, setting.height)
+        elements.tiler.get_static_pad("sink").add_probe(
+            Gst.PadProbeType.BUFFER, metrics.timed("analytics", probes.analytics_pad_buffer_probe), None)
+        elements.osd.get_static_pad("sink").add_probe(
+            Gst.PadProbeType.BUFFER, metrics.timed("osd", probes.osd_sink_pad_buffer_probe), None, render_styles)
+
+        def cleanup():
+            for index in list(source_manager.sources):
+                probes.drop_source_state(index)
+                if motion_gate:
+                    motion_gate.drop_source(index)
+            # Pipeline durdu: streaming thread yok, silmeler hemen uygulanir
+            probes.apply_pending_drops()
+
+        return TrialPipeline(pipeline, elements.chain, metrics, source_fn=probes.batch_pad_indices,
+                             cleanup=cleanup, frames_fn=probes.batch_frame_pts)
+
+    build.configs = configs
+    return build
+
+
+def print_result(result):
+    if "error" in result:
+        print("b=%-2d timeout=%6dus %dx%d %-5s  error: %s" % (
+            result["batch_size"], result["batch_timeout_usec"], result["width"], result["height"],
+            result["precision"] or "-", result["error"]))
+        return
+    print("b=%-2d timeout=%6dus %dx%d %-5s  %8.1f fps  p50=%7.1fms p95=%7.1fms p99=%7.1fms  probe=%6.3fms" % (
+        result["batch_size"], result["batch_timeout_usec"], result["width"], result["height"],
+        result["precision"] or "-", result["fps"], result["latency_p50_ms"], result["latency_p95_ms"],
+        result["latency_p99_ms"], result["probe_mean_ms"]))
+
+
+def main(args):
+    if args.pipeline == "deepstream" and not args.source:
+        sys.stderr.write("--source is required for the deepstream pipeline\n")
+        return 1
+    Gst.init(None)
+    settings = sweep_settings(split_list(args.batch_sizes, int),
+                              [int(ms * 1000) for ms in split_list(args.timeouts_ms, float)],
+                              split_list(args.resolutions, parse_resolution),
+                              split_list(args.precisions) or [None])
+    os.makedirs(args.output_dir, exist_ok=True)
+    factory = stand_in_factory(args) if args.pipeline == "stand-in" else deepstream_factory(args)
+    print("Sweeping %d settings, %.0fs each" % (len(settings), args.warmup + args.duration))
+    results = sweep(factory, settings, args.duration, args.warmup, on_result=print_result)
+
+    front = pareto_front(results)
+    best = recommend(front, args.max_latency_ms)
+    report = {"pipeline": args.pipeline, "results": results, "pareto": front, "recommended": best,
+              "settings": {"duration": args.duration, "warmup": args.warmup, "max_latency_ms": args.max_latency_ms,
+                           "sources": len(args.source) if args.pipeline == "deepstream" else args.stand_in_sources}}
+    with open(os.path.join(args.output_dir, "tuning.json"), "w") as file:
+        json.dump(report, file, indent=2)
+
+    print("\nPareto front (throughput vs p95 latency):")
+    for result in front:
+        print_result(result)
+    if best is None:
+        sys.stderr.write("No setting produced measurements\n")
+        return 1
+    pgie_config = None
+    if args.pipeline == "deepstream":
+        pgie_config = os.path.abspath(factory.configs[(best["batch_size"], best["precision"])])
+    path = write_tuned_config(args.config, os.path.join(args.output_dir, "config.ini"), best, pgie_config)
+    print("\nRecommended: ", end="")
+    print_result(best)
+    print("Tuned config: %s (python3 ds-segmentation.py --config %s)" % (path, path))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(parse_args()))